@@ -0,0 +1,7 @@
+"""python -m src：以 UCCI 協定在標準輸入/輸出執行引擎"""
+
+import sys
+
+from .ucci import main
+
+sys.exit(main())
@@ -0,0 +1,330 @@
+"""位元棋盤：每個 (顏色, 棋種) 以一個 90 位元整數表示，供大量局面分析使用
+
+格子索引與 board.square_index 相同：sq = (row - 1) * 9 + (col - 1)。
+另外維護一份以列 (file) 為主的旋轉佔位，讓車與炮能以整列查表取得攻擊範圍。
+"""
+
+from .board import BLACK_BIT, COLORS, PIECE_CODES, PIECES, square_from_index, square_index
+from .zobrist import PIECE_KEYS, ZOBRIST_SIDE
+
+GENERAL, GUARD, ELEPHANT, HORSE, ROOK, CANNON, SOLDIER = range(1, 8)
+RED, BLACK = 0, 1
+COLOR_INDEX = {'Red': RED, 'Black': BLACK}
+
+def _spread_file(line_mask):
+    """將列內位置遮罩（第 r 位元）轉為第 1 行所在列的棋盤遮罩（第 9r 位元）"""
+    mask = 0
+    for row0 in range(10):
+        if line_mask >> row0 & 1:
+            mask |= 1 << (row0 * 9)
+    return mask
+
+def _line_tables(length):
+    """建立單一橫線或直線的 (車攻擊, 炮吃子) 查表：[位置][佔位] -> 線內遮罩"""
+    rook_table = []
+    cannon_table = []
+    for position in range(length):
+        rook_row = []
+        cannon_row = []
+        for occupancy in range(1 << length):
+            rook_mask = 0
+            cannon_mask = 0
+            for step in (1, -1):
+                index = position + step
+                while 0 <= index < length:
+                    rook_mask |= 1 << index
+                    if occupancy >> index & 1:
+                        break
+                    index += step
+                else:
+                    continue  # 沒有炮台
+                index += step
+                while 0 <= index < length:
+                    if occupancy >> index & 1:
+                        cannon_mask |= 1 << index
+                        break
+                    index += step
+            rook_row.append(rook_mask)
+            cannon_row.append(cannon_mask)
+        rook_table.append(rook_row)
+        cannon_table.append(cannon_row)
+    return rook_table, cannon_table
+
+# 橫線查表：[col0][9 位元佔位] -> 9 位元遮罩，使用時左移 row0 * 9
+RANK_ROOK, RANK_CANNON = _line_tables(9)
+# 直線查表：[row0][10 位元佔位] -> 第 1 行遮罩，使用時左移 col0
+FILE_ROOK, FILE_CANNON = (
+    [[_spread_file(mask) for mask in row] for row in table]
+    for table in _line_tables(10)
+)
+
+def _file_bit(sq):
+    row0, col0 = divmod(sq, 9)
+    return 1 << (col0 * 10 + row0)
+
+FILE_BITS = [_file_bit(sq) for sq in range(90)]
+
+class _AttackTables:
+    """固定位移棋子的預先計算攻擊表，以各驗證器在空棋盤上的判斷建立"""
+
+    def __init__(self):
+        from .chess_engine import (
+            ElephantMoveValidator, GeneralMoveValidator, GuardMoveValidator,
+            HorseMoveValidator, SoldierMoveValidator
+        )
+        validators = {
+            GENERAL: GeneralMoveValidator(),
+            GUARD: GuardMoveValidator(),
+            ELEPHANT: ElephantMoveValidator(),
+            HORSE: HorseMoveValidator(),
+            SOLDIER: SoldierMoveValidator(),
+        }
+        # moves[棋種][顏色][sq] -> 目標遮罩；馬與象另存 (目標位元, 腳/眼位元) 對
+        self.moves = {piece_type: ([0] * 90, [0] * 90) for piece_type in validators}
+        self.attackers = {piece_type: ([0] * 90, [0] * 90) for piece_type in validators}
+        self.horse_steps = [[] for _ in range(90)]
+        self.horse_attackers = [[] for _ in range(90)]
+        self.elephant_steps = ([[] for _ in range(90)], [[] for _ in range(90)])
+        self.elephant_attackers = ([[] for _ in range(90)], [[] for _ in range(90)])
+
+        empty_board = {}
+        for piece_type, validator in validators.items():
+            for color in (RED, BLACK):
+                piece = PIECES[color * BLACK_BIT | piece_type]
+                for from_sq in range(90):
+                    from_row, from_col = square_from_index(from_sq)
+                    for to_sq in range(90):
+                        if to_sq == from_sq:
+                            continue
+                        to_row, to_col = square_from_index(to_sq)
+                        if not validator.is_valid_move(empty_board, from_row, from_col, to_row, to_col, piece):
+                            continue
+                        self.moves[piece_type][color][from_sq] |= 1 << to_sq
+                        self.attackers[piece_type][color][to_sq] |= 1 << from_sq
+                        if piece_type == HORSE and color == RED:
+                            leg = self._horse_leg(from_row, from_col, to_row, to_col)
+                            self.horse_steps[from_sq].append((1 << to_sq, leg))
+                            self.horse_attackers[to_sq].append((1 << from_sq, leg))
+                        elif piece_type == ELEPHANT:
+                            eye = 1 << square_index((from_row + to_row) // 2, (from_col + to_col) // 2)
+                            self.elephant_steps[color][from_sq].append((1 << to_sq, eye))
+                            self.elephant_attackers[color][to_sq].append((1 << from_sq, eye))
+
+    @staticmethod
+    def _horse_leg(from_row, from_col, to_row, to_col):
+        row_diff = to_row - from_row
+        col_diff = to_col - from_col
+        if abs(row_diff) == 2:
+            return 1 << square_index(from_row + (1 if row_diff > 0 else -1), from_col)
+        return 1 << square_index(from_row, from_col + (1 if col_diff > 0 else -1))
+
+_tables = None
+
+def attack_tables():
+    """取得（必要時建立）固定位移棋子的攻擊表"""
+    global _tables
+    if _tables is None:
+        _tables = _AttackTables()
+    return _tables
+
+def iter_bits(mask):
+    """逐一產生遮罩中的格子索引"""
+    while mask:
+        low_bit = mask & -mask
+        yield low_bit.bit_length() - 1
+        mask ^= low_bit
+
+class BitboardPosition:
+    """以位元棋盤表示的局面，提供走法產生、將軍判斷與 make/unmake"""
+
+    __slots__ = ('pieces', 'occupied_by', 'occupied', 'occupied_file',
+                 'squares', 'side_to_move', 'board_key', 'tables', '_undo_stack')
+
+    def __init__(self):
+        # pieces[顏色][棋種] -> 90 位元遮罩（索引 0 不使用）
+        self.pieces = ([0] * 8, [0] * 8)
+        self.occupied_by = [0, 0]
+        self.occupied = 0
+        self.occupied_file = 0
+        # 每格的棋子編碼（0 為空），用來在 make_move 時查出被吃的棋子
+        self.squares = [0] * 90
+        self.side_to_move = RED
+        # 棋盤部分的 Zobrist 鍵值，與 ChessEngine 的鍵值相同
+        self.board_key = 0
+        self.tables = attack_tables()
+        self._undo_stack = []
+
+    @classmethod
+    def from_board(cls, board, current_turn='Red'):
+        """由 (row, col) -> 棋子字典的棋盤建立位元棋盤"""
+        position = cls()
+        for (row, col), piece in board.items():
+            position.add_piece(PIECE_CODES[(piece['color'], piece['type'])], square_index(row, col))
+        position.side_to_move = COLOR_INDEX[current_turn]
+        return position
+
+    def add_piece(self, code, sq):
+        color, piece_type = code >> 3, code & 7
+        bit = 1 << sq
+        self.pieces[color][piece_type] |= bit
+        self.occupied_by[color] |= bit
+        self.occupied |= bit
+        self.occupied_file |= FILE_BITS[sq]
+        self.squares[sq] = code
+        self.board_key ^= PIECE_KEYS[code][sq]
+
+    def remove_piece(self, sq):
+        code = self.squares[sq]
+        color, piece_type = code >> 3, code & 7
+        mask = ~(1 << sq)
+        self.pieces[color][piece_type] &= mask
+        self.occupied_by[color] &= mask
+        self.occupied &= mask
+        self.occupied_file &= ~FILE_BITS[sq]
+        self.squares[sq] = 0
+        self.board_key ^= PIECE_KEYS[code][sq]
+        return code
+
+    def make_move(self, from_sq, to_sq):
+        """執行移動（不驗證），可由 unmake_move 還原"""
+        captured = self.squares[to_sq]
+        if captured:
+            self.remove_piece(to_sq)
+        self.add_piece(self.remove_piece(from_sq), to_sq)
+        self._undo_stack.append((from_sq, to_sq, captured))
+        self.side_to_move ^= 1
+
+    def unmake_move(self):
+        """還原最近一次 make_move"""
+        from_sq, to_sq, captured = self._undo_stack.pop()
+        self.add_piece(self.remove_piece(to_sq), from_sq)
+        if captured:
+            self.add_piece(captured, to_sq)
+        self.side_to_move ^= 1
+
+    def position_key(self):
+        """取得含輪次的 64 位元 Zobrist 鍵值"""
+        return self.board_key ^ (ZOBRIST_SIDE if self.side_to_move == BLACK else 0)
+
+    def rook_attacks(self, sq, occupied=None, occupied_file=None):
+        """車在 sq 的攻擊範圍（含第一個阻擋的棋子）"""
+        if occupied is None:
+            occupied, occupied_file = self.occupied, self.occupied_file
+        row0, col0 = divmod(sq, 9)
+        rank_shift = row0 * 9
+        rank = RANK_ROOK[col0][occupied >> rank_shift & 0x1FF] << rank_shift
+        return rank | FILE_ROOK[row0][occupied_file >> (col0 * 10) & 0x3FF] << col0
+
+    def cannon_captures(self, sq):
+        """炮在 sq 隔一個炮台可吃到的格子"""
+        row0, col0 = divmod(sq, 9)
+        rank_shift = row0 * 9
+        rank = RANK_CANNON[col0][self.occupied >> rank_shift & 0x1FF] << rank_shift
+        return rank | FILE_CANNON[row0][self.occupied_file >> (col0 * 10) & 0x3FF] << col0
+
+    def _faces_general(self, sq, color, vacated_sq=None):
+        """檢查 sq 所在列是否直接面對對方將帥（可指定一個視為已空出的格子）"""
+        occupied_file = self.occupied_file
+        if vacated_sq is not None:
+            occupied_file &= ~FILE_BITS[vacated_sq]
+        row0, col0 = divmod(sq, 9)
+        file_attacks = FILE_ROOK[row0][occupied_file >> (col0 * 10) & 0x3FF] << col0
+        return bool(file_attacks & self.pieces[color ^ 1][GENERAL])
+
+    def generals_facing(self):
+        """檢查兩方將帥是否照面"""
+        red_general = self.pieces[RED][GENERAL]
+        if not red_general or not self.pieces[BLACK][GENERAL]:
+            return False
+        return self._faces_general(red_general.bit_length() - 1, RED)
+
+    def is_in_check(self, color):
+        """以反向攻擊遮罩檢查指定顏色是否被將軍（含將帥照面）"""
+        color = COLOR_INDEX.get(color, color)
+        general = self.pieces[color][GENERAL]
+        if not general:
+            return False
+        sq = general.bit_length() - 1
+        enemy = self.pieces[color ^ 1]
+        enemy_color = color ^ 1
+        tables = self.tables
+        occupied = self.occupied
+
+        # 車的直線攻擊；同列的將帥照面
+        rook_attacks = self.rook_attacks(sq)
+        if rook_attacks & enemy[ROOK]:
+            return True
+        row0, col0 = divmod(sq, 9)
+        if FILE_ROOK[row0][self.occupied_file >> (col0 * 10) & 0x3FF] << col0 & enemy[GENERAL]:
+            return True
+        if self.cannon_captures(sq) & enemy[CANNON]:
+            return True
+        for horse_bit, leg_bit in tables.horse_attackers[sq]:
+            if enemy[HORSE] & horse_bit and not occupied & leg_bit:
+                return True
+        for elephant_bit, eye_bit in tables.elephant_attackers[enemy_color][sq]:
+            if enemy[ELEPHANT] & elephant_bit and not occupied & eye_bit:
+                return True
+        return bool(
+            tables.attackers[SOLDIER][enemy_color][sq] & enemy[SOLDIER]
+            or tables.attackers[GUARD][enemy_color][sq] & enemy[GUARD]
+            or tables.attackers[GENERAL][enemy_color][sq] & enemy[GENERAL]
+        )
+
+    def generate_pseudo_legal_moves(self, color=None):
+        """產生偽合法移動列表 [(from_sq, to_sq), ...]"""
+        color = self.side_to_move if color is None else COLOR_INDEX.get(color, color)
+        own = self.pieces[color]
+        not_own = ~self.occupied_by[color]
+        empty = ~self.occupied
+        tables = self.tables
+        moves = []
+
+        for from_sq in iter_bits(own[GENERAL]):
+            for to_sq in iter_bits(tables.moves[GENERAL][color][from_sq] & not_own):
+                if not self._faces_general(to_sq, color, vacated_sq=from_sq):
+                    moves.append((from_sq, to_sq))
+        for piece_type in (GUARD, SOLDIER):
+            move_table = tables.moves[piece_type][color]
+            for from_sq in iter_bits(own[piece_type]):
+                for to_sq in iter_bits(move_table[from_sq] & not_own):
+                    moves.append((from_sq, to_sq))
+        for from_sq in iter_bits(own[ELEPHANT]):
+            for target_bit, eye_bit in tables.elephant_steps[color][from_sq]:
+                if target_bit & not_own and not self.occupied & eye_bit:
+                    moves.append((from_sq, target_bit.bit_length() - 1))
+        for from_sq in iter_bits(own[HORSE]):
+            for target_bit, leg_bit in tables.horse_steps[from_sq]:
+                if target_bit & not_own and not self.occupied & leg_bit:
+                    moves.append((from_sq, target_bit.bit_length() - 1))
+        for from_sq in iter_bits(own[ROOK]):
+            for to_sq in iter_bits(self.rook_attacks(from_sq) & not_own):
+                moves.append((from_sq, to_sq))
+        enemy_pieces = self.occupied_by[color ^ 1]
+        for from_sq in iter_bits(own[CANNON]):
+            targets = (self.rook_attacks(from_sq) & empty) | (self.cannon_captures(from_sq) & enemy_pieces)
+            for to_sq in iter_bits(targets):
+                moves.append((from_sq, to_sq))
+        return moves
+
+    def generate_legal_moves(self, color=None):
+        """產生合法移動列表（移動後己方不被將軍）"""
+        color = self.side_to_move if color is None else COLOR_INDEX.get(color, color)
+        legal_moves = []
+        for from_sq, to_sq in self.generate_pseudo_legal_moves(color):
+            self.make_move(from_sq, to_sq)
+            if not self.is_in_check(color):
+                legal_moves.append((from_sq, to_sq))
+            self.unmake_move()
+        return legal_moves
+
+    def to_board(self):
+        """轉回 (row, col) -> 棋子字典的棋盤"""
+        return {
+            square_from_index(sq): PIECES[code]
+            for sq, code in enumerate(self.squares) if code
+        }
+
+    @property
+    def current_turn(self):
+        return COLORS[self.side_to_move]
@@ -0,0 +1,242 @@
+from collections.abc import MutableMapping
+
+# 棋子編碼：低 3 位元為棋種，第 4 位元為顏色（0 = 紅，1 = 黑）
+PIECE_TYPES = ('General', 'Guard', 'Elephant', 'Horse', 'Rook', 'Cannon', 'Soldier')
+COLORS = ('Red', 'Black')
+BLACK_BIT = 8
+EMPTY = 0
+OFFBOARD = 0xFF
+# 擴充棋種沒有內建編碼，轉為陣列時只記錄佔位與顏色（再加上 BLACK_BIT）
+EXTENSION_CODE = 0x70
+
+class Piece(dict):
+    """共用且不可修改的棋子（flyweight），每種 (顏色, 棋種) 只有一個實例
+
+    繼承 dict 以保留 piece['color'] / piece['type'] 與和棋子字典相等比較的相容介面；
+    color、type 與 code（內建棋種的棋子編碼，擴充棋種為 None）可直接以屬性取用。
+    請以 get_piece 取得實例。
+    """
+
+    __slots__ = ('color', 'type', 'code')
+
+    def __init__(self, color, piece_type, code=None):
+        dict.__init__(self, color=color, type=piece_type)
+        self.color = color
+        self.type = piece_type
+        self.code = code
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("Piece 是共用的唯讀棋子，請以 get_piece 取得其他棋子")
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+    __hash__ = object.__hash__
+
+    def __reduce__(self):
+        # 反序列化時取回同一個共用實例
+        return get_piece, (self.color, self.type)
+
+PIECE_CODES = {}
+PIECES = {}
+_PIECE_CACHE = {}
+
+def get_piece(color, piece_type):
+    """取得 (顏色, 棋種) 對應的共用 Piece；擴充棋種第一次使用時建立"""
+    piece = _PIECE_CACHE.get((color, piece_type))
+    if piece is None:
+        piece = Piece(color, piece_type, PIECE_CODES.get((color, piece_type)))
+        piece = _PIECE_CACHE.setdefault((color, piece_type), piece)
+    return piece
+
+def as_piece(piece):
+    """將棋子字典轉為共用的 Piece（已是 Piece 時原樣回傳）"""
+    if type(piece) is Piece:
+        return piece
+    return get_piece(piece['color'], piece['type'])
+
+for _color_index, _color in enumerate(COLORS):
+    for _type_index, _piece_type in enumerate(PIECE_TYPES, start=1):
+        _code = _color_index * BLACK_BIT | _type_index
+        PIECE_CODES[(_color, _piece_type)] = _code
+        PIECES[_code] = get_piece(_color, _piece_type)
+
+# 外圍留兩格哨兵，馬與象跳兩格也不會越界
+PADDING = 2
+MAILBOX_WIDTH = 9 + 2 * PADDING
+MAILBOX_HEIGHT = 10 + 2 * PADDING
+MAILBOX_SIZE = MAILBOX_WIDTH * MAILBOX_HEIGHT
+
+def piece_code(piece):
+    """取得棋子對應的編碼（Piece 直接取用 code，棋子字典則查表）"""
+    if type(piece) is Piece and piece.code is not None:
+        return piece.code
+    return PIECE_CODES[(piece['color'], piece['type'])]
+
+def square_index(row, col):
+    """將 (row, col) 轉為 0-89 的緊湊索引"""
+    return (row - 1) * 9 + (col - 1)
+
+def square_from_index(index):
+    """將 0-89 的緊湊索引轉回 (row, col)"""
+    return index // 9 + 1, index % 9 + 1
+
+def pack_move(move):
+    """將 (from_row, from_col, to_row, to_col) 壓縮為 14 位元整數（0 代表無移動）"""
+    from_row, from_col, to_row, to_col = move
+    return square_index(from_row, from_col) << 7 | square_index(to_row, to_col)
+
+def unpack_move(packed):
+    """將 pack_move 的結果還原為 (from_row, from_col, to_row, to_col)"""
+    return square_from_index(packed >> 7) + square_from_index(packed & 0x7F)
+
+def mailbox_index(row, col):
+    """將 (row, col) 轉為含哨兵邊界的陣列索引"""
+    return (row - 1 + PADDING) * MAILBOX_WIDTH + (col - 1 + PADDING)
+
+def mailbox_delta(row_step, col_step):
+    """將 (row_step, col_step) 位移轉為陣列索引差"""
+    return row_step * MAILBOX_WIDTH + col_step
+
+def _empty_squares():
+    squares = bytearray([OFFBOARD]) * MAILBOX_SIZE
+    for row in range(1, 11):
+        start = mailbox_index(row, 1)
+        squares[start:start + 9] = bytes(9)
+    return squares
+
+_EMPTY_SQUARES = _empty_squares()
+
+# (row, col) -> 陣列索引，涵蓋含哨兵的整個範圍；查一次字典即可取代範圍檢查與乘法
+MAILBOX_INDEX = {
+    (row, col): mailbox_index(row, col)
+    for row in range(1 - PADDING, 11 + PADDING)
+    for col in range(1 - PADDING, 10 + PADDING)
+}
+# 棋盤內 90 格的陣列索引（依緊湊索引順序）
+BOARD_INDICES = tuple(mailbox_index(row, col) for row in range(1, 11) for col in range(1, 10))
+# 陣列索引 -> (row, col)（哨兵格為 None）與列號（哨兵格為 0）
+MAILBOX_SQUARES = [None] * MAILBOX_SIZE
+MAILBOX_ROWS = bytearray(MAILBOX_SIZE)
+for (_row, _col), _index in MAILBOX_INDEX.items():
+    if _EMPTY_SQUARES[_index] != OFFBOARD:
+        MAILBOX_SQUARES[_index] = (_row, _col)
+        MAILBOX_ROWS[_index] = _row
+
+class MailboxBoard(MutableMapping):
+    """以 bytearray 儲存的棋盤（14x13，含哨兵邊界）
+
+    以 (row, col) 為鍵的字典相容介面，讓 place_piece 與自訂驗證器不需修改即可使用；
+    內建走法規則、將軍判斷與牽制分析直接以索引位移走訪 squares（見 board_squares），
+    並以 OFFBOARD 哨兵判斷出界，不經過字典介面。
+    """
+
+    __slots__ = ('squares', '_count')
+
+    def __init__(self, pieces=None):
+        self.squares = bytearray(_EMPTY_SQUARES)
+        self._count = 0
+        if pieces:
+            self.update(pieces)
+
+    @classmethod
+    def wrap(cls, squares):
+        """以既有的 squares 建立棋盤（共用同一個 bytearray，不複製）"""
+        board = cls.__new__(cls)
+        board.squares = squares
+        # 哨兵格為 OFFBOARD，因此 EMPTY 只出現在棋盤內的空格
+        board._count = len(BOARD_INDICES) - squares.count(EMPTY)
+        return board
+
+    def __getitem__(self, key):
+        index = MAILBOX_INDEX.get(key)
+        code = EMPTY if index is None else self.squares[index]
+        if code == EMPTY or code == OFFBOARD:
+            raise KeyError(key)
+        return PIECES[code]
+
+    def __setitem__(self, key, piece):
+        index = MAILBOX_INDEX.get(key)
+        if index is None or self.squares[index] == OFFBOARD:
+            raise KeyError(key)
+        code = as_piece(piece).code
+        if code is None:
+            raise ValueError(f"MailboxBoard 不支援的棋子: {piece!r}")
+        if self.squares[index] == EMPTY:
+            self._count += 1
+        self.squares[index] = code
+
+    def __delitem__(self, key):
+        index = MAILBOX_INDEX.get(key)
+        if index is None or self.squares[index] in (EMPTY, OFFBOARD):
+            raise KeyError(key)
+        self.squares[index] = EMPTY
+        self._count -= 1
+
+    def __contains__(self, key):
+        index = MAILBOX_INDEX.get(key)
+        return index is not None and EMPTY != self.squares[index] != OFFBOARD
+
+    def __iter__(self):
+        squares = self.squares
+        for row in range(1, 11):
+            index = mailbox_index(row, 1)
+            for col in range(1, 10):
+                if squares[index] != EMPTY:
+                    yield row, col
+                index += 1
+
+    def __len__(self):
+        return self._count
+
+    def __repr__(self):
+        return f"MailboxBoard({dict(self.items())!r})"
+
+    def get(self, key, default=None):
+        index = MAILBOX_INDEX.get(key)
+        code = EMPTY if index is None else self.squares[index]
+        if code == EMPTY or code == OFFBOARD:
+            return default
+        return PIECES[code]
+
+    def items(self):
+        """直接走訪陣列，回傳 ((row, col), 棋子) 列表（快照）"""
+        squares = self.squares
+        return [(MAILBOX_SQUARES[index], PIECES[code])
+                for index, code in enumerate(squares) if code != EMPTY and code != OFFBOARD]
+
+    def values(self):
+        return [PIECES[code] for code in self.squares if code != EMPTY and code != OFFBOARD]
+
+    def clear(self):
+        self.squares[:] = _EMPTY_SQUARES
+        self._count = 0
+
+    def copy(self):
+        board = MailboxBoard()
+        board.squares[:] = self.squares
+        board._count = self._count
+        return board
+
+def board_squares(board):
+    """取得棋盤的含哨兵陣列：MailboxBoard 直接共用 squares，(row, col) 字典則依目前內容建立
+
+    走法規則只以陣列實作，字典棋盤經由此函式轉接。擴充棋種記為 EXTENSION_CODE，
+    只表示該顏色佔據的格子。
+    """
+    if type(board) is MailboxBoard:
+        return board.squares
+    squares = bytearray(_EMPTY_SQUARES)
+    for square, piece in board.items():
+        index = MAILBOX_INDEX.get(square)
+        if index is None or squares[index] == OFFBOARD:
+            continue
+        code = piece.code if type(piece) is Piece else PIECE_CODES.get((piece['color'], piece['type']))
+        if code is None:
+            code = EXTENSION_CODE | (BLACK_BIT if piece['color'] == 'Black' else 0)
+        squares[index] = code
+    return squares
+
+BOARD_BACKENDS = {
+    'dict': dict,
+    'mailbox': MailboxBoard,
+}
@@ -0,0 +1,180 @@
+"""開局庫：依 (Zobrist 鍵值, 移動) 排序的二進位檔，以 mmap 開啟並二分搜尋
+
+檔案格式（小端序）：
+    標頭 16 位元組：MAGIC（8 位元組）+ 記錄數（uint64）
+    記錄 16 位元組：鍵值（uint64）、pack_move 壓縮移動（uint16）、權重（uint16）、次數（uint32）
+
+開啟時不載入內容，多個行程開啟同一檔案時共用作業系統的頁面快取。
+"""
+
+import heapq
+import mmap
+import os
+import random
+import struct
+import tempfile
+
+from .board import pack_move, unpack_move
+from .notation import NotationError, read_games, replay_moves, starting_engine
+
+MAGIC = b'XQBOOK\x00\x01'
+HEADER = struct.Struct('<8sQ')
+RECORD = struct.Struct('<QHHI')
+MAX_WEIGHT = 0xFFFF
+MAX_COUNT = 0xFFFFFFFF
+
+# 行棋方的得分（勝 2、和 1、負 0），結果未知時以和棋計
+_RESULT_POINTS = {
+    '1-0': {'Red': 2, 'Black': 0},
+    '0-1': {'Red': 0, 'Black': 2},
+    '1/2-1/2': {'Red': 1, 'Black': 1},
+}
+_UNKNOWN_POINTS = {'Red': 1, 'Black': 1}
+
+class OpeningBook:
+    """以 mmap 開啟的唯讀開局庫，可作為 context manager 使用"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as stream:
+            self._mmap = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.record_count = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"不是開局庫檔案: {path}")
+        if HEADER.size + self.record_count * RECORD.size > len(self._mmap):
+            self._mmap.close()
+            raise ValueError(f"開局庫檔案不完整: {path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+    def __len__(self):
+        return self.record_count
+
+    def close(self):
+        self._mmap.close()
+
+    def _key_at(self, index):
+        return struct.unpack_from('<Q', self._mmap, HEADER.size + index * RECORD.size)[0]
+
+    def lookup(self, key):
+        """二分搜尋鍵值，回傳 [(移動, 權重, 次數), ...]（依移動排序）"""
+        low, high = 0, self.record_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        entries = []
+        offset = HEADER.size + low * RECORD.size
+        end = HEADER.size + self.record_count * RECORD.size
+        while offset < end:
+            record_key, move, weight, count = RECORD.unpack_from(self._mmap, offset)
+            if record_key != key:
+                break
+            entries.append((unpack_move(move), weight, count))
+            offset += RECORD.size
+        return entries
+
+    def choose(self, key, rng=random):
+        """依權重隨機選擇一個移動；查無資料或權重皆為 0 時回傳 None"""
+        entries = [(move, weight) for move, weight, _ in self.lookup(key) if weight > 0]
+        if not entries:
+            return None
+        moves, weights = zip(*entries)
+        return rng.choices(moves, weights=weights)[0]
+
+def _write_run(entries, directory):
+    """將一批 {(鍵值, 移動): [得分, 次數]} 排序後寫成暫存檔，回傳路徑"""
+    handle, path = tempfile.mkstemp(suffix='.run', dir=directory)
+    with os.fdopen(handle, 'wb') as stream:
+        for (key, move), (points, count) in sorted(entries.items()):
+            stream.write(struct.pack('<QHQQ', key, move, points, count))
+    return path
+
+def _read_run(path):
+    run_record = struct.Struct('<QHQQ')
+    with open(path, 'rb') as stream:
+        while True:
+            data = stream.read(run_record.size)
+            if not data:
+                return
+            yield run_record.unpack(data)
+
+def iter_book_entries(source, max_plies=20, notation='auto'):
+    """重播棋譜，逐一產生 (走子前局面鍵值, 壓縮移動, 行棋方得分)
+
+    無法重播的棋局只使用錯誤前的移動。
+    """
+    for record in read_games(source):
+        result = record.result if record.result in _RESULT_POINTS else record.headers.get('Result')
+        points = _RESULT_POINTS.get(result, _UNKNOWN_POINTS)
+        try:
+            engine = starting_engine(record)
+            key = engine.position_key()
+            color = engine.turn_manager.current_turn
+            for ply, move in replay_moves(record, engine, notation):
+                yield key, pack_move(move), points[color]
+                if ply >= max_plies:
+                    break
+                key = engine.position_key()
+                color = engine.turn_manager.current_turn
+        except NotationError:
+            continue
+
+def build_book(source, path, max_plies=20, chunk_entries=100000, notation='auto'):
+    """由棋譜建立開局庫檔案，回傳記錄數
+
+    每累積 chunk_entries 個不同的 (鍵值, 移動) 就排序寫出一個暫存檔，最後以多路
+    合併寫出結果，記憶體用量與棋譜大小無關。權重為行棋方的累計得分。
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    runs = []
+    entries = {}
+    try:
+        for key, move, points in iter_book_entries(source, max_plies, notation):
+            stats = entries.get((key, move))
+            if stats is None:
+                entries[(key, move)] = [points, 1]
+                if len(entries) >= chunk_entries:
+                    runs.append(_write_run(entries, directory))
+                    entries = {}
+            else:
+                stats[0] += points
+                stats[1] += 1
+        if entries:
+            runs.append(_write_run(entries, directory))
+            entries = {}
+
+        record_count = 0
+        temporary_path = path + '.tmp'
+        with open(temporary_path, 'wb') as stream:
+            stream.write(HEADER.pack(MAGIC, 0))
+            current = None
+            for key, move, points, count in heapq.merge(*(_read_run(run) for run in runs)):
+                if current is not None and current[:2] == [key, move]:
+                    current[2] += points
+                    current[3] += count
+                    continue
+                if current is not None:
+                    stream.write(_pack_record(*current))
+                    record_count += 1
+                current = [key, move, points, count]
+            if current is not None:
+                stream.write(_pack_record(*current))
+                record_count += 1
+            stream.seek(0)
+            stream.write(HEADER.pack(MAGIC, record_count))
+        os.replace(temporary_path, path)
+    finally:
+        for run in runs:
+            os.remove(run)
+    return record_count
+
+def _pack_record(key, move, points, count):
+    return RECORD.pack(key, move, min(points, MAX_WEIGHT), min(count, MAX_COUNT))
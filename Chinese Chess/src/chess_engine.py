@@ -1,5 +1,15 @@
 from abc import ABC, abstractmethod
 
+from .board import (
+    BLACK_BIT, BOARD_BACKENDS, BOARD_INDICES, EMPTY, MAILBOX_INDEX, MAILBOX_ROWS, MAILBOX_SQUARES,
+    MAILBOX_WIDTH, OFFBOARD, PIECE_CODES, PIECES, MailboxBoard, board_squares, get_piece, mailbox_delta,
+    mailbox_index, piece_code, square_from_index, square_index
+)
+from .evaluation import DEFAULT_EVALUATION
+from .fen import decode_snapshot, encode_snapshot, format_fen, parse_fen
+from .move_cache import LegalMoveCache, pack_moves
+from .zobrist import ZOBRIST_KEYS, compute_board_key, piece_key, side_key
+
 class TurnManager:
     """輪次管理器 - 遵循 OCP 原則的擴展組件"""
     
@@ -24,213 +34,342 @@ class TurnManager:
 class CheckmateDetector:
     """將死檢查器 - 遵循 OCP 原則的擴展組件"""
     
+    # (棋種, 攻擊者相對將帥的位移)：兵卒與將帥為正交一格，士為斜一格，象為斜兩格
+    _SHORT_RANGE_ATTACKERS = (
+        ('Soldier', ((1, 0), (-1, 0), (0, 1), (0, -1))),
+        ('General', ((1, 0), (-1, 0), (0, 1), (0, -1))),
+        ('Guard', ((1, 1), (1, -1), (-1, 1), (-1, -1))),
+        ('Elephant', ((2, 2), (2, -2), (-2, 2), (-2, -2))),
+    )
+    
+    _SHORT_RANGE_DELTAS = tuple(
+        (piece_type, tuple(mailbox_delta(row_step, col_step) for row_step, col_step in offsets))
+        for piece_type, offsets in _SHORT_RANGE_ATTACKERS
+    )
+    
     def __init__(self, engine):
         self.engine = engine
+        # engine.validators 的 (棋種, 驗證器) 快照與其中使用內建規則的棋種
+        self._validator_snapshot = ()
+        self._builtin_types = frozenset()
+    
+    def builtin_types(self):
+        """目前使用內建驗證器的棋種集合（engine.validators 有變動時重新計算）"""
+        snapshot = tuple(self.engine.validators.items())
+        if snapshot != self._validator_snapshot:
+            self._validator_snapshot = snapshot
+            self._builtin_types = frozenset(piece_type for piece_type, validator in snapshot
+                                            if has_builtin_rules(validator, piece_type))
+        return self._builtin_types
     
     def is_in_check(self, color):
-        """檢查指定顏色是否被將軍"""
-        # 找到該顏色的將軍位置
-        general_pos = None
-        for pos, piece in self.engine.board.items():
-            if piece['type'] == 'General' and piece['color'] == color:
-                general_pos = pos
-                break
+        """檢查指定顏色是否被將軍
         
+        使用內建驗證器的棋種從將帥位置向外反查：直線上的車、炮（隔一子）與照面的將帥，
+        馬位（檢查蹩腳）、象位、士位與兵卒位，每次檢查的成本有固定上限。
+        反查在含哨兵的陣列上以索引位移進行（字典棋盤經 board_squares 轉接）。
+        換成自訂驗證器的棋種（含擴充棋種）不套用內建規則，改為逐一以其 is_valid_move
+        檢查對方該種棋子能否走到將帥位置；沒有驗證器的棋種不能將軍。
+        """
+        general_pos = self.engine.find_general(color)
         if general_pos is None:
             return False
         
-        # 檢查是否有對方棋子可以攻擊到將軍
         opponent_color = 'Black' if color == 'Red' else 'Red'
-        for pos, piece in self.engine.board.items():
-            if piece['color'] == opponent_color:
-                # 檢查這個對方棋子是否可以移動到將軍位置
-                validator = self.engine.validators.get(piece['type'])
-                if validator and validator.is_valid_move(
-                    self.engine.board, pos[0], pos[1], 
-                    general_pos[0], general_pos[1], piece
-                ):
+        board = self.engine.board
+        validators = self.engine.validators
+        builtin = self.builtin_types()
+        if len(builtin) != len(validators) and self._custom_rules_give_check(
+                board, validators, builtin, opponent_color, general_pos):
+            return True
+        
+        squares = board_squares(board)
+        origin = MAILBOX_INDEX[general_pos]
+        # 不使用內建規則的棋種以 None 表示，不會與任何格子相符
+        rook = PIECE_CODES[(opponent_color, 'Rook')] if 'Rook' in builtin else None
+        cannon = PIECE_CODES[(opponent_color, 'Cannon')] if 'Cannon' in builtin else None
+        general = PIECE_CODES[(opponent_color, 'General')] if 'General' in builtin else None
+        horse = PIECE_CODES[(opponent_color, 'Horse')] if 'Horse' in builtin else None
+        
+        # 直線：第一個棋子為車（或同列的將帥照面），第二個棋子為炮
+        for delta in ORTHOGONAL_DELTAS:
+            index = origin + delta
+            while squares[index] == EMPTY:
+                index += delta
+            code = squares[index]
+            if code == rook or (code == general and abs(delta) == MAILBOX_WIDTH):
+                return True
+            if code == OFFBOARD:
+                continue
+            index += delta
+            while squares[index] == EMPTY:
+                index += delta
+            if squares[index] == cannon:
+                return True
+        
+        # 馬：馬腳位於馬旁、朝將帥方向的長邊上
+        for leg_delta, delta in HorseMoveValidator.mailbox_jumps:
+            if squares[origin + delta] == horse and squares[origin + delta - leg_delta] == EMPTY:
+                return True
+        
+        # 其餘固定位移棋子：候選位置有對方棋子時交由驗證器的陣列規則判斷
+        for piece_type, deltas in self._SHORT_RANGE_DELTAS:
+            if piece_type not in builtin:
+                continue
+            validator = validators[piece_type]
+            code = PIECE_CODES[(opponent_color, piece_type)]
+            for delta in deltas:
+                attacker = origin + delta
+                if squares[attacker] == code and origin in validator.indexed_targets(squares, attacker, PIECES[code]):
                     return True
         
         return False
     
+    @staticmethod
+    def _custom_rules_give_check(board, validators, builtin, opponent_color, general_pos):
+        """對方使用自訂驗證器的棋子中，是否有任何一個能走到將帥位置"""
+        for (row, col), piece in list(board.items()):
+            piece_type = piece['type']
+            if piece['color'] == opponent_color and piece_type in validators and piece_type not in builtin:
+                if validators[piece_type].is_valid_move(board, row, col, *general_pos, piece):
+                    return True
+        return False
+    
+    def exposure_squares(self, color):
+        """回傳移動起點或終點落在其中才可能讓己方被將軍的格子集合（每個局面計算一次）
+        
+        包含將帥所在格、直線上車與照面將帥之前至多一子的範圍（牽制）、
+        炮之前至多兩子的範圍（炮架被移走，或落子成為新炮架）、對方馬的馬腳與對方象的象眼。
+        起點與終點都不在集合內的非將帥移動不改變任何攻擊線，不必試走即為合法。
+        已被將軍、任何棋種使用自訂驗證器，或對方將帥橫向緊鄰時回傳 None，表示每步都需試走。
+        """
+        general_pos = self.engine.find_general(color)
+        if general_pos is None:
+            return frozenset()
+        if len(self.builtin_types()) != len(self.engine.validators):
+            return None
+        if self.is_in_check(color):
+            return None
+        
+        opponent_color = 'Black' if color == 'Red' else 'Red'
+        squares = board_squares(self.engine.board)
+        origin = MAILBOX_INDEX[general_pos]
+        rook = PIECE_CODES[(opponent_color, 'Rook')]
+        cannon = PIECE_CODES[(opponent_color, 'Cannon')]
+        general = PIECE_CODES[(opponent_color, 'General')]
+        horse = PIECE_CODES[(opponent_color, 'Horse')]
+        elephant = PIECE_CODES[(opponent_color, 'Elephant')]
+        exposed = {general_pos}
+        
+        # 直線：一步最多讓其間棋子數增減一，車與將帥需 0 子、炮需恰好 1 子才構成將軍
+        for delta in ORTHOGONAL_DELTAS:
+            index = origin + delta
+            steps = 0
+            reach = 0
+            between = 0
+            while between < 3 and squares[index] != OFFBOARD:
+                steps += 1
+                code = squares[index]
+                if code != EMPTY:
+                    if code == cannon or (between < 2 and (
+                            code == rook or (code == general and abs(delta) == MAILBOX_WIDTH))):
+                        reach = steps
+                    elif code == general and steps == 1:
+                        # 橫向緊鄰的將帥由驗證器判斷，結果與直行上的棋子有關
+                        return None
+                    between += 1
+                index += delta
+            exposed.update(MAILBOX_SQUARES[origin + delta * step] for step in range(1, reach + 1))
+        
+        # 馬腳與象眼上的棋子移走後，對方的馬或象即可攻擊將帥
+        for leg_delta, delta in HorseMoveValidator.mailbox_jumps:
+            if squares[origin + delta] == horse:
+                exposed.add(MAILBOX_SQUARES[origin + delta - leg_delta])
+        for eye_delta in DIAGONAL_DELTAS:
+            if squares[origin + 2 * eye_delta] == elephant:
+                exposed.add(MAILBOX_SQUARES[origin + eye_delta])
+        return exposed
+    
+    def iter_legal_moves(self, color):
+        """逐一產生指定顏色的合法移動
+        
+        只有將帥的移動與觸及 exposure_squares 的移動以試走驗證，其餘直接判定為合法。
+        """
+        engine = self.engine
+        board = engine.board
+        squares = self.exposure_squares(color)
+        last_from = None
+        for move in engine.iter_pseudo_legal_moves(color):
+            from_pos = move[:2]
+            to_pos = move[2:]
+            if from_pos != last_from:
+                # 同一棋子的移動連續產生，起點是否需試走每個棋子只判斷一次
+                last_from = from_pos
+                free_origin = (squares is not None and from_pos not in squares
+                               and board[from_pos]['type'] != 'General')
+            if free_origin and to_pos not in squares:
+                yield move
+            elif self._is_move_safe(from_pos, to_pos, color):
+                yield move
+    
     def has_legal_moves(self, color):
         """檢查指定顏色是否還有合法移動"""
-        for pos, piece in self.engine.board.items():
-            if piece['color'] == color:
-                # 嘗試該棋子的所有可能移動
-                for target_row in range(1, 11):
-                    for target_col in range(1, 10):
-                        if (target_row, target_col) != pos:
-                            # 模擬移動並檢查是否合法且不會讓自己被將軍
-                            if self._is_move_safe(pos, (target_row, target_col), piece):
-                                return True
+        for _ in self.iter_legal_moves(color):
+            return True
         return False
     
-    def _is_move_safe(self, from_pos, to_pos, piece):
-        """檢查移動是否安全（移動後不會被將軍）"""
-        # 備份原始狀態
-        original_board = self.engine.board.copy()
-        original_game_result = self.engine.game_result
-        
+    def _is_move_safe(self, from_pos, to_pos, color):
+        """檢查已通過驗證的移動是否安全（移動後不會被將軍）"""
+        self.engine.make_move(from_pos[0], from_pos[1], to_pos[0], to_pos[1])
         try:
-            # 嘗試移動
-            move_successful = self.engine.move_piece(
-                from_pos[0], from_pos[1], to_pos[0], to_pos[1]
-            )
-            
-            if not move_successful:
-                return False
-            
-            # 檢查移動後是否被將軍
-            is_safe = not self.is_in_check(piece['color'])
-            
-            return is_safe
+            return not self.is_in_check(color)
         finally:
-            # 恢復原始狀態
-            self.engine.board = original_board
-            self.engine.game_result = original_game_result
+            self.engine.unmake_move()
     
     def detect_checkmate(self, color):
         """檢查是否為將死"""
         return self.is_in_check(color) and not self.has_legal_moves(color)
 
+def _on_board(row, col):
+    """檢查座標是否在棋盤內"""
+    return 1 <= row <= 10 and 1 <= col <= 9
+
 class MoveValidator(ABC):
     """移動驗證器的抽象基類"""
     
+    # 固定位移棋子的候選位移，子類別覆寫即可使用預設的 generate_moves
+    offsets = None
+    
     @abstractmethod
     def is_valid_move(self, board, from_row, from_col, to_row, to_col, piece):
         """驗證移動是否合法"""
         pass
+    
+    def generate_moves(self, board, from_row, from_col, piece):
+        """產生該棋子所有可到達的目標位置（不檢查己方棋子與將軍）"""
+        destinations = DESTINATION_TABLES.get((type(self), piece['color']))
+        if destinations is not None:
+            # 內建驗證器：只驗證預先算好的幾何可能目標
+            candidates = destinations[square_index(from_row, from_col)]
+        elif self.offsets is None:
+            # 未提供位移表的擴充棋子：退回逐格驗證
+            candidates = (
+                (row, col) for row in range(1, 11) for col in range(1, 10)
+                if (row, col) != (from_row, from_col)
+            )
+        else:
+            candidates = (
+                (from_row + row_step, from_col + col_step)
+                for row_step, col_step in self.offsets
+                if _on_board(from_row + row_step, from_col + col_step)
+            )
+        for to_row, to_col in candidates:
+            if self.is_valid_move(board, from_row, from_col, to_row, to_col, piece):
+                yield to_row, to_col
+    
+    def mailbox_targets(self, squares, origin, piece):
+        """在含哨兵的陣列上產生目標索引（不檢查己方棋子與將軍）
+        
+        預設以 generate_moves 轉接（陣列以 MailboxBoard.wrap 包裝），自訂驗證器不必覆寫。
+        """
+        from_row, from_col = MAILBOX_SQUARES[origin]
+        for to_square in self.generate_moves(MailboxBoard.wrap(squares), from_row, from_col, piece):
+            yield MAILBOX_INDEX[to_square]
 
-class CannonMoveValidator(MoveValidator):
-    """炮的移動驗證器"""
+ORTHOGONAL_STEPS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+DIAGONAL_STEPS = ((1, 1), (1, -1), (-1, 1), (-1, -1))
+ORTHOGONAL_DELTAS = tuple(mailbox_delta(row_step, col_step) for row_step, col_step in ORTHOGONAL_STEPS)
+DIAGONAL_DELTAS = tuple(mailbox_delta(row_step, col_step) for row_step, col_step in DIAGONAL_STEPS)
+# 九宮格的陣列索引
+PALACE_INDICES = {
+    'Red': frozenset(mailbox_index(row, col) for row in range(1, 4) for col in range(4, 7)),
+    'Black': frozenset(mailbox_index(row, col) for row in range(8, 11) for col in range(4, 7)),
+}
+
+class IndexedMoveValidator(MoveValidator):
+    """內建棋種的驗證器：走法規則只寫在 indexed_targets
+    
+    indexed_targets 在含哨兵的陣列上以索引位移產生目標，遇到 OFFBOARD 即為出界；
+    is_valid_move、generate_moves 與 mailbox_targets 都由它轉接，字典棋盤先經 board_squares 轉為陣列。
+    子類別若只覆寫 is_valid_move，則改以覆寫後的規則逐一驗證候選目標。
+    """
+    
+    @abstractmethod
+    def indexed_targets(self, squares, origin, piece):
+        """產生目標格的陣列索引（不檢查己方棋子與將軍）"""
+    
+    def _overrides_rules(self):
+        return type(self).is_valid_move is not IndexedMoveValidator.is_valid_move
     
     def is_valid_move(self, board, from_row, from_col, to_row, to_col, piece):
-        # 檢查是否為直線移動（橫向或縱向）
-        row_diff = abs(to_row - from_row)
-        col_diff = abs(to_col - from_col)
-        
-        # 必須是純橫向或純縱向移動
-        if not ((row_diff > 0 and col_diff == 0) or (row_diff == 0 and col_diff > 0)):
+        origin = MAILBOX_INDEX.get((from_row, from_col))
+        target = MAILBOX_INDEX.get((to_row, to_col))
+        if origin is None or target is None:
             return False
-        
-        # 檢查目標位置是否有棋子
-        target_has_piece = (to_row, to_col) in board
-        
-        if target_has_piece:
-            # 攻擊模式：必須跳過恰好一個炮台
-            return self._is_valid_attack(board, from_row, from_col, to_row, to_col)
-        else:
-            # 移動模式：路徑必須暢通（像車一樣）
-            return self._is_path_clear(board, from_row, from_col, to_row, to_col)
-    
-    def _is_path_clear(self, board, from_row, from_col, to_row, to_col):
-        """檢查路徑上是否有棋子阻擋（移動模式）"""
-        # 計算移動方向
-        row_step = 0 if from_row == to_row else (1 if to_row > from_row else -1)
-        col_step = 0 if from_col == to_col else (1 if to_col > from_col else -1)
-        
-        # 檢查路徑上的每一格（不包括起點和終點）
-        current_row = from_row + row_step
-        current_col = from_col + col_step
-        
-        while (current_row, current_col) != (to_row, to_col):
-            if (current_row, current_col) in board:
-                return False  # 路徑被阻擋
-            current_row += row_step
-            current_col += col_step
-        
-        return True  # 路徑暢通
-    
-    def _is_valid_attack(self, board, from_row, from_col, to_row, to_col):
-        """檢查是否為有效的攻擊（必須跳過恰好一個炮台）"""
-        # 計算移動方向
-        row_step = 0 if from_row == to_row else (1 if to_row > from_row else -1)
-        col_step = 0 if from_col == to_col else (1 if to_col > from_col else -1)
-        
-        # 計算路徑上的棋子數量
-        screen_count = 0
-        current_row = from_row + row_step
-        current_col = from_col + col_step
-        
-        while (current_row, current_col) != (to_row, to_col):
-            if (current_row, current_col) in board:
-                screen_count += 1
-            current_row += row_step
-            current_col += col_step
-        
-        # 攻擊時必須跳過恰好一個炮台
-        return screen_count == 1
+        squares = board_squares(board)
+        if squares[origin] == OFFBOARD:
+            return False
+        return target in self.indexed_targets(squares, origin, piece)
+    
+    def generate_moves(self, board, from_row, from_col, piece):
+        if self._overrides_rules():
+            yield from super().generate_moves(board, from_row, from_col, piece)
+            return
+        for target in self.indexed_targets(board_squares(board), mailbox_index(from_row, from_col), piece):
+            yield MAILBOX_SQUARES[target]
+    
+    def mailbox_targets(self, squares, origin, piece):
+        if self._overrides_rules():
+            return super().mailbox_targets(squares, origin, piece)
+        return self.indexed_targets(squares, origin, piece)
+
+class CannonMoveValidator(IndexedMoveValidator):
+    """炮的移動驗證器"""
+    
+    def indexed_targets(self, squares, origin, piece):
+        # 沿四個方向：炮台前的空格可走，炮台後第一個棋子可吃
+        for delta in ORTHOGONAL_DELTAS:
+            index = origin + delta
+            while squares[index] == EMPTY:
+                yield index
+                index += delta
+            if squares[index] == OFFBOARD:
+                continue
+            # 跳過炮台，第一個棋子為攻擊目標
+            index += delta
+            while squares[index] == EMPTY:
+                index += delta
+            if squares[index] != OFFBOARD:
+                yield index
 
-class ElephantMoveValidator(MoveValidator):
+class ElephantMoveValidator(IndexedMoveValidator):
     """象的移動驗證器"""
     
-    def is_valid_move(self, board, from_row, from_col, to_row, to_col, piece):
-        # 檢查是否為「田」字形移動（恰好對角線2格）
-        row_diff = abs(to_row - from_row)
-        col_diff = abs(to_col - from_col)
-        
-        # 必須是恰好2x2的對角線移動
-        if row_diff != 2 or col_diff != 2:
-            return False
-        
-        # 檢查不能過河（紅方象不能超過第5行）
-        color = piece['color']
-        if color == 'Red' and to_row > 5:
-            return False  # 紅方象不能過河
-        if color == 'Black' and to_row < 6:
-            return False  # 黑方象不能過河
-        
-        # 檢查中心點是否被阻擋（田字的中心）
-        mid_row = (from_row + to_row) // 2
-        mid_col = (from_col + to_col) // 2
-        
-        if (mid_row, mid_col) in board:
-            return False  # 中心點被阻擋
-        
-        return True
+    offsets = ((2, 2), (2, -2), (-2, 2), (-2, -2))
+    
+    def indexed_targets(self, squares, origin, piece):
+        # 「田」字形移動：象眼（田字中心）不能被阻擋，且不能過河（紅方象不能超過第5行）
+        red = piece['color'] == 'Red'
+        for eye_delta in DIAGONAL_DELTAS:
+            target = origin + 2 * eye_delta
+            if squares[origin + eye_delta] != EMPTY or squares[target] == OFFBOARD:
+                continue
+            if (MAILBOX_ROWS[target] <= 5) == red:
+                yield target
 
-class SoldierMoveValidator(MoveValidator):
+class SoldierMoveValidator(IndexedMoveValidator):
     """兵/卒的移動驗證器"""
     
-    def is_valid_move(self, board, from_row, from_col, to_row, to_col, piece):
+    offsets = ORTHOGONAL_STEPS
+    
+    def indexed_targets(self, squares, origin, piece):
         color = piece['color']
-        
-        # 計算移動距離
-        row_diff = to_row - from_row
-        col_diff = abs(to_col - from_col)
-        
-        # 只能移動一格：縱向一格或橫向一格，但不能斜行
-        if not ((abs(row_diff) == 1 and col_diff == 0) or (abs(row_diff) == 0 and col_diff == 1)):
-            return False
-        
-        # 檢查是否已過河
-        has_crossed_river = self._has_crossed_river(from_row, color)
-        
-        if not has_crossed_river:
-            # 過河前：只能向前移動，不能橫移
-            if col_diff != 0:
-                return False  # 不能橫移
-            
-            # 檢查是否向前移動
-            if color == 'Red':
-                return row_diff == -1  # 紅方向上（減少行數）
-            else:
-                return row_diff == 1   # 黑方向下（增加行數）
-        else:
-            # 過河後：可以向前或橫移，但不能後退
-            if col_diff > 1:
-                return False  # 橫移只能一格
-            
-            if col_diff == 0:
-                # 縱向移動：必須向前
-                if color == 'Red':
-                    return row_diff == -1  # 紅方向上
-                else:
-                    return row_diff == 1   # 黑方向下
-            else:
-                # 橫向移動：不能有縱向移動
-                return row_diff == 0
+        # 只能向前一格（紅方向上，減少行數；黑方向下，增加行數）；過河後可橫移一格，不能後退
+        forward = -MAILBOX_WIDTH if color == 'Red' else MAILBOX_WIDTH
+        deltas = (forward, 1, -1) if self._has_crossed_river(MAILBOX_ROWS[origin], color) else (forward,)
+        for delta in deltas:
+            if squares[origin + delta] != OFFBOARD:
+                yield origin + delta
     
     def _has_crossed_river(self, row, color):
         """檢查兵是否已過河"""
@@ -239,193 +378,252 @@ class SoldierMoveValidator(MoveValidator):
         else:
             return row <= 5  # 黑方：5行以下算過河
 
-class HorseMoveValidator(MoveValidator):
+class HorseMoveValidator(IndexedMoveValidator):
     """馬的移動驗證器"""
     
-    def is_valid_move(self, board, from_row, from_col, to_row, to_col, piece):
-        # 檢查是否為「日」字型移動
-        row_diff = abs(to_row - from_row)
-        col_diff = abs(to_col - from_col)
-        
-        # 必須是 2+1 或 1+2 的 L 形移動
-        if not ((row_diff == 2 and col_diff == 1) or (row_diff == 1 and col_diff == 2)):
-            return False
-        
-        # 檢查是否被腳點阻擋（蹩馬腳）
-        return self._is_not_blocked(board, from_row, from_col, to_row, to_col)
+    offsets = ((2, 1), (2, -1), (-2, 1), (-2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2))
+    # (馬腳索引差, 目標索引差)：馬腳在長邊方向緊鄰起點的一格
+    mailbox_jumps = tuple(
+        (mailbox_delta(row_step // 2, 0) if abs(row_step) == 2 else mailbox_delta(0, col_step // 2),
+         mailbox_delta(row_step, col_step))
+        for row_step, col_step in offsets
+    )
     
-    def _is_not_blocked(self, board, from_row, from_col, to_row, to_col):
-        """檢查馬腳是否被阻擋"""
-        row_diff = to_row - from_row
-        col_diff = to_col - from_col
-        
-        # 確定腳點位置
-        if abs(row_diff) == 2:
-            # 水平移動2格，腳點在水平方向
-            leg_row = from_row + (1 if row_diff > 0 else -1)
-            leg_col = from_col
-        else:
-            # 垂直移動2格，腳點在垂直方向
-            leg_row = from_row
-            leg_col = from_col + (1 if col_diff > 0 else -1)
-        
-        # 檢查腳點是否有棋子
-        return (leg_row, leg_col) not in board
+    def indexed_targets(self, squares, origin, piece):
+        # 「日」字型移動，馬腳有棋子時被阻擋（蹩馬腳）
+        for leg_delta, delta in self.mailbox_jumps:
+            if squares[origin + leg_delta] == EMPTY and squares[origin + delta] != OFFBOARD:
+                yield origin + delta
 
-class RookMoveValidator(MoveValidator):
+class RookMoveValidator(IndexedMoveValidator):
     """車的移動驗證器"""
     
-    def is_valid_move(self, board, from_row, from_col, to_row, to_col, piece):
-        # 檢查是否為直線移動（橫向或縱向）
-        row_diff = abs(to_row - from_row)
-        col_diff = abs(to_col - from_col)
-        
-        # 必須是純橫向或純縱向移動
-        if not ((row_diff > 0 and col_diff == 0) or (row_diff == 0 and col_diff > 0)):
-            return False
-        
-        # 檢查路徑上是否有棋子阻擋
-        return self._is_path_clear(board, from_row, from_col, to_row, to_col)
-    
-    def _is_path_clear(self, board, from_row, from_col, to_row, to_col):
-        """檢查路徑上是否有棋子阻擋"""
-        # 計算移動方向
-        row_step = 0 if from_row == to_row else (1 if to_row > from_row else -1)
-        col_step = 0 if from_col == to_col else (1 if to_col > from_col else -1)
-        
-        # 檢查路徑上的每一格（不包括起點和終點）
-        current_row = from_row + row_step
-        current_col = from_col + col_step
-        
-        while (current_row, current_col) != (to_row, to_col):
-            if (current_row, current_col) in board:
-                return False  # 路徑被阻擋
-            current_row += row_step
-            current_col += col_step
-        
-        return True  # 路徑暢通
+    def indexed_targets(self, squares, origin, piece):
+        # 沿四個方向直到遇到第一個棋子（含該格）或哨兵
+        for delta in ORTHOGONAL_DELTAS:
+            index = origin + delta
+            while squares[index] == EMPTY:
+                yield index
+                index += delta
+            if squares[index] != OFFBOARD:
+                yield index
 
-class GuardMoveValidator(MoveValidator):
+class GuardMoveValidator(IndexedMoveValidator):
     """士/仕的移動驗證器"""
     
-    def is_valid_move(self, board, from_row, from_col, to_row, to_col, piece):
-        # 檢查是否在九宮格內
-        if piece['color'] == 'Red':
-            # 紅方九宮格：行 1-3，列 4-6
-            if not (1 <= to_row <= 3 and 4 <= to_col <= 6):
-                return False
-        else:
-            # 黑方九宮格：行 8-10，列 4-6
-            if not (8 <= to_row <= 10 and 4 <= to_col <= 6):
-                return False
-        
-        # 檢查移動距離（只能移動一格對角線）
-        row_diff = abs(to_row - from_row)
-        col_diff = abs(to_col - from_col)
-        
-        # 只能斜行移動一格
-        if row_diff == 1 and col_diff == 1:
-            return True
-        
-        return False
+    offsets = DIAGONAL_STEPS
+    
+    def indexed_targets(self, squares, origin, piece):
+        # 只能在九宮格內斜行一格
+        palace = PALACE_INDICES[piece['color']]
+        for delta in DIAGONAL_DELTAS:
+            if origin + delta in palace:
+                yield origin + delta
 
-class GeneralMoveValidator(MoveValidator):
+class GeneralMoveValidator(IndexedMoveValidator):
     """將/帥的移動驗證器"""
     
-    def is_valid_move(self, board, from_row, from_col, to_row, to_col, piece):
-        # 檢查是否在九宮格內
-        if piece['color'] == 'Red':
-            # 紅方九宮格：行 1-3，列 4-6
-            if not (1 <= to_row <= 3 and 4 <= to_col <= 6):
-                return False
-        else:
-            # 黑方九宮格：行 8-10，列 4-6
-            if not (8 <= to_row <= 10 and 4 <= to_col <= 6):
-                return False
-        
-        # 檢查移動距離（只能移動一格）
-        row_diff = abs(to_row - from_row)
-        col_diff = abs(to_col - from_col)
-        
-        # 只能直行或直列移動一格
-        if not ((row_diff == 1 and col_diff == 0) or (row_diff == 0 and col_diff == 1)):
-            return False
-        
-        # 檢查將帥照面規則：模擬移動後檢查是否會造成將帥照面
-        if self._would_cause_generals_face_to_face(board, from_row, from_col, to_row, to_col, piece):
-            return False
-        
-        return True
+    offsets = ORTHOGONAL_STEPS
     
-    def _would_cause_generals_face_to_face(self, board, from_row, from_col, to_row, to_col, piece):
-        """檢查移動後是否會造成將帥照面"""
-        # 建立移動後的臨時棋盤狀態
-        temp_board = board.copy()
-        
-        # 移除原位置的棋子
-        if (from_row, from_col) in temp_board:
-            del temp_board[(from_row, from_col)]
-        
-        # 在新位置放置棋子
-        temp_board[(to_row, to_col)] = piece
-        
-        # 找到兩個將帥的位置
-        red_general_pos = None
-        black_general_pos = None
-        
-        for pos, p in temp_board.items():
-            if p['type'] == 'General':
-                if p['color'] == 'Red':
-                    red_general_pos = pos
-                elif p['color'] == 'Black':
-                    black_general_pos = pos
-        
-        # 如果沒有找到兩個將帥，就不會照面
-        if red_general_pos is None or black_general_pos is None:
-            return False
-        
-        red_row, red_col = red_general_pos
-        black_row, black_col = black_general_pos
-        
-        # 檢查是否在同一列
-        if red_col != black_col:
-            return False
-        
-        # 檢查同一列中間是否有其他棋子
-        start_row = min(red_row, black_row) + 1
-        end_row = max(red_row, black_row)
-        
-        for check_row in range(start_row, end_row):
-            if (check_row, red_col) in temp_board:
-                return False  # 中間有棋子，不會照面
-        
-        return True  # 會照面
+    def indexed_targets(self, squares, origin, piece):
+        # 只能在九宮格內直行或橫行一格，且移動後不能與對方將帥照面
+        palace = PALACE_INDICES[piece['color']]
+        opponent_general = PIECE_CODES[('Black' if piece['color'] == 'Red' else 'Red', 'General')]
+        for delta in ORTHOGONAL_DELTAS:
+            target = origin + delta
+            if target not in palace:
+                continue
+            # 沿目標直行上下找第一個棋子（原位置視為已空出）
+            for step in (MAILBOX_WIDTH, -MAILBOX_WIDTH):
+                index = target + step
+                while index == origin or squares[index] == EMPTY:
+                    index += step
+                if squares[index] == opponent_general:
+                    break
+            else:
+                yield target
+
+DEFAULT_VALIDATOR_CLASSES = {
+    'General': GeneralMoveValidator,
+    'Guard': GuardMoveValidator,
+    'Rook': RookMoveValidator,
+    'Horse': HorseMoveValidator,
+    'Cannon': CannonMoveValidator,
+    'Elephant': ElephantMoveValidator,
+    'Soldier': SoldierMoveValidator,
+}
+
+def has_builtin_rules(validator, piece_type):
+    """驗證器是否為該棋種的內建類別（可直接在陣列上呼叫 indexed_targets）"""
+    return validator is not None and type(validator) is DEFAULT_VALIDATOR_CLASSES.get(piece_type)
+
+# (驗證器類別, 顏色) -> 依緊湊索引排列、各起點在空棋盤上可到達的目標格 frozenset
+# 棋子只會擋路（炮吃子也落在同一直線上），所以空棋盤的目標是任何局面的上界
+DESTINATION_TABLES = {}
+
+def build_destination_tables():
+    """建立內建驗證器的目標格表，每個行程只建立一次"""
+    if not DESTINATION_TABLES:
+        tables = {}
+        for piece_type, validator_class in DEFAULT_VALIDATOR_CLASSES.items():
+            validator = validator_class()
+            for color in ('Red', 'Black'):
+                piece = get_piece(color, piece_type)
+                tables[(validator_class, color)] = tuple(
+                    frozenset(validator.generate_moves({(row, col): piece}, row, col, piece))
+                    for row, col in map(square_from_index, range(90))
+                )
+        # 建立期間表為空，generate_moves 使用位移表；完成後一次放入
+        DESTINATION_TABLES.update(tables)
+    return DESTINATION_TABLES
+
+# 底線棋子排列（第 1 列到第 9 列）
+BACK_RANK = ('Rook', 'Horse', 'Elephant', 'Guard', 'General', 'Guard', 'Elephant', 'Horse', 'Rook')
+
+# 每一步的長將／長捉旗標（move_piece 判定重複局面時才為循環內各步計算）
+GAVE_CHECK = 1
+CHASED = 2
+# 同一局面出現此次數時依長將、長捉規則判定結果
+REPETITION_LIMIT = 3
+# 長將、長捉皆不違規的重複局面
+DRAW_RESULT = "Draw"
 
 class ChessEngine:
-    def __init__(self):
-        self.board = {}
+    def __init__(self, board_backend='dict', zobrist_debug=False, eval_debug=False):
+        if board_backend not in BOARD_BACKENDS:
+            raise ValueError(f"未知的棋盤實作: {board_backend}")
+        # 'dict' 以 (row, col) 字典儲存；'mailbox' 以含哨兵的 bytearray 儲存
+        self.board_backend = board_backend
+        self.board = BOARD_BACKENDS[board_backend]()
         self.game_result = "Continue"
         self.validators = {
-            'General': GeneralMoveValidator(),
-            'Guard': GuardMoveValidator(),
-            'Rook': RookMoveValidator(),
-            'Horse': HorseMoveValidator(),
-            'Cannon': CannonMoveValidator(),
-            'Elephant': ElephantMoveValidator(),
-            'Soldier': SoldierMoveValidator()
+            piece_type: validator_class()
+            for piece_type, validator_class in DEFAULT_VALIDATOR_CLASSES.items()
         }
+        # 內建驗證器的目標格表：move_piece 的快速拒絕與走法產生共用
+        self.destination_tables = build_destination_tables()
         # OCP 擴展：組合將死檢查器和輪次管理器
         self.checkmate_detector = CheckmateDetector(self)
         self.turn_manager = TurnManager()
+        # make_move / unmake_move 的還原堆疊
+        self._undo_stack = []
+        # 棋盤部分的 Zobrist 鍵值（增量更新，輪次於 position_key 併入）
+        self._board_key = 0
+        # 除錯模式：每次取鍵值與 make/unmake 後都與從頭計算的結果比對
+        self.zobrist_debug = zobrist_debug
+        # 除錯模式：每次取分數與 make/unmake 後都與從頭計算的評估分數比對
+        self.eval_debug = eval_debug
+        # 子力與位置分數表，以及隨每次移動增量維護的紅方視角分數
+        self.evaluation_tables = DEFAULT_EVALUATION
+        self._eval_score = 0
+        # 延遲建立的搜尋器（保留置換表供後續搜尋使用）
+        self._searcher = None
+        # 各方將帥位置，隨每次移動更新
+        self.general_positions = {'Red': None, 'Black': None}
+        # 由 FEN 載入時的 (半回合計數, 回合數)，to_fen 依還原堆疊往後推算
+        self._fen_counters = (0, 1)
+        # 局面鍵值歷史（第 0 項為第一步之前的局面）與各鍵值出現次數，隨 make/unmake 維護
+        self.position_history = []
+        self._repetition_counts = {}
+        # 每一步的 GAVE_CHECK / CHASED 旗標，與還原堆疊一一對應（未計算前為 0）
+        self.ply_flags = []
+        # 以 open_book 開啟的開局庫（OpeningBook）
+        self.opening_book = None
+        # 殘局庫集合（TablebaseSet），設定後搜尋會在殘局表涵蓋的局面直接取用結果
+        self.tablebases = None
+        # legal_destinations 使用的合法走法 LRU 快取，place_piece / setup_empty_board 時清除
+        self.legal_move_cache = LegalMoveCache()
         
     def setup_empty_board(self):
         """設置空棋盤"""
-        self.board = {}
+        self.board = BOARD_BACKENDS[self.board_backend]()
+        self._undo_stack = []
+        self._board_key = 0
+        self._eval_score = 0
+        self.legal_move_cache.clear()
+        self.general_positions = {'Red': None, 'Black': None}
+        self._fen_counters = (0, 1)
+        self.position_history = []
+        self._repetition_counts = {}
+        self.ply_flags = []
+        
+    def setup_initial_board(self):
+        """設置標準開局（紅方在第 1-4 行，黑方在第 7-10 行），輪到紅方"""
+        self.setup_empty_board()
+        self.game_result = "Continue"
+        self.turn_manager = TurnManager()
+        for col, piece_type in enumerate(BACK_RANK, start=1):
+            self.place_piece('Red', piece_type, 1, col)
+            self.place_piece('Black', piece_type, 10, col)
+        for col in (2, 8):
+            self.place_piece('Red', 'Cannon', 3, col)
+            self.place_piece('Black', 'Cannon', 8, col)
+        for col in (1, 3, 5, 7, 9):
+            self.place_piece('Red', 'Soldier', 4, col)
+            self.place_piece('Black', 'Soldier', 7, col)
         
     def place_piece(self, color, piece_type, row, col):
         """在指定位置放置棋子"""
-        self.board[(row, col)] = {'color': color, 'type': piece_type}
+        replaced_piece = self.board.get((row, col))
+        tables = self.evaluation_tables
+        if replaced_piece is not None:
+            self._board_key ^= piece_key(replaced_piece, row, col)
+            self._eval_score -= tables.piece_score(replaced_piece, row, col)
+        # 直接擺放棋子不經過走法規則，快取的合法走法可能不再成立
+        self.legal_move_cache.clear()
+        # 同種棋子共用同一個唯讀 Piece，不為每個棋子配置字典
+        piece = get_piece(color, piece_type)
+        self.board[(row, col)] = piece
+        self._board_key ^= piece_key(piece, row, col)
+        self._eval_score += tables.piece_score(piece, row, col)
+        if piece_type == 'General':
+            self.general_positions[color] = (row, col)
+    
+    def find_general(self, color):
+        """取得指定顏色將帥的位置（O(1)；棋盤被直接修改而失效時退回掃描）"""
+        position = self.general_positions.get(color)
+        if position is not None:
+            piece = self.board.get(position)
+            if piece is not None and piece['type'] == 'General' and piece['color'] == color:
+                return position
+        for position, piece in self.board.items():
+            if piece['type'] == 'General' and piece['color'] == color:
+                self.general_positions[color] = position
+                return position
+        self.general_positions[color] = None
+        return None
+    
+    def position_key(self):
+        """取得目前局面的 64 位元 Zobrist 鍵值（含輪次）"""
+        if self.zobrist_debug:
+            self._verify_position_key()
+        return self._board_key ^ side_key(self.turn_manager.current_turn)
+    
+    def _verify_position_key(self):
+        """除錯用：比對增量鍵值與從頭計算的鍵值"""
+        expected = compute_board_key(self.board)
+        if self._board_key != expected:
+            raise AssertionError(
+                f"Zobrist 鍵值不一致: 增量 {self._board_key:#018x}，重算 {expected:#018x}"
+            )
         
+    def evaluate(self, color='Red'):
+        """以指定顏色視角的局面分數（子力加位置分數），O(1) 取得增量維護的結果"""
+        if self.eval_debug:
+            self._verify_evaluation()
+        return self._eval_score if color == 'Red' else -self._eval_score
+    
+    def set_evaluation_tables(self, tables):
+        """更換評估表（例如 evaluation.load_tables 載入的調整值）並重新計算分數"""
+        self.evaluation_tables = tables
+        self._eval_score = tables.evaluate_board(self.board)
+    
+    def _verify_evaluation(self):
+        """除錯用：比對增量分數與從頭計算的分數"""
+        expected = self.evaluation_tables.evaluate_board(self.board)
+        if self._eval_score != expected:
+            raise AssertionError(f"評估分數不一致: 增量 {self._eval_score}，重算 {expected}")
+    
     def move_piece(self, from_row, from_col, to_row, to_col):
         """移動棋子，使用策略模式驗證移動合法性"""
         # 檢查起始位置是否有棋子
@@ -441,23 +639,25 @@ class ChessEngine:
             return False  # 不是該顏色的回合
         
         # 檢查目標位置是否有自己的棋子（不能吃自己的棋子）
-        captured_piece = None
         if (to_row, to_col) in self.board:
             target_piece = self.board[(to_row, to_col)]
             if target_piece['color'] == piece['color']:
                 return False  # 不能吃自己的棋子
-            captured_piece = target_piece
         
         # 獲取對應的驗證器
         if piece_type in self.validators:
             validator = self.validators[piece_type]
+            # 快速拒絕：目標不在預先算好的幾何可能目標內（自訂驗證器不適用）
+            destinations = self.destination_tables.get((type(validator), piece_color))
+            if destinations is not None and (to_row, to_col) not in destinations[square_index(from_row, from_col)]:
+                return False
             is_valid = validator.is_valid_move(self.board, from_row, from_col, to_row, to_col, piece)
             
             if is_valid:
-                # 執行移動
-                self._execute_move(from_row, from_col, to_row, to_col, captured_piece)
-                # OCP 擴展：記錄移動並切換輪次
-                self.turn_manager.record_move(piece_color)
+                # 執行移動並記錄輪次（可由 unmake_move 還原）
+                self.make_move(from_row, from_col, to_row, to_col)
+                if self.game_result == "Continue":
+                    self._adjudicate_repetition()
                 return True
             else:
                 return False
@@ -465,6 +665,378 @@ class ChessEngine:
         # 如果沒有對應的驗證器，返回 False 確保我們必須實現每個棋子的規則
         return False
     
+    def possible_destinations(self, row, col):
+        """指定位置棋子在空棋盤上可能到達的格子（供介面提示）；無棋子或自訂驗證器時回傳 None"""
+        piece = self.board.get((row, col))
+        if piece is None:
+            return None
+        validator = self.validators.get(piece['type'])
+        destinations = self.destination_tables.get((type(validator), piece['color']))
+        if destinations is None:
+            return None
+        return destinations[square_index(row, col)]
+    
+    def legal_moves_packed(self):
+        """輪到的一方的完整合法走法（pack_move 壓縮的 array('H')），經由 legal_move_cache 快取"""
+        if self.game_result != "Continue":
+            return pack_moves(())
+        key = self.position_key()
+        packed = self.legal_move_cache.get(key)
+        if packed is None:
+            packed = pack_moves(self.generate_legal_moves(self.turn_manager.current_turn))
+            self.legal_move_cache.put(key, packed)
+        return packed
+    
+    def legal_destinations(self, row, col):
+        """指定位置棋子目前可合法到達的格子（供介面提示）；無棋子或不是輪到的一方時為空列表"""
+        piece = self.board.get((row, col))
+        if piece is None or piece['color'] != self.turn_manager.current_turn:
+            return []
+        origin = square_index(row, col)
+        return [square_from_index(packed & 0x7F) for packed in self.legal_moves_packed() if packed >> 7 == origin]
+    
+    def repetition_count(self):
+        """目前局面在本局歷史中出現的次數（含目前這次）"""
+        if not self.position_history:
+            return 1
+        return self._repetition_counts.get(self.position_history[-1], 0)
+    
+    def _capturable_targets(self, row, col, piece):
+        """指定棋子可吃的對方棋子位置（不含將帥）"""
+        validator = self.validators.get(piece['type'])
+        if validator is None:
+            return set()
+        board = self.board
+        return {
+            target for target in validator.generate_moves(board, row, col, piece)
+            if target in board and board[target]['color'] != piece['color']
+            and board[target]['type'] != 'General'
+        }
+    
+    def _is_protected(self, attacker_square, target):
+        """假設攻擊者吃掉 target 後，對方能否吃回"""
+        defender = self.board[target]['color']
+        self.make_move(*attacker_square, *target)
+        try:
+            return any(move[2:] == target for move in self.iter_pseudo_legal_moves(defender))
+        finally:
+            self.unmake_move()
+    
+    def _move_flags(self, row, col, piece, chased_before):
+        """計算剛走完這步的旗標：是否將軍、是否新捉一個無根的子
+        
+        將帥與兵卒的捉子不算；只計算走動的棋子本身造成的捉子（不含閃擊）。
+        """
+        opponent = 'Black' if piece['color'] == 'Red' else 'Red'
+        flags = 0
+        if self.checkmate_detector.is_in_check(opponent):
+            flags |= GAVE_CHECK
+        if piece['type'] not in ('General', 'Soldier'):
+            for target in self._capturable_targets(row, col, piece) - chased_before:
+                if not self._is_protected((row, col), target):
+                    flags |= CHASED
+                    break
+        return flags
+    
+    def _replay_with_flags(self, first_ply):
+        """退回到第 first_ply 步之前再逐步重走，途中計算每步的旗標
+        
+        旗標只在判定重複局面時需要，因此不在每次 move_piece 時計算。
+        """
+        replay = []
+        while len(self._undo_stack) > first_ply:
+            replay.append(self._undo_stack[-1][:4])
+            self.unmake_move()
+        for from_row, from_col, to_row, to_col in reversed(replay):
+            piece = self.board[(from_row, from_col)]
+            chased_before = self._capturable_targets(from_row, from_col, piece)
+            self.make_move(from_row, from_col, to_row, to_col)
+            self.ply_flags[-1] = self._move_flags(to_row, to_col, piece, chased_before)
+    
+    def _adjudicate_repetition(self):
+        """局面重複達 REPETITION_LIMIT 次時，依循環內各方的旗標設定 game_result
+        
+        循環內每步都將軍者為長將，每步都將軍或捉子者為長打；長將重於長打，
+        違規較重的一方判負，雙方相同（或皆未違規）則判和。
+        """
+        history = self.position_history
+        key = history[-1]
+        if self._repetition_counts[key] < REPETITION_LIMIT:
+            return
+        occurrences = 0
+        start = len(history) - 1
+        while occurrences < REPETITION_LIMIT:
+            if history[start] == key:
+                occurrences += 1
+            start -= 1
+        # history[i + 1] 是第 i 步之後的局面：循環包含第 start + 1 步到最後一步
+        self._replay_with_flags(start + 1)
+        severity = {}
+        for color in ('Red', 'Black'):
+            flags = [self.ply_flags[ply] for ply in range(start + 1, len(self.ply_flags))
+                     if self._undo_stack[ply][4]['color'] == color]
+            if flags and all(flag & GAVE_CHECK for flag in flags):
+                severity[color] = 2
+            elif flags and all(flag & (GAVE_CHECK | CHASED) for flag in flags):
+                severity[color] = 1
+            else:
+                severity[color] = 0
+        if severity['Red'] > severity['Black']:
+            self.game_result = "Black wins"
+        elif severity['Black'] > severity['Red']:
+            self.game_result = "Red wins"
+        else:
+            self.game_result = DRAW_RESULT
+    
+    def iter_pseudo_legal_moves(self, color):
+        """逐一產生指定顏色的偽合法移動 (from_row, from_col, to_row, to_col)
+        
+        偽合法移動符合棋子走法且不吃己方棋子，但不檢查移動後是否被將軍。
+        """
+        board = self.board
+        squares = board_squares(board)
+        own_bit = BLACK_BIT if color == 'Black' else 0
+        validators = self.validators
+        # 先取快照，呼叫端可在迭代途中模擬移動
+        origins = [(index, squares[index]) for index in BOARD_INDICES
+                   if squares[index] != EMPTY and squares[index] & BLACK_BIT == own_bit]
+        for origin, code in origins:
+            from_row, from_col = MAILBOX_SQUARES[origin]
+            # 擴充棋種沒有內建編碼，由棋盤取得棋子
+            piece = PIECES.get(code) or board[(from_row, from_col)]
+            validator = validators.get(piece['type'])
+            if validator is None:
+                continue
+            if has_builtin_rules(validator, piece['type']):
+                # 內建驗證器：直接在陣列上產生目標
+                for target in validator.indexed_targets(squares, origin, piece):
+                    target_code = squares[target]
+                    if target_code != EMPTY and target_code & BLACK_BIT == own_bit:
+                        continue
+                    yield (from_row, from_col) + MAILBOX_SQUARES[target]
+                continue
+            for to_row, to_col in validator.generate_moves(board, from_row, from_col, piece):
+                target_piece = board.get((to_row, to_col))
+                if target_piece is not None and target_piece['color'] == color:
+                    continue
+                yield from_row, from_col, to_row, to_col
+    
+    def generate_pseudo_legal_moves(self, color):
+        """產生指定顏色的所有偽合法移動"""
+        return list(self.iter_pseudo_legal_moves(color))
+    
+    def generate_legal_moves(self, color):
+        """產生指定顏色的所有合法移動（移動後不會被將軍）"""
+        return list(self.checkmate_detector.iter_legal_moves(color))
+    
+    def search(self, depth=None, movetime_ms=None, nodes=None, threads=1):
+        """為輪到的一方搜尋最佳移動，回傳 SearchResult（最佳移動、分數、主變例、每秒節點數）
+        
+        depth、movetime_ms、nodes 任一達到即停止；搜尋結束後局面保持不變。
+        threads 大於 1 時以 Lazy SMP 搜尋，各搜尋器共用一個置換表。
+        """
+        if threads > 1:
+            from .lazy_smp import LazySMPSearch
+            return LazySMPSearch(threads=threads).search(self, depth=depth, movetime_ms=movetime_ms, nodes=nodes)
+        if self._searcher is None:
+            from .search import Searcher
+            self._searcher = Searcher(self)
+        self._searcher.stop_event.clear()
+        return self._searcher.search(depth=depth, movetime_ms=movetime_ms, nodes=nodes)
+    
+    def solve_mate(self, moves, checks_only=True, node_limit=None, time_limit_ms=None):
+        """以證明數搜尋驗證輪到的一方能否在 moves 步內將死對方，回傳 MateResult
+        
+        checks_only 時攻方只考慮將軍的著法（連將殺）；搜尋結束後局面保持不變。
+        """
+        from .mate_solver import MateSolver
+        return MateSolver(self, checks_only, node_limit, time_limit_ms).solve(moves)
+    
+    def snapshot(self):
+        """輸出緊湊的局面快照 (90 位元組棋子編碼, 輪次, 上一手顏色, 遊戲結果)，供跨行程傳遞"""
+        squares = bytearray(90)
+        for (row, col), piece in self.board.items():
+            squares[square_index(row, col)] = piece_code(piece)
+        turn_manager = self.turn_manager
+        return bytes(squares), turn_manager.current_turn, turn_manager.last_moved, self.game_result
+    
+    @classmethod
+    def from_snapshot(cls, snapshot, board_backend='dict'):
+        """由 snapshot() 的結果重建引擎（使用預設驗證器）"""
+        squares, current_turn, last_moved, game_result = snapshot
+        engine = cls(board_backend=board_backend)
+        for index, code in enumerate(squares):
+            if code:
+                piece = PIECES[code]
+                row, col = square_from_index(index)
+                engine.place_piece(piece['color'], piece['type'], row, col)
+        engine.turn_manager.current_turn = current_turn
+        engine.turn_manager.last_moved = last_moved
+        engine.game_result = game_result
+        return engine
+    
+    @classmethod
+    def from_fen(cls, fen, board_backend='dict'):
+        """由象棋 FEN 建立引擎（黑方底線為第 10 行）"""
+        squares, current_turn, halfmove, fullmove = parse_fen(fen)
+        # 與實際走到此局面後 TurnManager 的狀態一致（record_move 之後 switch_turn 會再翻轉 last_moved）
+        if current_turn == 'Red' and fullmove <= 1:
+            last_moved = None
+        else:
+            last_moved = current_turn
+        engine = cls.from_snapshot((squares, current_turn, last_moved, "Continue"), board_backend)
+        engine._fen_counters = (halfmove, fullmove)
+        return engine
+    
+    def to_fen(self):
+        """輸出目前局面的象棋 FEN（計數由載入時的值加上之後的移動推算）"""
+        halfmove, fullmove = self._fen_counters
+        quiet_moves = 0
+        for entry in reversed(self._undo_stack):
+            if entry[5] is not None:
+                break
+            quiet_moves += 1
+        else:
+            quiet_moves += halfmove
+        fullmove += sum(1 for entry in self._undo_stack if entry[4]['color'] == 'Black')
+        return format_fen(self.snapshot()[0], self.turn_manager.current_turn, quiet_moves, fullmove)
+    
+    def to_bytes(self):
+        """將棋盤與輪次狀態編碼為固定 POSITION_BYTES 位元組（最多 32 子）"""
+        return encode_snapshot(self.snapshot())
+    
+    @classmethod
+    def from_bytes(cls, data, board_backend='dict'):
+        """由 to_bytes() 的結果重建引擎"""
+        return cls.from_snapshot(decode_snapshot(data), board_backend)
+    
+    def open_book(self, path):
+        """以 mmap 開啟開局庫檔案，供 book_moves 查詢"""
+        from .book import OpeningBook
+        if self.opening_book is not None:
+            self.opening_book.close()
+        self.opening_book = OpeningBook(path)
+        return self.opening_book
+    
+    def book_moves(self, book=None):
+        """查詢目前局面的開局庫移動，回傳依權重由高到低排序的 [(移動, 權重), ...]
+        
+        只回傳目前局面的合法移動，避免鍵值碰撞時給出不合法的建議。
+        """
+        book = book if book is not None else self.opening_book
+        if book is None or self.game_result != "Continue":
+            return []
+        entries = book.lookup(self.position_key())
+        if not entries:
+            return []
+        legal_moves = set(self.generate_legal_moves(self.turn_manager.current_turn))
+        candidates = [(move, weight) for move, weight, _ in entries if move in legal_moves]
+        candidates.sort(key=lambda candidate: -candidate[1])
+        return candidates
+    
+    def probe_tablebase(self):
+        """查詢殘局庫，回傳 (結果, 距離殺棋層數) 或 None；結果以輪到的一方為準"""
+        if self.tablebases is None or self.game_result != "Continue":
+            return None
+        return self.tablebases.probe(self.board, self.turn_manager.current_turn)
+    
+    def perft(self, depth):
+        """計算從目前局面走 depth 層的合法走法葉節點數（驗證走法產生器用）"""
+        if depth == 0:
+            return 1
+        if self.game_result != "Continue":
+            return 0
+        moves = self.generate_legal_moves(self.turn_manager.current_turn)
+        if depth == 1:
+            return len(moves)
+        nodes = 0
+        for move in moves:
+            self.make_move(*move)
+            nodes += self.perft(depth - 1)
+            self.unmake_move()
+        return nodes
+    
+    def divide(self, depth):
+        """回傳每個根移動各自的 perft(depth - 1) 數量，用於找出走法差異"""
+        counts = {}
+        for move in self.generate_legal_moves(self.turn_manager.current_turn):
+            self.make_move(*move)
+            counts[move] = self.perft(depth - 1)
+            self.unmake_move()
+        return counts
+    
+    def to_bitboards(self):
+        """建立目前局面的位元棋盤（BitboardPosition），供大量局面分析使用"""
+        from .bitboard import BitboardPosition
+        return BitboardPosition.from_board(self.board, self.turn_manager.current_turn)
+    
+    def make_move(self, from_row, from_col, to_row, to_col):
+        """低階執行移動（不驗證合法性），並推入還原紀錄
+        
+        還原紀錄為 (from_row, from_col, to_row, to_col, 移動棋子, 被吃棋子, 原 game_result,
+        原輪次, 原上一手, 原鍵值, 原評估分數) 共 11 個欄位，
+        供 unmake_move 精確還原；供將死檢查、搜尋等假設性移動使用。
+        """
+        board = self.board
+        piece = board[(from_row, from_col)]
+        captured_piece = board.get((to_row, to_col))
+        turn_manager = self.turn_manager
+        counts = self._repetition_counts
+        if not self._undo_stack:
+            # 第一步：以目前局面重新開始歷史
+            root_key = self._board_key ^ side_key(turn_manager.current_turn)
+            self.position_history = [root_key]
+            counts.clear()
+            counts[root_key] = 1
+            del self.ply_flags[:]
+        self._undo_stack.append((
+            from_row, from_col, to_row, to_col, piece, captured_piece,
+            self.game_result, turn_manager.current_turn, turn_manager.last_moved,
+            self._board_key, self._eval_score
+        ))
+        self._execute_move(from_row, from_col, to_row, to_col, captured_piece)
+        # OCP 擴展：記錄移動並切換輪次
+        turn_manager.record_move(piece['color'])
+        key = self._board_key ^ side_key(turn_manager.current_turn)
+        self.position_history.append(key)
+        counts[key] = counts.get(key, 0) + 1
+        self.ply_flags.append(0)
+        if self.zobrist_debug:
+            self._verify_position_key()
+        if self.eval_debug:
+            self._verify_evaluation()
+    
+    def unmake_move(self):
+        """還原最近一次 make_move"""
+        (from_row, from_col, to_row, to_col, piece, captured_piece,
+         game_result, current_turn, last_moved, board_key, eval_score) = self._undo_stack.pop()
+        key = self.position_history.pop()
+        counts = self._repetition_counts
+        if counts[key] == 1:
+            del counts[key]
+        else:
+            counts[key] -= 1
+        self.ply_flags.pop()
+        board = self.board
+        board[(from_row, from_col)] = piece
+        if captured_piece is None:
+            del board[(to_row, to_col)]
+        else:
+            board[(to_row, to_col)] = captured_piece
+            if captured_piece['type'] == 'General':
+                self.general_positions[captured_piece['color']] = (to_row, to_col)
+        if piece['type'] == 'General':
+            self.general_positions[piece['color']] = (from_row, from_col)
+        self.game_result = game_result
+        self.turn_manager.current_turn = current_turn
+        self.turn_manager.last_moved = last_moved
+        self._board_key = board_key
+        self._eval_score = eval_score
+        if self.zobrist_debug:
+            self._verify_position_key()
+        if self.eval_debug:
+            self._verify_evaluation()
+    
     def _execute_move(self, from_row, from_col, to_row, to_col, captured_piece):
         """執行移動並檢查勝利條件"""
         # 移動棋子
@@ -472,6 +1044,27 @@ class ChessEngine:
         del self.board[(from_row, from_col)]
         self.board[(to_row, to_col)] = piece
         
+        # 增量更新 Zobrist 鍵值
+        keys = ZOBRIST_KEYS.get((piece['color'], piece['type']))
+        if keys:
+            self._board_key ^= keys[square_index(from_row, from_col)] ^ keys[square_index(to_row, to_col)]
+        if captured_piece:
+            self._board_key ^= piece_key(captured_piece, to_row, to_col)
+        
+        # 增量更新評估分數（紅方視角）
+        tables = self.evaluation_tables
+        scores = tables.piece_values.get((piece['color'], piece['type']))
+        if scores:
+            self._eval_score += scores[square_index(to_row, to_col)] - scores[square_index(from_row, from_col)]
+        if captured_piece:
+            self._eval_score -= tables.piece_score(captured_piece, to_row, to_col)
+        
+        # 更新將帥位置
+        if piece['type'] == 'General':
+            self.general_positions[piece['color']] = (to_row, to_col)
+        elif captured_piece and captured_piece['type'] == 'General':
+            self.general_positions[captured_piece['color']] = None
+        
         # 檢查勝利條件
         if captured_piece and captured_piece['type'] == 'General':
             self.game_result = f"{piece['color']} wins"
@@ -0,0 +1,153 @@
+"""局面評估：子力價值加上各棋種的位置分數表 (piece-square tables)
+
+位置表以紅方視角撰寫：第一列為第 1 行（紅方底線），每列 9 格為第 1-9 欄；
+黑方使用上下鏡像（第 row 行對應紅方第 11 - row 行）的同一張表。
+EvaluationTables.piece_values 把子力與位置分數合併為每個 (顏色, 棋種) 90 格的
+分數，黑方取負值，ChessEngine 只需加減即可增量維護紅方視角的總分。
+"""
+
+import json
+
+from .board import COLORS, PIECE_CODES, PIECE_TYPES, as_piece, square_index
+
+DEFAULT_MATERIAL = {
+    'General': 0,
+    'Rook': 900,
+    'Cannon': 450,
+    'Horse': 400,
+    'Elephant': 200,
+    'Guard': 200,
+    'Soldier': 100,
+}
+
+_ZERO_TABLE = [[0] * 9 for _ in range(10)]
+
+DEFAULT_PIECE_SQUARE_TABLES = {
+    'General': [
+        [0, 0, 0, 5, 10, 5, 0, 0, 0],
+        [0, 0, 0, 0, 5, 0, 0, 0, 0],
+        [0, 0, 0, -5, -5, -5, 0, 0, 0],
+    ] + [[0] * 9 for _ in range(7)],
+    'Guard': [
+        [0, 0, 0, 0, 0, 0, 0, 0, 0],
+        [0, 0, 0, 0, 10, 0, 0, 0, 0],
+        [0, 0, 0, -5, 0, -5, 0, 0, 0],
+    ] + [[0] * 9 for _ in range(7)],
+    'Elephant': [
+        [0, 0, 0, 0, 0, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0, 0, 0, 0],
+        [-5, 0, 0, 0, 10, 0, 0, 0, -5],
+        [0, 0, 0, 0, 0, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0, 0, 0, 0],
+    ] + [[0] * 9 for _ in range(5)],
+    'Horse': [
+        [-10, -5, 0, 0, -5, 0, 0, -5, -10],
+        [-5, 0, 5, 5, -10, 5, 5, 0, -5],
+        [0, 5, 10, 10, 5, 10, 10, 5, 0],
+        [0, 5, 10, 15, 10, 15, 10, 5, 0],
+        [0, 10, 15, 15, 15, 15, 15, 10, 0],
+        [5, 15, 20, 20, 20, 20, 20, 15, 5],
+        [5, 15, 20, 25, 25, 25, 20, 15, 5],
+        [5, 20, 25, 30, 25, 30, 25, 20, 5],
+        [0, 10, 20, 15, 10, 15, 20, 10, 0],
+        [0, 0, 5, 5, 0, 5, 5, 0, 0],
+    ],
+    'Rook': [
+        [-5, 5, 0, 10, 0, 10, 0, 5, -5],
+        [5, 5, 5, 10, 5, 10, 5, 5, 5],
+        [0, 5, 5, 10, 10, 10, 5, 5, 0],
+        [5, 10, 10, 15, 15, 15, 10, 10, 5],
+        [10, 15, 15, 15, 20, 15, 15, 15, 10],
+        [10, 15, 15, 20, 20, 20, 15, 15, 10],
+        [10, 15, 15, 20, 20, 20, 15, 15, 10],
+        [10, 15, 15, 20, 20, 20, 15, 15, 10],
+        [15, 20, 20, 25, 25, 25, 20, 20, 15],
+        [10, 10, 10, 15, 15, 15, 10, 10, 10],
+    ],
+    'Cannon': [
+        [0, 0, 5, 10, 10, 10, 5, 0, 0],
+        [0, 5, 5, 5, 5, 5, 5, 5, 0],
+        [5, 5, 5, 5, 15, 5, 5, 5, 5],
+        [0, 0, 0, 5, 10, 5, 0, 0, 0],
+        [0, 0, 0, 5, 10, 5, 0, 0, 0],
+        [0, 5, 5, 5, 10, 5, 5, 5, 0],
+        [0, 5, 5, 5, 10, 5, 5, 5, 0],
+        [5, 5, 5, 10, 15, 10, 5, 5, 5],
+        [5, 10, 5, 5, 10, 5, 5, 10, 5],
+        [10, 10, 5, 0, 0, 0, 5, 10, 10],
+    ],
+    # 兵卒只依縱線給分：中路的兵較有用
+    'Soldier': [[0, 0, 5, 10, 15, 10, 5, 0, 0] for _ in range(10)],
+}
+
+def mirror_row(row):
+    """黑方使用紅方表時對應的行"""
+    return 11 - row
+
+class EvaluationTables:
+    """子力與位置分數表；piece_values[(顏色, 棋種)][緊湊索引] 為紅方視角的分數"""
+
+    def __init__(self, material=None, piece_square_tables=None):
+        self.material = dict(DEFAULT_MATERIAL)
+        self.material.update(material or {})
+        self.piece_square_tables = {piece_type: [list(row) for row in table]
+                                    for piece_type, table in DEFAULT_PIECE_SQUARE_TABLES.items()}
+        for piece_type, table in (piece_square_tables or {}).items():
+            self.piece_square_tables[piece_type] = _validated_table(piece_type, table)
+        self.piece_values = {}
+        for piece_type in self.material:
+            table = self.piece_square_tables.get(piece_type, _ZERO_TABLE)
+            value = self.material[piece_type]
+            for color in COLORS:
+                scores = [0] * 90
+                sign = 1 if color == 'Red' else -1
+                for row in range(1, 11):
+                    table_row = table[(row if color == 'Red' else mirror_row(row)) - 1]
+                    for col in range(1, 10):
+                        scores[square_index(row, col)] = sign * (value + table_row[col - 1])
+                self.piece_values[(color, piece_type)] = scores
+        # 依棋子編碼索引的同一份分數，供共用 Piece 直接查表
+        self._values_by_code = [None] * 16
+        for key, scores in self.piece_values.items():
+            self._values_by_code[PIECE_CODES[key]] = scores
+
+    def piece_score(self, piece, row, col):
+        """單一棋子對紅方視角總分的貢獻；未知棋種為 0"""
+        code = as_piece(piece).code
+        scores = self._values_by_code[code] if code is not None else None
+        return scores[square_index(row, col)] if scores else 0
+
+    def evaluate_board(self, board):
+        """從頭計算整個棋盤的紅方視角分數"""
+        return sum(self.piece_score(piece, row, col) for (row, col), piece in board.items())
+
+    def to_dict(self):
+        return {'material': dict(self.material), 'piece_square_tables': self.piece_square_tables}
+
+    def save(self, path):
+        """將表寫成 JSON 檔"""
+        with open(path, 'w', encoding='utf-8') as stream:
+            json.dump(self.to_dict(), stream, indent=1)
+
+def _validated_table(piece_type, table):
+    if piece_type not in PIECE_TYPES:
+        raise ValueError(f"位置表含未知棋種: {piece_type}")
+    if len(table) != 10 or any(len(row) != 9 for row in table):
+        raise ValueError(f"{piece_type} 的位置表必須為 10 列 x 9 欄")
+    return [[int(value) for value in row] for row in table]
+
+def load_tables(path):
+    """由 JSON 檔載入調整過的表：{"material": {...}, "piece_square_tables": {棋種: 10x9}}
+
+    未列出的棋種沿用預設值。
+    """
+    with open(path, encoding='utf-8') as stream:
+        data = json.load(stream)
+    material = data.get('material', {})
+    unknown = set(material) - set(PIECE_TYPES)
+    if unknown:
+        raise ValueError(f"子力表含未知棋種: {sorted(unknown)}")
+    return EvaluationTables({piece_type: int(value) for piece_type, value in material.items()},
+                            data.get('piece_square_tables', {}))
+
+DEFAULT_EVALUATION = EvaluationTables()
@@ -0,0 +1,153 @@
+"""象棋 FEN 文字格式與固定 32 位元組的二進位局面編碼
+
+FEN 由黑方底線（第 10 行）開始逐行列出到紅方底線（第 1 行），每行由第 1 欄到
+第 9 欄；紅方棋子大寫、黑方小寫，數字代表連續空格。
+"""
+
+from .board import PIECE_CODES, PIECES, square_from_index
+
+# 標準象棋 FEN 棋子字母（H/E 為部分軟體使用的馬、象別名，只在讀取時接受）
+FEN_LETTERS = {
+    'General': 'k',
+    'Guard': 'a',
+    'Elephant': 'b',
+    'Horse': 'n',
+    'Rook': 'r',
+    'Cannon': 'c',
+    'Soldier': 'p',
+}
+FEN_ALIASES = {'h': 'Horse', 'e': 'Elephant'}
+
+CODE_TO_LETTER = {}
+LETTER_TO_CODE = {}
+for (_color, _piece_type), _code in PIECE_CODES.items():
+    _letter = FEN_LETTERS[_piece_type]
+    _letter = _letter.upper() if _color == 'Red' else _letter
+    CODE_TO_LETTER[_code] = _letter
+    LETTER_TO_CODE[_letter] = _code
+for _letter, _piece_type in FEN_ALIASES.items():
+    LETTER_TO_CODE[_letter.upper()] = PIECE_CODES[('Red', _piece_type)]
+    LETTER_TO_CODE[_letter] = PIECE_CODES[('Black', _piece_type)]
+
+INITIAL_FEN = "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABNR w - - 0 1"
+
+SIDE_TO_MOVE = {'w': 'Red', 'r': 'Red', 'b': 'Black'}
+
+def parse_fen(fen):
+    """解析 FEN，回傳 (90 位元組棋子編碼, 輪到的一方, 半回合計數, 回合數)
+
+    缺少的輪次與計數欄位分別預設為紅方、0 與 1。
+    """
+    fields = fen.split()
+    if not fields:
+        raise ValueError("FEN 不可為空")
+    ranks = fields[0].split('/')
+    if len(ranks) != 10:
+        raise ValueError(f"FEN 必須有 10 行: {fen!r}")
+    squares = bytearray(90)
+    for rank_index, rank in enumerate(ranks):
+        # 第一行為第 10 行
+        index = (9 - rank_index) * 9
+        end = index + 9
+        for char in rank:
+            if char.isdigit():
+                index += int(char)
+            else:
+                code = LETTER_TO_CODE.get(char)
+                if code is None:
+                    raise ValueError(f"FEN 含未知棋子字母 {char!r}: {fen!r}")
+                if index >= end:
+                    raise ValueError(f"FEN 第 {rank_index + 1} 行超過 9 欄: {fen!r}")
+                squares[index] = code
+                index += 1
+        if index != end:
+            raise ValueError(f"FEN 第 {rank_index + 1} 行不是 9 欄: {fen!r}")
+
+    side = fields[1] if len(fields) > 1 else 'w'
+    if side not in SIDE_TO_MOVE:
+        raise ValueError(f"FEN 的輪次欄位不合法: {side!r}")
+    try:
+        halfmove = int(fields[4]) if len(fields) > 4 else 0
+        fullmove = int(fields[5]) if len(fields) > 5 else 1
+    except ValueError:
+        raise ValueError(f"FEN 的計數欄位不合法: {fen!r}") from None
+    return bytes(squares), SIDE_TO_MOVE[side], halfmove, fullmove
+
+def format_fen(squares, current_turn, halfmove=0, fullmove=1):
+    """將 90 位元組棋子編碼與輪次格式化為 FEN"""
+    ranks = []
+    for row in range(10, 0, -1):
+        rank = []
+        empty = 0
+        for code in squares[(row - 1) * 9:row * 9]:
+            if code:
+                if empty:
+                    rank.append(str(empty))
+                    empty = 0
+                rank.append(CODE_TO_LETTER[code])
+            else:
+                empty += 1
+        if empty:
+            rank.append(str(empty))
+        ranks.append(''.join(rank))
+    side = 'w' if current_turn == 'Red' else 'b'
+    return f"{'/'.join(ranks)} {side} - - {halfmove} {fullmove}"
+
+# 二進位編碼：
+#   位元組 0-11  90 位元的佔用位圖（小端序，位元 i 對應緊湊索引 i）
+#   位元組 12-27 依索引順序排列的棋子編碼，每子 4 位元（最多 32 子）
+#   位元組 28    狀態：位元 0 輪次、位元 1-2 上一手顏色、位元 3-4 遊戲結果
+#   位元組 29-31 保留為 0
+POSITION_BYTES = 32
+MAX_PIECES = 32
+_OCCUPANCY_BYTES = 12
+_PIECE_BYTES = 16
+_STATE_OFFSET = _OCCUPANCY_BYTES + _PIECE_BYTES
+
+_TURNS = ('Red', 'Black')
+_LAST_MOVED = (None, 'Red', 'Black')
+_RESULTS = ('Continue', 'Red wins', 'Black wins', 'Draw')
+
+def encode_snapshot(snapshot):
+    """將 ChessEngine.snapshot() 編碼為 POSITION_BYTES 位元組"""
+    squares, current_turn, last_moved, game_result = snapshot
+    occupancy = 0
+    nibbles = 0
+    count = 0
+    for index, code in enumerate(squares):
+        if code:
+            occupancy |= 1 << index
+            nibbles |= code << (4 * count)
+            count += 1
+    if count > MAX_PIECES:
+        raise ValueError(f"二進位編碼最多支援 {MAX_PIECES} 子，局面有 {count} 子")
+    state = (_TURNS.index(current_turn)
+             | _LAST_MOVED.index(last_moved) << 1
+             | _RESULTS.index(game_result) << 3)
+    return (occupancy.to_bytes(_OCCUPANCY_BYTES, 'little')
+            + nibbles.to_bytes(_PIECE_BYTES, 'little')
+            + bytes((state, 0, 0, 0)))
+
+def decode_snapshot(data):
+    """將 encode_snapshot() 的結果還原為 snapshot 元組"""
+    if len(data) != POSITION_BYTES:
+        raise ValueError(f"二進位局面必須為 {POSITION_BYTES} 位元組，收到 {len(data)}")
+    occupancy = int.from_bytes(data[:_OCCUPANCY_BYTES], 'little')
+    nibbles = int.from_bytes(data[_OCCUPANCY_BYTES:_STATE_OFFSET], 'little')
+    squares = bytearray(90)
+    while occupancy:
+        lowest = occupancy & -occupancy
+        code = nibbles & 0xF
+        if code not in PIECES:
+            raise ValueError(f"二進位局面含未知棋子編碼 {code} 於 {square_from_index(lowest.bit_length() - 1)}")
+        squares[lowest.bit_length() - 1] = code
+        nibbles >>= 4
+        occupancy ^= lowest
+    state = data[_STATE_OFFSET]
+    try:
+        current_turn = _TURNS[state & 1]
+        last_moved = _LAST_MOVED[state >> 1 & 3]
+        game_result = _RESULTS[state >> 3 & 3]
+    except IndexError:
+        raise ValueError(f"二進位局面狀態位元組不合法: {state:#04x}") from None
+    return bytes(squares), current_turn, last_moved, game_result
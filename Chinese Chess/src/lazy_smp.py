@@ -0,0 +1,136 @@
+"""Lazy SMP：多個搜尋器同時搜尋同一個根局面，透過共用置換表互相加速
+
+在 free-threaded CPython 上以執行緒執行輔助搜尋器，共用同一個 TranspositionTable；
+其他版本以行程執行，置換表放在 multiprocessing.shared_memory 中。置換表條目以
+key ^ data 儲存，讀到被同時寫入破壞的條目時會視為未命中，因此不需要鎖。
+"""
+
+import multiprocessing
+import sys
+import sysconfig
+import threading
+import time
+from multiprocessing import shared_memory
+
+from .chess_engine import ChessEngine
+from .search import MAX_PLY, Searcher
+from .transposition import TranspositionTable
+
+def is_free_threaded():
+    """檢查目前直譯器是否在無 GIL 模式下執行"""
+    if not sysconfig.get_config_var("Py_GIL_DISABLED"):
+        return False
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+def _helper_start_depth(helper_id):
+    """奇數編號的輔助搜尋器從較深的一層開始，錯開各搜尋器的深度"""
+    return 1 + helper_id % 2
+
+def _helper_process(snapshot, shm_name, table_bytes, stop_event, helper_id, node_queue):
+    """輔助行程：附加到共享置換表並持續搜尋，直到主搜尋設定停止事件"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    table = TranspositionTable(buffer=shm.buf[:table_bytes])
+    try:
+        engine = ChessEngine.from_snapshot(snapshot)
+        searcher = Searcher(engine, table, stop_event, helper_id=helper_id)
+        searcher.search(depth=MAX_PLY, start_depth=_helper_start_depth(helper_id))
+        node_queue.put(searcher.nodes)
+    finally:
+        table.release()
+        shm.close()
+
+class LazySMPSearch:
+    """Lazy SMP 搜尋：主搜尋器決定結果，輔助搜尋器只負責填充共用置換表"""
+
+    def __init__(self, threads=2, hash_mb=16, mode='auto'):
+        if threads < 1:
+            raise ValueError(f"搜尋執行緒數必須至少為 1: {threads}")
+        if mode == 'auto':
+            mode = 'thread' if is_free_threaded() else 'process'
+        if mode not in ('thread', 'process'):
+            raise ValueError(f"未知的 Lazy SMP 模式: {mode}")
+        self.threads = threads
+        self.hash_mb = hash_mb
+        self.mode = mode
+
+    def search(self, engine, depth=None, movetime_ms=None, nodes=None):
+        """以 threads 個搜尋器搜尋 engine 目前的局面，回傳主搜尋器的 SearchResult"""
+        if self.mode == 'thread':
+            return self._search_threads(engine, depth, movetime_ms, nodes)
+        return self._search_processes(engine, depth, movetime_ms, nodes)
+
+    def _search_threads(self, engine, depth, movetime_ms, nodes):
+        table = TranspositionTable(self.hash_mb)
+        stop_event = threading.Event()
+        snapshot = engine.snapshot()
+        helpers = [
+            Searcher(ChessEngine.from_snapshot(snapshot), table, stop_event, helper_id=helper_id)
+            for helper_id in range(1, self.threads)
+        ]
+        workers = [
+            threading.Thread(
+                target=helper.search,
+                kwargs={'depth': MAX_PLY, 'start_depth': _helper_start_depth(helper.helper_id)},
+                daemon=True,
+            )
+            for helper in helpers
+        ]
+        main = Searcher(engine, table, threading.Event())
+        for worker in workers:
+            worker.start()
+        try:
+            result = main.search(depth=depth, movetime_ms=movetime_ms, nodes=nodes)
+        finally:
+            stop_event.set()
+            for worker in workers:
+                worker.join()
+        result.nodes += sum(helper.nodes for helper in helpers)
+        return result
+
+    def _search_processes(self, engine, depth, movetime_ms, nodes):
+        table_bytes = TranspositionTable.bytes_for(self.hash_mb)
+        shm = shared_memory.SharedMemory(create=True, size=table_bytes)
+        table = TranspositionTable(buffer=shm.buf[:table_bytes])
+        context = multiprocessing.get_context()
+        stop_event = context.Event()
+        node_queue = context.Queue()
+        snapshot = engine.snapshot()
+        workers = [
+            context.Process(
+                target=_helper_process,
+                args=(snapshot, shm.name, table_bytes, stop_event, helper_id, node_queue),
+                daemon=True,
+            )
+            for helper_id in range(1, self.threads)
+        ]
+        try:
+            for worker in workers:
+                worker.start()
+            main = Searcher(engine, table, threading.Event())
+            result = main.search(depth=depth, movetime_ms=movetime_ms, nodes=nodes)
+        finally:
+            stop_event.set()
+            helper_nodes = 0
+            for worker in workers:
+                worker.join()
+            while not node_queue.empty():
+                helper_nodes += node_queue.get()
+            table.release()
+            shm.close()
+            shm.unlink()
+        result.nodes += helper_nodes
+        return result
+
+def measure_time_to_depth(engine, depth, thread_counts=(1, 2, 4), mode='auto', hash_mb=16):
+    """量測不同搜尋器數量到達指定深度所需時間，回傳 {搜尋器數: (秒數, 加速比)}"""
+    report = {}
+    baseline = None
+    for threads in thread_counts:
+        start = time.perf_counter()
+        LazySMPSearch(threads=threads, hash_mb=hash_mb, mode=mode).search(engine, depth=depth)
+        elapsed = time.perf_counter() - start
+        if baseline is None:
+            baseline = elapsed
+        report[threads] = (elapsed, baseline / elapsed if elapsed else 0.0)
+    return report
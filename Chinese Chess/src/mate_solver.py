@@ -0,0 +1,372 @@
+"""殺局解題器：以深度優先證明數搜尋 (df-pn) 驗證「輪到的一方 N 步內將死對方」
+
+攻方節點為 OR 節點（任一著法成功即可），守方節點為 AND 節點（所有應著都要被殺）。
+節點以 (Zobrist 鍵值, 剩餘層數) 存入置換表，剩餘層數遞減使搜尋圖無環。守方無合法
+移動即為被殺（困斃同樣判負），葉節點的判定直接來自展開時的走法產生，不需另外呼叫
+CheckmateDetector.detect_checkmate。checks_only 時攻方只考慮將軍的著法（連將殺）。
+
+批次模式讀取 EPD 風格的題目檔（每行 "<FEN>; dm <N>; id \"名稱\""，# 開頭為註解），
+以多個工作行程平行驗證。
+"""
+
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .chess_engine import ChessEngine
+from .notation import format_iccs
+
+# 證明數與否證數的無限大
+INFINITE = 10 ** 9
+# 每展開這麼多節點檢查一次時間（每個節點都要產生走法，間隔不宜過大）
+TIME_CHECK_INTERVAL = 16
+
+MATE = 'mate'
+NO_MATE = 'no_mate'
+UNKNOWN = 'unknown'
+
+class _SolverStopped(Exception):
+    """超過節點或時間限制"""
+
+class MateResult:
+    """解題結果
+
+    status 為 MATE、NO_MATE 或 UNKNOWN（超過限制）。MATE 時 moves 為攻方最少需要的步數，
+    line 為雙方最佳的完整殺棋線（攻方最快、守方最久）；NO_MATE 時 refutation 為
+    {攻方著法: 守方的反駁應著}，攻方著法後已無繼續手段時應著為 None。
+    """
+
+    __slots__ = ('status', 'moves', 'line', 'refutation', 'nodes', 'elapsed')
+
+    def __init__(self, status, moves=None, line=None, refutation=None, nodes=0, elapsed=0.0):
+        self.status = status
+        self.moves = moves
+        self.line = line or []
+        self.refutation = refutation or {}
+        self.nodes = nodes
+        self.elapsed = elapsed
+
+    def __repr__(self):
+        return (f"MateResult(status={self.status!r}, moves={self.moves}, line={self.line}, "
+                f"nodes={self.nodes}, elapsed={self.elapsed:.3f})")
+
+class MateSolver:
+    """以 ChessEngine 的走法規則進行 df-pn 殺局搜尋；搜尋結束後局面保持不變"""
+
+    def __init__(self, engine, checks_only=True, node_limit=None, time_limit_ms=None):
+        self.engine = engine
+        self.checks_only = checks_only
+        self.node_limit = node_limit
+        self.time_limit_ms = time_limit_ms
+        self.nodes = 0
+        # (鍵值, 剩餘層數) -> (證明數, 否證數)
+        self._table = {}
+        self._deadline = None
+        self._next_time_check = TIME_CHECK_INTERVAL
+        self._limited = True
+
+    def solve(self, moves):
+        """證明輪到的一方能否在 moves 步（攻方步數）內將死對方，回傳 MateResult"""
+        if moves < 1:
+            raise ValueError(f"殺局步數必須至少為 1: {moves}")
+        engine = self.engine
+        start = time.perf_counter()
+        self.nodes = 0
+        self._deadline = start + self.time_limit_ms / 1000 if self.time_limit_ms is not None else None
+        self._next_time_check = TIME_CHECK_INTERVAL
+        if engine.game_result != "Continue":
+            return MateResult(NO_MATE, elapsed=time.perf_counter() - start)
+
+        plies = 2 * moves - 1
+        base_depth = len(engine._undo_stack)
+        self._limited = True
+        try:
+            proven = self._prove(plies, True)
+        except _SolverStopped:
+            while len(engine._undo_stack) > base_depth:
+                engine.unmake_move()
+            return MateResult(UNKNOWN, nodes=self.nodes, elapsed=time.perf_counter() - start)
+
+        # 已有結論：取出殺棋線或反駁時不再受限制（只會重用或縮小已完成的搜尋）
+        self._limited = False
+        if proven:
+            distance = self._mate_distance(plies, True)
+            result = MateResult(MATE, moves=(distance + 1) // 2, line=self._principal_line(distance))
+        else:
+            result = MateResult(NO_MATE, refutation=self._refutation(plies))
+        result.nodes = self.nodes
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    def _tick(self):
+        self.nodes += 1
+        if not self._limited:
+            return
+        if self.node_limit is not None and self.nodes > self.node_limit:
+            raise _SolverStopped()
+        if self._deadline is not None and self.nodes >= self._next_time_check:
+            self._next_time_check = self.nodes + TIME_CHECK_INTERVAL
+            if time.perf_counter() >= self._deadline:
+                raise _SolverStopped()
+
+    def _attacker_moves(self):
+        """攻方的合法著法；checks_only 時只保留將軍的著法"""
+        engine = self.engine
+        color = engine.turn_manager.current_turn
+        opponent = 'Black' if color == 'Red' else 'Red'
+        detector = engine.checkmate_detector
+        moves = []
+        for move in engine.iter_pseudo_legal_moves(color):
+            engine.make_move(*move)
+            try:
+                if detector.is_in_check(color):
+                    continue
+                if self.checks_only and not detector.is_in_check(opponent):
+                    continue
+                moves.append(move)
+            finally:
+                engine.unmake_move()
+        return moves
+
+    def _defender_moves(self):
+        engine = self.engine
+        return engine.generate_legal_moves(engine.turn_manager.current_turn)
+
+    def _prove(self, remaining, attacker_to_move):
+        """目前局面在 remaining 層內是否為攻方必勝（必要時搜尋到有結論）"""
+        key = (self.engine.position_key(), remaining)
+        entry = self._table.get(key)
+        if entry is None or (entry[0] and entry[1]):
+            self._mid(remaining, attacker_to_move, INFINITE, INFINITE)
+            entry = self._table[key]
+        return entry[0] == 0
+
+    def _mid(self, remaining, attacker_to_move, threshold_pn, threshold_dn):
+        """df-pn 的 multiple iterative deepening：搜尋到證明數或否證數超過門檻為止"""
+        self._tick()
+        engine = self.engine
+        table = self._table
+        key = (engine.position_key(), remaining)
+        if attacker_to_move:
+            moves = self._attacker_moves() if remaining > 0 else []
+            if not moves:
+                table[key] = (INFINITE, 0)
+                return
+        else:
+            moves = self._defender_moves()
+            if not moves:
+                # 無合法移動：被將死或困斃，皆為守方落敗
+                table[key] = (0, INFINITE)
+                return
+            if remaining <= 0:
+                table[key] = (INFINITE, 0)
+                return
+
+        children = []
+        for move in moves:
+            engine.make_move(*move)
+            children.append((move, (engine.position_key(), remaining - 1)))
+            engine.unmake_move()
+
+        while True:
+            # OR 節點：證明數取最小、否證數相加；AND 節點相反
+            best = None
+            best_value = second_value = INFINITE
+            total = 0
+            for index, (_, child_key) in enumerate(children):
+                child_pn, child_dn = table.get(child_key, (1, 1))
+                value, other = (child_pn, child_dn) if attacker_to_move else (child_dn, child_pn)
+                total = min(total + other, INFINITE)
+                if value < best_value:
+                    best, best_value, second_value = index, value, best_value
+                elif value < second_value:
+                    second_value = value
+                if best is None:
+                    best = index
+            if attacker_to_move:
+                proof, disproof = best_value, total
+            else:
+                proof, disproof = total, best_value
+            if proof >= threshold_pn or disproof >= threshold_dn:
+                table[key] = (proof, disproof)
+                return
+
+            move, child_key = children[best]
+            child_pn, child_dn = table.get(child_key, (1, 1))
+            if attacker_to_move:
+                child_threshold_pn = min(threshold_pn, second_value + 1)
+                child_threshold_dn = threshold_dn - disproof + child_dn
+            else:
+                child_threshold_pn = threshold_pn - proof + child_pn
+                child_threshold_dn = min(threshold_dn, second_value + 1)
+            engine.make_move(*move)
+            try:
+                self._mid(remaining - 1, not attacker_to_move, child_threshold_pn, child_threshold_dn)
+            finally:
+                engine.unmake_move()
+
+    def _mate_distance(self, limit, attacker_to_move):
+        """在 limit 層內將死所需的最少層數；無法將死時回傳 None"""
+        remaining = 1 if attacker_to_move else 0
+        while remaining <= limit:
+            if self._prove(remaining, attacker_to_move):
+                return remaining
+            remaining += 2
+        return None
+
+    def _principal_line(self, remaining):
+        """攻方選最快、守方選最久的殺棋線"""
+        engine = self.engine
+        line = []
+        attacker_to_move = True
+        try:
+            while True:
+                moves = self._attacker_moves() if attacker_to_move else self._defender_moves()
+                best_move = best_distance = None
+                for move in moves:
+                    engine.make_move(*move)
+                    try:
+                        distance = self._mate_distance(remaining - 1, not attacker_to_move)
+                    finally:
+                        engine.unmake_move()
+                    if distance is None:
+                        continue
+                    if (best_move is None or (attacker_to_move and distance < best_distance)
+                            or (not attacker_to_move and distance > best_distance)):
+                        best_move, best_distance = move, distance
+                if best_move is None:
+                    return line
+                engine.make_move(*best_move)
+                line.append(best_move)
+                remaining = best_distance
+                attacker_to_move = not attacker_to_move
+        finally:
+            for _ in line:
+                engine.unmake_move()
+
+    def _refutation(self, remaining):
+        """攻方每個候選著法對應的一個守方反駁應著"""
+        engine = self.engine
+        refutation = {}
+        for move in self._attacker_moves():
+            engine.make_move(*move)
+            try:
+                refutation[move] = None
+                replies = self._defender_moves()
+                # 證明過程中已否證的應著排在前面，通常不必再搜尋
+                replies.sort(key=lambda reply: self._known_disproof(reply, remaining - 2))
+                for reply in replies:
+                    engine.make_move(*reply)
+                    try:
+                        refuted = not self._prove(remaining - 2, True)
+                    finally:
+                        engine.unmake_move()
+                    if refuted:
+                        refutation[move] = reply
+                        break
+            finally:
+                engine.unmake_move()
+        return refutation
+
+    def _known_disproof(self, move, remaining):
+        """置換表中 move 之後的局面已被否證時回傳 0，否則回傳 1（供排序）"""
+        engine = self.engine
+        engine.make_move(*move)
+        entry = self._table.get((engine.position_key(), remaining))
+        engine.unmake_move()
+        return 0 if entry is not None and entry[1] == 0 else 1
+
+class Puzzle:
+    """一道殺局題目：FEN 與要求的步數"""
+
+    __slots__ = ('index', 'fen', 'moves', 'puzzle_id')
+
+    def __init__(self, index, fen, moves, puzzle_id=None):
+        self.index = index
+        self.fen = fen
+        self.moves = moves
+        self.puzzle_id = puzzle_id
+
+    def __repr__(self):
+        return f"Puzzle(index={self.index}, id={self.puzzle_id!r}, moves={self.moves})"
+
+class PuzzleReport:
+    """一道題目的驗證結果；ok 表示在要求的步數內證明了殺棋"""
+
+    __slots__ = ('puzzle', 'status', 'moves', 'line', 'nodes', 'elapsed', 'error')
+
+    def __init__(self, puzzle, status, moves=None, line=None, nodes=0, elapsed=0.0, error=None):
+        self.puzzle = puzzle
+        self.status = status
+        self.moves = moves
+        self.line = line or []
+        self.nodes = nodes
+        self.elapsed = elapsed
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.status == MATE
+
+    def __repr__(self):
+        return (f"PuzzleReport(puzzle={self.puzzle!r}, status={self.status!r}, moves={self.moves}, "
+                f"line={' '.join(self.line)!r})")
+
+_OPERATION_PATTERN = re.compile(r'^(\w+)\s+(.*)$')
+
+def read_puzzles(source):
+    """逐題產生 Puzzle；source 為檔案路徑或可逐行迭代的類檔案物件
+
+    每行格式為 "<FEN>; dm <N>; id \"名稱\""，dm（direct mate）為必要欄位。
+    """
+    if isinstance(source, str):
+        with open(source, encoding='utf-8') as stream:
+            yield from read_puzzles(stream)
+        return
+    index = 0
+    for line_number, line in enumerate(source, start=1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        fields = [field.strip() for field in line.split(';')]
+        operations = {}
+        for field in fields[1:]:
+            match = _OPERATION_PATTERN.match(field)
+            if match is not None:
+                operations[match.group(1)] = match.group(2).strip().strip('"')
+        if 'dm' not in operations:
+            raise ValueError(f"第 {line_number} 行缺少 dm 步數: {line!r}")
+        try:
+            moves = int(operations['dm'])
+        except ValueError:
+            raise ValueError(f"第 {line_number} 行的 dm 步數不合法: {line!r}") from None
+        index += 1
+        yield Puzzle(index, fields[0], moves, operations.get('id'))
+
+def verify_puzzle(puzzle, checks_only=True, node_limit=None, time_limit_ms=None):
+    """驗證單一題目，回傳 PuzzleReport（FEN 不合法時 status 為 UNKNOWN 並記錄 error）"""
+    try:
+        engine = ChessEngine.from_fen(puzzle.fen)
+    except ValueError as error:
+        return PuzzleReport(puzzle, UNKNOWN, error=str(error))
+    result = MateSolver(engine, checks_only, node_limit, time_limit_ms).solve(puzzle.moves)
+    return PuzzleReport(puzzle, result.status, result.moves, [format_iccs(move) for move in result.line],
+                        result.nodes, result.elapsed)
+
+def _verify_worker(arguments):
+    puzzle, checks_only, node_limit, time_limit_ms = arguments
+    return verify_puzzle(puzzle, checks_only, node_limit, time_limit_ms)
+
+def verify_puzzles(source, workers=None, checks_only=True, node_limit=None, time_limit_ms=None):
+    """以 workers 個工作行程平行驗證題目檔，依題目順序產生 PuzzleReport
+
+    workers 為 1 時在目前行程中逐題驗證。
+    """
+    workers = workers or os.cpu_count() or 1
+    tasks = ((puzzle, checks_only, node_limit, time_limit_ms) for puzzle in read_puzzles(source))
+    if workers == 1:
+        yield from map(_verify_worker, tasks)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(_verify_worker, list(tasks))
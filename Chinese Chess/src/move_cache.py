@@ -0,0 +1,89 @@
+"""合法走法快取：以局面鍵值（含輪次）索引的 LRU 快取，供介面提示重複查詢使用
+
+每個局面的完整合法走法以 pack_move 壓縮為 16 位元整數，存成 array('H')。
+容量以條目數與位元組數兩者限制，超過任一上限時淘汰最久未使用的條目。
+"""
+
+import sys
+from array import array
+from collections import OrderedDict
+
+from .board import pack_move
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_MAX_BYTES = 1 << 20
+
+class LegalMoveCache:
+    """有條目數與位元組上限的 LRU 快取：局面鍵值 -> 壓縮的合法走法 array('H')"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        if max_entries < 1 or max_bytes < 1:
+            raise ValueError(f"快取上限必須為正數: max_entries={max_entries}, max_bytes={max_bytes}")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key):
+        """取得快取的壓縮走法並標記為最近使用；未命中時回傳 None"""
+        packed = self._entries.get(key)
+        if packed is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return packed
+
+    def put(self, key, packed):
+        """存入壓縮走法（array('H')），必要時淘汰最久未使用的條目"""
+        entries = self._entries
+        old = entries.pop(key, None)
+        if old is not None:
+            self.size_bytes -= sys.getsizeof(old)
+        size = sys.getsizeof(packed)
+        if size > self.max_bytes:
+            return
+        entries[key] = packed
+        self.size_bytes += size
+        while len(entries) > self.max_entries or self.size_bytes > self.max_bytes:
+            _, evicted = entries.popitem(last=False)
+            self.size_bytes -= sys.getsizeof(evicted)
+            self.evictions += 1
+
+    def clear(self):
+        """清除所有條目（局面被直接修改時使用），保留統計"""
+        if self._entries:
+            self._entries.clear()
+            self.size_bytes = 0
+            self.invalidations += 1
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def stats(self):
+        """回傳命中、未命中、淘汰與失效次數，以及目前的條目數與位元組數"""
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'invalidations': self.invalidations, 'entries': len(self._entries),
+                'bytes': self.size_bytes}
+
+def pack_moves(moves):
+    """將 (from_row, from_col, to_row, to_col) 列表壓縮為 array('H')"""
+    return array('H', map(pack_move, moves))
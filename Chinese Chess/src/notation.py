@@ -0,0 +1,300 @@
+"""棋譜讀取：以產生器逐局、逐步讀取 ICCS 座標記法（h2e2）與 WXF 記法（C2.5）
+
+ICCS 的縱線 a-i 對應第 1-9 欄，橫線 0-9 對應第 1-10 行。WXF 的縱線由行棋方的
+右手邊起算：紅方第 n 路為第 10 - n 欄，黑方第 n 路為第 n 欄；「進」(+) 表示
+朝對方底線前進（紅方行數增加、黑方行數減少），「退」(-) 相反，「平」(. 或 =)
+表示橫移。兵卒的「進」則依引擎的兵卒驗證器實際前進的方向：內建規則中紅兵朝行數
+減少的方向走，因此紅方 P7+1 是 (4, 3) -> (3, 3)。ICCS 只是座標，不受此影響，
+內建規則下紅兵的第一步寫作 c3c2，標準棋譜的 c3c4 會被判為不合法。
+
+棋譜檔案以空行或結果記號（1-0、0-1、1/2-1/2、*）分隔各局，可含 [Key "Value"]
+標頭（[FEN "..."] 指定起始局面）、回合編號（1. 或 12...）與 ; 之後的註解。
+讀取時每次只保留一局的移動記號，記憶體用量與檔案大小無關。
+"""
+
+import re
+
+from .chess_engine import ChessEngine
+
+RESULT_TOKENS = frozenset(('1-0', '0-1', '1/2-1/2', '*'))
+
+WXF_PIECES = {
+    'K': 'General',
+    'A': 'Guard',
+    'E': 'Elephant',
+    'B': 'Elephant',
+    'H': 'Horse',
+    'N': 'Horse',
+    'R': 'Rook',
+    'C': 'Cannon',
+    'P': 'Soldier',
+}
+# 直線移動的棋種：進退後的數字是步數；其餘棋種是目標縱線
+STRAIGHT_MOVERS = frozenset(('General', 'Rook', 'Cannon', 'Soldier'))
+
+_ICCS_PATTERN = re.compile(r'^([a-i])([0-9])-?([a-i])([0-9])$', re.IGNORECASE)
+# C2.5、c2=5，或同一縱線有兩子時的 C+.5 / +C.5
+_WXF_PATTERN = re.compile(r'^(?:([KAEBHNRCP])([1-9+\-])|([+\-])([KAEBHNRCP]))([+\-.=])([1-9])$', re.IGNORECASE)
+_MOVE_NUMBER_PATTERN = re.compile(r'^\d+\.+$')
+_HEADER_PATTERN = re.compile(r'^\[(\w+)\s+"(.*)"\]$')
+
+class NotationError(ValueError):
+    """棋譜無法解析或移動不合法；記錄第幾局（從 1 起算）與第幾步"""
+
+    def __init__(self, message, game=None, ply=None, token=None):
+        self.reason = message
+        self.game = game
+        self.ply = ply
+        self.token = token
+        location = []
+        if game is not None:
+            location.append(f"第 {game} 局")
+        if ply is not None:
+            location.append(f"第 {ply} 步")
+        if token is not None:
+            location.append(f"{token!r}")
+        super().__init__(f"{' '.join(location)}: {message}" if location else message)
+
+class GameRecord:
+    """一局棋譜：標頭與移動記號"""
+
+    __slots__ = ('index', 'headers', 'tokens', 'result')
+
+    def __init__(self, index, headers, tokens, result=None):
+        self.index = index
+        self.headers = headers
+        self.tokens = tokens
+        self.result = result
+
+    def __repr__(self):
+        return f"GameRecord(index={self.index}, moves={len(self.tokens)}, result={self.result!r})"
+
+def parse_iccs(token):
+    """將 ICCS 座標記號轉為 (from_row, from_col, to_row, to_col)"""
+    match = _ICCS_PATTERN.match(token)
+    if match is None:
+        raise NotationError("不是 ICCS 記號", token=token)
+    from_file, from_rank, to_file, to_rank = match.groups()
+    return (int(from_rank) + 1, ord(from_file.lower()) - ord('a') + 1,
+            int(to_rank) + 1, ord(to_file.lower()) - ord('a') + 1)
+
+def format_iccs(move):
+    """將 (from_row, from_col, to_row, to_col) 轉為 ICCS 座標記號"""
+    from_row, from_col, to_row, to_col = move
+    return f"{chr(ord('a') + from_col - 1)}{from_row - 1}{chr(ord('a') + to_col - 1)}{to_row - 1}"
+
+def _wxf_file_to_col(color, file_number):
+    return 10 - file_number if color == 'Red' else file_number
+
+def _forward_step(engine, color, piece_type):
+    """該棋種「進」的行數方向（1 或 -1）
+
+    兵卒依引擎目前的兵卒驗證器在空棋盤上試走一步決定，其餘棋種紅方為 1、黑方為 -1。
+    """
+    forward = 1 if color == 'Red' else -1
+    validator = engine.validators.get('Soldier')
+    if piece_type != 'Soldier' or validator is None:
+        return forward
+    # 兵卒的起始行：在己方河界內，不論規則如何都只能直走
+    row = 4 if color == 'Red' else 7
+    piece = {'color': color, 'type': 'Soldier'}
+    if validator.is_valid_move({}, row, 5, row + forward, 5, piece):
+        return forward
+    if validator.is_valid_move({}, row, 5, row - forward, 5, piece):
+        return -forward
+    return forward
+
+def _wxf_targets(forward, color, piece_type, from_row, from_col, operator, number):
+    """依 WXF 的動作與數字計算目標位置；forward 為「進」的行數方向，無法到達時回傳 None"""
+    if operator in '.=':
+        return from_row, _wxf_file_to_col(color, number)
+    direction = forward if operator == '+' else -forward
+    if piece_type in STRAIGHT_MOVERS:
+        return from_row + direction * number, from_col
+    to_col = _wxf_file_to_col(color, number)
+    col_distance = abs(to_col - from_col)
+    if piece_type == 'Horse':
+        row_distance = {1: 2, 2: 1}.get(col_distance)
+    elif piece_type == 'Elephant':
+        row_distance = 2 if col_distance == 2 else None
+    else:
+        row_distance = 1 if col_distance == 1 else None
+    if row_distance is None:
+        return None
+    return from_row + direction * row_distance, to_col
+
+def parse_wxf(engine, token):
+    """依目前局面將 WXF 記號解析為輪到的一方的移動
+
+    同一縱線有多個同種棋子時，以 +/-（前/後）指定；未指定時依移動是否合法排除，
+    仍有多個候選則視為歧義。
+    """
+    match = _WXF_PATTERN.match(token)
+    if match is None:
+        raise NotationError("不是 WXF 記號", token=token)
+    letter, file_or_position, position_first, letter_second, operator, number = match.groups()
+    letter = (letter or letter_second).upper()
+    file_or_position = file_or_position or position_first
+    color = engine.turn_manager.current_turn
+    piece_type = WXF_PIECES[letter]
+    number = int(number)
+    if operator in '.=' and piece_type in ('Horse', 'Elephant', 'Guard'):
+        raise NotationError("斜行棋子不能平移", token=token)
+    forward = _forward_step(engine, color, piece_type)
+
+    pieces = [(row, col) for (row, col), piece in engine.board.items()
+              if piece['color'] == color and piece['type'] == piece_type]
+    if file_or_position in '+-':
+        # 前/後：在同一縱線上有多子的那條線中，依該棋種前進的方向排序
+        files = {}
+        for row, col in pieces:
+            files.setdefault(col, []).append((row, col))
+        stacked = [squares for squares in files.values() if len(squares) >= 2]
+        if len(stacked) != 1:
+            raise NotationError("前/後記號需要恰好一條縱線上有多個同種棋子", token=token)
+        ordered = sorted(stacked[0], key=lambda square: square[0] * forward, reverse=True)
+        candidates = [ordered[0] if file_or_position == '+' else ordered[-1]]
+    else:
+        col = _wxf_file_to_col(color, int(file_or_position))
+        candidates = [square for square in pieces if square[1] == col]
+    if not candidates:
+        raise NotationError(f"該縱線上沒有{color}方的 {piece_type}", token=token)
+
+    moves = []
+    for from_row, from_col in candidates:
+        target = _wxf_targets(forward, color, piece_type, from_row, from_col, operator, number)
+        if target is None or not (1 <= target[0] <= 10 and 1 <= target[1] <= 9):
+            continue
+        move = (from_row, from_col) + target
+        if _is_pseudo_legal(engine, move):
+            moves.append(move)
+    if len(moves) > 1:
+        legal_moves = set(engine.generate_legal_moves(color))
+        moves = [move for move in moves if move in legal_moves]
+    if not moves:
+        raise NotationError("沒有符合的合法移動", token=token)
+    if len(moves) > 1:
+        raise NotationError(f"記號有歧義，可能的移動: {moves}", token=token)
+    return moves[0]
+
+def _is_pseudo_legal(engine, move):
+    from_row, from_col, to_row, to_col = move
+    piece = engine.board[(from_row, from_col)]
+    target = engine.board.get((to_row, to_col))
+    if target is not None and target['color'] == piece['color']:
+        return False
+    validator = engine.validators.get(piece['type'])
+    return validator is not None and validator.is_valid_move(engine.board, from_row, from_col, to_row, to_col, piece)
+
+def parse_move(engine, token, notation='auto'):
+    """解析單一記號；notation 為 'iccs'、'wxf' 或 'auto'（依記號格式判斷）"""
+    if notation == 'auto':
+        notation = 'iccs' if _ICCS_PATTERN.match(token) else 'wxf'
+    if notation == 'iccs':
+        return parse_iccs(token)
+    if notation == 'wxf':
+        return parse_wxf(engine, token)
+    raise ValueError(f"未知的棋譜記法: {notation}")
+
+def _open_lines(source):
+    """逐行讀取路徑或類檔案物件"""
+    if isinstance(source, str):
+        with open(source, encoding='utf-8') as stream:
+            yield from stream
+    else:
+        yield from source
+
+def read_games(source):
+    """逐局產生 GameRecord；source 為檔案路徑或可逐行迭代的類檔案物件"""
+    index = 0
+    headers = {}
+    tokens = []
+
+    def finish(result=None):
+        nonlocal index, headers, tokens
+        index += 1
+        record = GameRecord(index, headers, tokens, result)
+        headers = {}
+        tokens = []
+        return record
+
+    for line in _open_lines(source):
+        line = line.split(';', 1)[0].strip()
+        if not line:
+            if tokens:
+                yield finish()
+            continue
+        header = _HEADER_PATTERN.match(line)
+        if header is not None:
+            if tokens:
+                yield finish()
+            headers[header.group(1)] = header.group(2)
+            continue
+        for token in line.split():
+            if token in RESULT_TOKENS:
+                yield finish(token)
+                continue
+            if _MOVE_NUMBER_PATTERN.match(token):
+                continue
+            # 容許 "1.h2e2" 這種回合編號與移動相連的寫法
+            token = re.sub(r'^\d+\.+', '', token)
+            tokens.append(token)
+    if tokens or headers:
+        yield finish()
+
+def starting_engine(record):
+    """依 [FEN] 標頭或標準開局建立重播用的引擎"""
+    fen = record.headers.get('FEN')
+    if fen is None:
+        engine = ChessEngine()
+        engine.setup_initial_board()
+        return engine
+    try:
+        return ChessEngine.from_fen(fen)
+    except ValueError as error:
+        raise NotationError(f"FEN 標頭不合法: {error}", game=record.index) from None
+
+def replay_moves(record, engine=None, notation='auto'):
+    """將一局棋譜逐步以 move_piece 重播，產生 (步數, 移動)
+
+    engine 未指定時依 [FEN] 標頭或標準開局建立；不合法的移動拋出含局數與步數的 NotationError。
+    """
+    if engine is None:
+        engine = starting_engine(record)
+    for ply, token in enumerate(record.tokens, start=1):
+        try:
+            move = parse_move(engine, token, notation)
+        except NotationError as error:
+            raise NotationError(error.reason, game=record.index, ply=ply, token=token) from None
+        if engine.game_result != "Continue" or not engine.move_piece(*move):
+            raise NotationError("移動不合法", game=record.index, ply=ply, token=token)
+        yield ply, move
+
+class GameReplay:
+    """一局重播結果：成功時 error 為 None，失敗時 moves 為錯誤前已完成的移動"""
+
+    __slots__ = ('record', 'moves', 'engine', 'error')
+
+    def __init__(self, record, moves, engine, error=None):
+        self.record = record
+        self.moves = moves
+        self.engine = engine
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+def replay_archive(source, notation='auto'):
+    """逐局重播整個棋譜檔案，產生 GameReplay；錯誤不中斷後續各局"""
+    for record in read_games(source):
+        engine = None
+        moves = []
+        try:
+            engine = starting_engine(record)
+            for _, move in replay_moves(record, engine, notation):
+                moves.append(move)
+        except NotationError as error:
+            yield GameReplay(record, moves, engine, error)
+        else:
+            yield GameReplay(record, moves, engine)
@@ -0,0 +1,165 @@
+"""多行程根節點分割：把根移動分配給 ProcessPoolExecutor 的工作行程
+
+工作行程只收到 ChessEngine.snapshot() 的緊湊快照與分配到的根移動，
+不傳遞整個引擎（含 validators 字典）。工作行程使用預設驗證器。
+"""
+
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from .chess_engine import ChessEngine
+
+def _perft_worker(snapshot, move, depth, deadline):
+    """工作行程：計算單一根移動的 perft(depth - 1)；超過期限時回傳 None"""
+    engine = ChessEngine.from_snapshot(snapshot)
+    engine.make_move(*move)
+    if depth <= 2:
+        return engine.perft(depth - 1)
+    nodes = 0
+    for child in engine.generate_legal_moves(engine.turn_manager.current_turn):
+        if deadline is not None and time.time() >= deadline:
+            return None
+        engine.make_move(*child)
+        nodes += engine.perft(depth - 2)
+        engine.unmake_move()
+    return nodes
+
+def _search_worker(snapshot, moves, depth, movetime_ms):
+    """工作行程：逐一搜尋分配到的根移動，回傳 [(移動, 分數, 主變例, 節點數), ...]"""
+    engine = ChessEngine.from_snapshot(snapshot)
+    per_move_ms = None if movetime_ms is None else max(1, movetime_ms // max(1, len(moves)))
+    results = []
+    for move in moves:
+        engine.make_move(*move)
+        reply = engine.search(depth=max(1, depth - 1), movetime_ms=per_move_ms)
+        results.append((move, -reply.score, [move] + reply.pv, reply.nodes))
+        engine.unmake_move()
+    return results
+
+class ParallelResult:
+    """平行計算結果"""
+
+    def __init__(self, value, elapsed, workers, completed=True, divide=None,
+                 best_move=None, pv=None, nodes=0):
+        self.value = value
+        self.elapsed = elapsed
+        self.workers = workers
+        self.completed = completed
+        self.divide = divide or {}
+        self.best_move = best_move
+        self.pv = pv or []
+        self.nodes = nodes
+        self.nps = int(nodes / elapsed) if elapsed > 0 else 0
+
+    def __repr__(self):
+        return (f"ParallelResult(value={self.value}, workers={self.workers}, "
+                f"completed={self.completed}, elapsed={self.elapsed:.3f})")
+
+class ParallelAnalyzer:
+    """以多個工作行程平行計算 perft 與根節點搜尋
+
+    可作為 context manager 使用；cancel_event（任何具有 is_set() 的物件）被設定
+    或超過 deadline_ms 時，尚未開始的工作會被取消，回傳 completed=False 的部分結果。
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.shutdown()
+
+    def shutdown(self, wait_for_workers=True):
+        self._executor.shutdown(wait=wait_for_workers, cancel_futures=True)
+
+    def _collect(self, futures, deadline, cancel_event):
+        """等待工作完成；取消或逾時時取消其餘工作並回傳 (完成結果, 是否全部完成)"""
+        results = {}
+        pending = set(futures)
+        while pending:
+            timeout = 0.05 if cancel_event is not None else None
+            if deadline is not None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                timeout = remaining if timeout is None else min(timeout, remaining)
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[futures[future]] = future.result()
+            if cancel_event is not None and cancel_event.is_set():
+                break
+        for future in pending:
+            future.cancel()
+        return results, not pending
+
+    def perft(self, engine, depth, deadline_ms=None, cancel_event=None):
+        """平行計算 perft；value 為總節點數，divide 為各根移動的節點數"""
+        start = time.perf_counter()
+        if depth < 2:
+            nodes = engine.perft(depth)
+            return ParallelResult(nodes, time.perf_counter() - start, 1, nodes=nodes)
+        deadline = None if deadline_ms is None else time.time() + deadline_ms / 1000
+        snapshot = engine.snapshot()
+        futures = {
+            self._executor.submit(_perft_worker, snapshot, move, depth, deadline): move
+            for move in engine.generate_legal_moves(engine.turn_manager.current_turn)
+        }
+        results, completed = self._collect(futures, deadline, cancel_event)
+        divide = {move: nodes for move, nodes in results.items() if nodes is not None}
+        completed = completed and len(divide) == len(futures)
+        total = sum(divide.values())
+        return ParallelResult(total, time.perf_counter() - start, self.workers,
+                              completed=completed, divide=divide, nodes=total)
+
+    def search(self, engine, depth=4, movetime_ms=None, cancel_event=None):
+        """根節點分割搜尋：每個工作行程搜尋一部分根移動，合併取最高分"""
+        start = time.perf_counter()
+        root_moves = engine.generate_legal_moves(engine.turn_manager.current_turn)
+        if not root_moves:
+            return ParallelResult(None, time.perf_counter() - start, self.workers)
+        snapshot = engine.snapshot()
+        chunks = [root_moves[index::self.workers] for index in range(self.workers)]
+        futures = {
+            self._executor.submit(_search_worker, snapshot, chunk, depth, movetime_ms): index
+            for index, chunk in enumerate(chunks) if chunk
+        }
+        # 搜尋以 movetime 自行停止；外層期限留一點合併時間
+        deadline = None if movetime_ms is None else time.time() + movetime_ms / 1000 + 1.0
+        results, completed = self._collect(futures, deadline, cancel_event)
+
+        best = None
+        nodes = 0
+        for chunk_results in results.values():
+            for move, score, pv, move_nodes in chunk_results:
+                nodes += move_nodes
+                if best is None or score > best[1]:
+                    best = (move, score, pv)
+        elapsed = time.perf_counter() - start
+        if best is None:
+            return ParallelResult(None, elapsed, self.workers, completed=False, best_move=root_moves[0],
+                                  pv=[root_moves[0]])
+        return ParallelResult(best[1], elapsed, self.workers, completed=completed,
+                              best_move=best[0], pv=best[2], nodes=nodes)
+
+def measure_speedup(engine, depth, worker_counts=(1, 2, 4)):
+    """比較序列 perft 與不同工作行程數的平行 perft，回傳 {工作行程數: (秒數, 加速比)}
+
+    0 代表序列路徑（在目前行程執行 engine.perft）。
+    """
+    start = time.perf_counter()
+    expected = engine.perft(depth)
+    serial_elapsed = time.perf_counter() - start
+    report = {0: (serial_elapsed, 1.0)}
+    for workers in worker_counts:
+        with ParallelAnalyzer(workers) as analyzer:
+            # 先啟動工作行程，避免把行程建立時間算入
+            analyzer.perft(engine, 2)
+            result = analyzer.perft(engine, depth)
+        if result.value != expected:
+            raise AssertionError(f"平行 perft 結果 {result.value} 與序列結果 {expected} 不一致")
+        report[workers] = (result.elapsed, serial_elapsed / result.elapsed if result.elapsed else 0.0)
+    return report
@@ -0,0 +1,383 @@
+"""Alpha-beta 搜尋：迭代加深、主變例搜尋 (PVS)、期望窗口、時間/節點預算、
+靜態交換評估 (SEE) 與只搜吃子的靜止搜尋"""
+
+import threading
+import time
+
+from .board import MAILBOX_INDEX, board_squares
+from .chess_engine import DRAW_RESULT, has_builtin_rules
+from .evaluation import DEFAULT_MATERIAL
+from .tablebase import LOSS as TABLEBASE_LOSS, WIN as TABLEBASE_WIN
+from .transposition import BOUND_EXACT, BOUND_LOWER, BOUND_UPPER, TranspositionTable
+
+MATE_SCORE = 30000
+# 超過此值的分數視為殺棋分數（需依層數調整後才能存入置換表）
+MATE_THRESHOLD = MATE_SCORE - 1000
+INFINITY = MATE_SCORE + 1
+MAX_PLY = 128
+DEFAULT_DEPTH = 4
+ASPIRATION_WINDOW = 50
+# 每搜尋這麼多節點檢查一次時間
+TIME_CHECK_INTERVAL = 256
+
+PIECE_VALUES = DEFAULT_MATERIAL
+
+# 靜態交換評估用的子力值：將帥被吃即輸棋，給一個遠大於其他棋子總和的值
+SEE_VALUES = dict(PIECE_VALUES, General=MATE_THRESHOLD)
+
+def attackers_to(engine, square, color):
+    """取得指定顏色可走到 square 的棋子位置，依子力由小到大排序
+
+    直接以各棋種驗證器判斷，炮架隨目前棋盤決定；內建驗證器共用同一份陣列。
+    """
+    board = engine.board
+    squares = board_squares(board)
+    to_row, to_col = square
+    target = MAILBOX_INDEX[square]
+    attackers = []
+    for (from_row, from_col), piece in board.items():
+        if piece['color'] != color:
+            continue
+        validator = engine.validators.get(piece['type'])
+        if has_builtin_rules(validator, piece['type']):
+            reaches = target in validator.indexed_targets(squares, MAILBOX_INDEX[(from_row, from_col)], piece)
+        else:
+            reaches = validator is not None and validator.is_valid_move(
+                board, from_row, from_col, to_row, to_col, piece)
+        if reaches:
+            attackers.append((SEE_VALUES.get(piece['type'], 0), (from_row, from_col)))
+    attackers.sort()
+    return [position for _, position in attackers]
+
+def static_exchange(engine, move):
+    """靜態交換評估：雙方輪流以最小的棋子吃回目標格，回傳走此步的子力得失
+
+    每次吃子都在棋盤上實際執行，因此被吃掉或移開的棋子可能讓後方的車露出，
+    或讓炮多出／失去炮架；結束後以 unmake_move 還原。不檢查牽制。
+    """
+    from_row, from_col, to_row, to_col = move
+    board = engine.board
+    target = board.get((to_row, to_col))
+    gains = [SEE_VALUES.get(target['type'], 0) if target is not None else 0]
+    moving_piece = board[(from_row, from_col)]
+    on_square = SEE_VALUES.get(moving_piece['type'], 0)
+    color = 'Black' if moving_piece['color'] == 'Red' else 'Red'
+    engine.make_move(from_row, from_col, to_row, to_col)
+    made = 1
+    try:
+        while engine.game_result == "Continue":
+            attackers = attackers_to(engine, (to_row, to_col), color)
+            if not attackers:
+                break
+            gains.append(on_square - gains[-1])
+            # 雙方都不會接受的交換：提早結束
+            if max(-gains[-2], gains[-1]) < 0:
+                break
+            attacker = attackers[0]
+            on_square = SEE_VALUES.get(board[attacker]['type'], 0)
+            engine.make_move(*attacker, to_row, to_col)
+            made += 1
+            color = 'Black' if color == 'Red' else 'Red'
+    finally:
+        for _ in range(made):
+            engine.unmake_move()
+    # 由最後一次吃子往回推：每一方都可以選擇不再吃回
+    while len(gains) > 1:
+        last = gains.pop()
+        gains[-1] = -max(-gains[-1], last)
+    return gains[0]
+
+class SearchStopped(Exception):
+    """搜尋因時間、節點預算或外部要求而中止"""
+
+class SearchResult:
+    """搜尋結果"""
+
+    def __init__(self, best_move, score, pv, depth, nodes, elapsed):
+        self.best_move = best_move
+        self.score = score
+        self.pv = pv
+        self.depth = depth
+        self.nodes = nodes
+        self.time_ms = int(elapsed * 1000)
+        self.nps = int(nodes / elapsed) if elapsed > 0 else 0
+
+    def __repr__(self):
+        return (f"SearchResult(best_move={self.best_move}, score={self.score}, depth={self.depth}, "
+                f"nodes={self.nodes}, nps={self.nps}, pv={self.pv})")
+
+class Searcher:
+    """以 ChessEngine 的 make_move/unmake_move 與合法走法進行 negamax 搜尋
+
+    勝負判定沿用引擎語意：吃掉將帥時 _execute_move 設定 game_result，
+    無合法移動（將死或困斃）則該方落敗。
+    """
+
+    def __init__(self, engine, transposition_table=None, stop_event=None, helper_id=0, quiescence=True):
+        self.engine = engine
+        # 葉節點是否接著搜尋吃子直到局面平靜
+        self.quiescence = quiescence
+        # Lazy SMP 輔助搜尋器編號：非 0 時打亂安靜移動的順序，讓各搜尋器探索不同分支
+        self.helper_id = helper_id
+        self.tt = transposition_table if transposition_table is not None else TranspositionTable(16)
+        # 外部可設定此事件以立即中止搜尋
+        self.stop_event = stop_event if stop_event is not None else threading.Event()
+        self.nodes = 0
+        self._node_limit = None
+        self._deadline = None
+        self._next_time_check = TIME_CHECK_INTERVAL
+        self._pv = [[] for _ in range(MAX_PLY + 1)]
+        self._root_best = None
+
+    def stop(self):
+        """要求搜尋儘快停止，回傳目前最佳結果"""
+        self.stop_event.set()
+
+    def search(self, depth=None, movetime_ms=None, nodes=None, on_iteration=None, start_depth=1):
+        """迭代加深搜尋，回傳 SearchResult
+
+        depth、movetime_ms、nodes 任一達到即停止；皆未指定時搜尋 DEFAULT_DEPTH 層。
+        on_iteration 會在每完成一層時以 SearchResult 呼叫；start_depth 供 Lazy SMP
+        的輔助搜尋器錯開深度使用。
+        """
+        engine = self.engine
+        if depth is None:
+            depth = DEFAULT_DEPTH if movetime_ms is None and nodes is None else MAX_PLY
+        depth = min(depth, MAX_PLY)
+        start = time.perf_counter()
+        self._deadline = start + movetime_ms / 1000 if movetime_ms is not None else None
+        self._node_limit = nodes
+        self._next_time_check = TIME_CHECK_INTERVAL
+        self.nodes = 0
+        self.tt.new_search()
+
+        color = engine.turn_manager.current_turn
+        if engine.game_result == DRAW_RESULT:
+            return SearchResult(None, 0, [], 0, 0, time.perf_counter() - start)
+        root_moves = engine.generate_legal_moves(color) if engine.game_result == "Continue" else []
+        if not root_moves:
+            # 無合法移動或將帥已被吃：輪到的一方落敗
+            score = -MATE_SCORE
+            return SearchResult(None, score, [], 0, 0, time.perf_counter() - start)
+
+        base_depth = len(engine._undo_stack)
+        result = None
+        score = 0
+        for current_depth in range(min(start_depth, depth), depth + 1):
+            self._root_best = None
+            try:
+                score = self._aspiration_search(current_depth, score)
+            except SearchStopped:
+                while len(engine._undo_stack) > base_depth:
+                    engine.unmake_move()
+                break
+            pv = list(self._pv[0])
+            result = SearchResult(pv[0] if pv else self._root_best, score, pv, current_depth,
+                                  self.nodes, time.perf_counter() - start)
+            if on_iteration is not None:
+                on_iteration(result)
+            # 已找到殺棋時不必再加深
+            if abs(score) >= MATE_THRESHOLD:
+                break
+
+        elapsed = time.perf_counter() - start
+        if result is None:
+            # 第一層都未完成：使用部分結果或第一個合法移動
+            best_move = self._root_best or root_moves[0]
+            return SearchResult(best_move, score, [best_move], 0, self.nodes, elapsed)
+        return SearchResult(result.best_move, result.score, result.pv, result.depth, self.nodes, elapsed)
+
+    def _aspiration_search(self, depth, previous_score):
+        if depth < 3 or abs(previous_score) >= MATE_THRESHOLD:
+            return self._negamax(depth, -INFINITY, INFINITY, 0)
+        window = ASPIRATION_WINDOW
+        while True:
+            alpha = max(previous_score - window, -INFINITY)
+            beta = min(previous_score + window, INFINITY)
+            score = self._negamax(depth, alpha, beta, 0)
+            if alpha < score < beta or (alpha == -INFINITY and beta == INFINITY):
+                return score
+            window *= 4
+            if window > MATE_SCORE:
+                window = INFINITY
+
+    def _check_limits(self):
+        if self.stop_event.is_set():
+            raise SearchStopped()
+        if self._node_limit is not None and self.nodes >= self._node_limit:
+            raise SearchStopped()
+        if self._deadline is not None and self.nodes >= self._next_time_check:
+            self._next_time_check = self.nodes + TIME_CHECK_INTERVAL
+            if time.perf_counter() >= self._deadline:
+                raise SearchStopped()
+
+    def _negamax(self, depth, alpha, beta, ply):
+        self._check_limits()
+        self.nodes += 1
+        engine = self.engine
+        self._pv[ply] = []
+
+        # 上一步已吃掉將帥：輪到的一方落敗；判和則為 0 分
+        if engine.game_result != "Continue":
+            return 0 if engine.game_result == DRAW_RESULT else -MATE_SCORE + ply
+        # 搜尋路徑或對局歷史中已出現過的局面視為和棋
+        if ply > 0 and engine.repetition_count() > 1:
+            return 0
+
+        # 殘局庫涵蓋的局面直接回傳精確結果
+        if ply > 0 and engine.tablebases is not None:
+            probe = engine.probe_tablebase()
+            if probe is not None:
+                result, distance = probe
+                if result == TABLEBASE_WIN:
+                    return MATE_SCORE - ply - distance
+                if result == TABLEBASE_LOSS:
+                    return -MATE_SCORE + ply + distance
+                return 0
+
+        color = engine.turn_manager.current_turn
+        if ply >= MAX_PLY:
+            return self.evaluate(color)
+        if depth <= 0:
+            if self.quiescence:
+                return self._quiescence(alpha, beta, ply)
+            return self.evaluate(color)
+
+        key = engine.position_key()
+        entry = self.tt.probe(key)
+        tt_move = None
+        if entry is not None:
+            tt_move = entry.move
+            if ply > 0 and entry.depth >= depth:
+                tt_score = self._score_from_tt(entry.score, ply)
+                if (entry.bound == BOUND_EXACT
+                        or (entry.bound == BOUND_LOWER and tt_score >= beta)
+                        or (entry.bound == BOUND_UPPER and tt_score <= alpha)):
+                    return tt_score
+
+        moves = engine.generate_legal_moves(color)
+        if not moves:
+            return -MATE_SCORE + ply
+        moves = self._order_moves(moves, tt_move)
+
+        original_alpha = alpha
+        best_score = -INFINITY
+        best_move = None
+        for index, move in enumerate(moves):
+            engine.make_move(*move)
+            if index == 0:
+                score = -self._negamax(depth - 1, -beta, -alpha, ply + 1)
+            else:
+                # 主變例搜尋：先以零寬窗口驗證，失敗時再完整搜尋
+                score = -self._negamax(depth - 1, -alpha - 1, -alpha, ply + 1)
+                if alpha < score < beta:
+                    score = -self._negamax(depth - 1, -beta, -alpha, ply + 1)
+            engine.unmake_move()
+
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if ply == 0:
+                    self._root_best = move
+            if score > alpha:
+                alpha = score
+                self._pv[ply] = [move] + self._pv[ply + 1]
+                if alpha >= beta:
+                    break
+
+        if best_score >= beta:
+            bound = BOUND_LOWER
+        elif best_score > original_alpha:
+            bound = BOUND_EXACT
+        else:
+            bound = BOUND_UPPER
+        self.tt.store(key, depth, self._score_to_tt(best_score, ply), bound, best_move)
+        return best_score
+
+    def _quiescence(self, alpha, beta, ply):
+        """只搜吃子的靜止搜尋；SEE 為負的吃子直接略過"""
+        engine = self.engine
+        color = engine.turn_manager.current_turn
+        stand_pat = self.evaluate(color)
+        if stand_pat >= beta or ply >= MAX_PLY:
+            return stand_pat
+        alpha = max(alpha, stand_pat)
+
+        board = engine.board
+        captures = []
+        for move in engine.iter_pseudo_legal_moves(color):
+            victim = board.get(move[2:])
+            if victim is None:
+                continue
+            exchange = static_exchange(engine, move)
+            if exchange >= 0:
+                captures.append((-exchange, move))
+        captures.sort()
+
+        best_score = stand_pat
+        for _, move in captures:
+            engine.make_move(*move)
+            if engine.game_result != "Continue":
+                # 吃掉對方將帥
+                score = MATE_SCORE - ply - 1
+            elif engine.checkmate_detector.is_in_check(color):
+                # 吃子後己方被將軍：不合法
+                engine.unmake_move()
+                continue
+            else:
+                self._check_limits()
+                self.nodes += 1
+                self._pv[ply + 1] = []
+                score = -self._quiescence(-beta, -alpha, ply + 1)
+            engine.unmake_move()
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        return best_score
+
+    def evaluate(self, color):
+        """評估局面（以輪到的一方為正）：引擎增量維護的子力加位置分數"""
+        return self.engine.evaluate(color)
+
+    def _order_moves(self, moves, tt_move):
+        """置換表移動優先，其次依 MVV-LVA 排序吃子"""
+        board = self.engine.board
+
+        def move_order(move):
+            if move == tt_move:
+                return -INFINITY
+            victim = board.get(move[2:])
+            if victim is None:
+                return 0
+            attacker = board[move[:2]]
+            return -(PIECE_VALUES.get(victim['type'], 0) * 10 - PIECE_VALUES.get(attacker['type'], 0) + 1)
+
+        ordered = sorted(moves, key=move_order)
+        if self.helper_id:
+            # 輔助搜尋器：旋轉安靜移動的順序
+            quiet_start = next((index for index, move in enumerate(ordered)
+                                if move != tt_move and move[2:] not in board), len(ordered))
+            quiet_moves = ordered[quiet_start:]
+            if quiet_moves:
+                shift = self.helper_id % len(quiet_moves)
+                ordered[quiet_start:] = quiet_moves[shift:] + quiet_moves[:shift]
+        return ordered
+
+    @staticmethod
+    def _score_to_tt(score, ply):
+        if score >= MATE_THRESHOLD:
+            return score + ply
+        if score <= -MATE_THRESHOLD:
+            return score - ply
+        return score
+
+    @staticmethod
+    def _score_from_tt(score, ply):
+        if score >= MATE_THRESHOLD:
+            return score - ply
+        if score <= -MATE_THRESHOLD:
+            return score + ply
+        return score
@@ -0,0 +1,418 @@
+"""非同步多局伺服器：在單一行程中以 asyncio 主持大量 ChessEngine 對局
+
+每局有自己的請求佇列，由按需啟動的工作協程依序處理，因此同一局的移動一定依序
+套用，不同局之間互不阻塞；閒置的對局不佔用協程。起終點相同、輪次、起點棋子、吃己方棋子與
+預先算好的可能目標等便宜檢查直接在事件迴圈上完成，需要完整規則驗證的移動交給
+有上限的執行緒池，避免拖慢其他對局。
+
+對外協定為每行一個 JSON 物件，可走 TCP 或 Unix socket；回應帶回請求的 id：
+    {"id": 1, "op": "new", "fen": "..."}                  -> {"id": 1, "ok": true, "game": "g1"}
+    {"id": 2, "op": "move", "game": "g1", "move": "h2e2"} -> {"id": 2, "ok": true, "accepted": true, ...}
+    {"id": 3, "op": "state", "game": "g1"}                -> {"id": 3, "ok": true, "fen": "...", ...}
+    {"id": 4, "op": "legal", "game": "g1"}                -> {"id": 4, "ok": true, "moves": ["h2e2", ...]}
+    {"id": 5, "op": "close", "game": "g1"}                -> {"id": 5, "ok": true}
+    {"id": 6, "op": "stats"}                              -> {"id": 6, "ok": true, "sessions": 1, ...}
+失敗時回應 {"id": ..., "ok": false, "error": "..."}。
+"""
+
+import asyncio
+import itertools
+import json
+import math
+import random
+import time
+import tracemalloc
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .chess_engine import ChessEngine
+from .notation import NotationError, format_iccs, parse_iccs
+
+# 每局佇列中最多等待的請求數，超過時提交者會等待（背壓）
+DEFAULT_QUEUE_SIZE = 64
+DEFAULT_VALIDATION_WORKERS = 2
+# 延遲統計保留最近的樣本數
+LATENCY_SAMPLES = 100000
+
+def percentile(samples, fraction):
+    """以最近秩法取百分位數；無樣本時回傳 0"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[max(1, math.ceil(len(ordered) * fraction)) - 1]
+
+class MoveResult:
+    """一次移動提交的結果：被拒絕時 reason 說明原因"""
+
+    __slots__ = ('accepted', 'reason', 'game_result', 'turn', 'latency_ms')
+
+    def __init__(self, accepted, reason, game_result, turn, latency_ms=0.0):
+        self.accepted = accepted
+        self.reason = reason
+        self.game_result = game_result
+        self.turn = turn
+        self.latency_ms = latency_ms
+
+    def to_dict(self):
+        return {'accepted': self.accepted, 'reason': self.reason, 'result': self.game_result,
+                'turn': self.turn, 'latency_ms': round(self.latency_ms, 3)}
+
+class GameSession:
+    """一局對局：引擎與其請求佇列"""
+
+    __slots__ = ('game_id', 'engine', 'queue', 'worker', 'moves')
+
+    def __init__(self, game_id, engine, queue_size=DEFAULT_QUEUE_SIZE):
+        self.game_id = game_id
+        self.engine = engine
+        self.queue = asyncio.Queue(queue_size)
+        # 佇列有請求時才建立的工作協程
+        self.worker = None
+        self.moves = 0
+
+    def quick_reject(self, move):
+        """在事件迴圈上可立即判定的拒絕原因；需要完整驗證時回傳 None"""
+        engine = self.engine
+        if engine.game_result != "Continue":
+            return "對局已結束"
+        from_row, from_col, to_row, to_col = move
+        if (from_row, from_col) == (to_row, to_col):
+            return "起點與終點相同"
+        piece = engine.board.get((from_row, from_col))
+        if piece is None:
+            return "起點沒有棋子"
+        if not engine.turn_manager.is_valid_turn(piece['color']):
+            return "不是該方的回合"
+        target = engine.board.get((to_row, to_col))
+        if target is not None and target['color'] == piece['color']:
+            return "不能吃自己的棋子"
+        destinations = engine.possible_destinations(from_row, from_col)
+        if destinations is not None and (to_row, to_col) not in destinations:
+            return "棋子無法到達該位置"
+        return None
+
+    def state(self):
+        engine = self.engine
+        return {'game': self.game_id, 'fen': engine.to_fen(), 'result': engine.game_result,
+                'turn': engine.turn_manager.current_turn, 'moves': self.moves}
+
+class GameServer:
+    """對局登錄表與請求排程
+
+    validation_workers 為完整規則驗證用的執行緒數上限；設為 0 時直接在事件迴圈上驗證。
+    """
+
+    def __init__(self, validation_workers=DEFAULT_VALIDATION_WORKERS, queue_size=DEFAULT_QUEUE_SIZE):
+        self.sessions = {}
+        self.queue_size = queue_size
+        self.executor = ThreadPoolExecutor(validation_workers) if validation_workers > 0 else None
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.moves_processed = 0
+        self._ids = itertools.count(1)
+
+    def close(self):
+        """取消所有對局的工作協程並關閉執行緒池"""
+        for session in self.sessions.values():
+            self._cancel_requests(session)
+        self.sessions.clear()
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+
+    def create_game(self, fen=None):
+        """建立新對局（預設為標準開局），回傳 GameSession"""
+        if fen is None:
+            engine = ChessEngine()
+            engine.setup_initial_board()
+        else:
+            engine = ChessEngine.from_fen(fen)
+        game_id = f"g{next(self._ids)}"
+        session = GameSession(game_id, engine, self.queue_size)
+        self.sessions[game_id] = session
+        return session
+
+    def get_session(self, game_id):
+        session = self.sessions.get(game_id)
+        if session is None:
+            raise ValueError(f"找不到對局: {game_id}")
+        return session
+
+    def close_game(self, game_id):
+        session = self.sessions.pop(game_id, None)
+        if session is None:
+            raise ValueError(f"找不到對局: {game_id}")
+        self._cancel_requests(session)
+
+    @staticmethod
+    def _cancel_requests(session):
+        """停止該局的工作協程，尚未處理的請求以錯誤結束"""
+        if session.worker is not None:
+            session.worker.cancel()
+        while not session.queue.empty():
+            _, _, future = session.queue.get_nowait()
+            if not future.done():
+                future.set_exception(ValueError(f"對局已關閉: {session.game_id}"))
+
+    async def submit_move(self, game_id, move):
+        """提交 (from_row, from_col, to_row, to_col) 移動並等待結果，回傳 MoveResult
+
+        同一局的請求依提交順序處理。
+        """
+        session = self.get_session(game_id)
+        started = time.perf_counter()
+        result = await self._enqueue(session, self._apply_move, move)
+        result.latency_ms = (time.perf_counter() - started) * 1000
+        self.latencies.append(result.latency_ms)
+        return result
+
+    async def game_state(self, game_id):
+        """取得對局目前的 FEN、結果與輪次（排在該局已提交的移動之後）"""
+        session = self.get_session(game_id)
+        return await self._enqueue(session, self._read_state, None)
+
+    async def legal_moves(self, game_id):
+        """取得輪到的一方的所有合法移動"""
+        session = self.get_session(game_id)
+        return await self._enqueue(session, self._read_legal_moves, None)
+
+    def stats(self):
+        """伺服器統計：對局數、已處理移動數與移動延遲的 p50/p99（毫秒）"""
+        samples = list(self.latencies)
+        return {'sessions': len(self.sessions), 'moves': self.moves_processed,
+                'p50_ms': round(percentile(samples, 0.50), 3),
+                'p99_ms': round(percentile(samples, 0.99), 3)}
+
+    async def _enqueue(self, session, handler, argument):
+        future = asyncio.get_running_loop().create_future()
+        await session.queue.put((handler, argument, future))
+        if session.worker is None:
+            session.worker = asyncio.ensure_future(self._drain(session))
+        return await future
+
+    async def _drain(self, session):
+        """依序處理該局佇列中的請求，佇列清空後結束"""
+        queue = session.queue
+        try:
+            while not queue.empty():
+                handler, argument, future = queue.get_nowait()
+                try:
+                    result = await handler(session, argument)
+                except asyncio.CancelledError:
+                    if not future.done():
+                        future.set_exception(ValueError(f"對局已關閉: {session.game_id}"))
+                    raise
+                except Exception as error:
+                    if not future.done():
+                        future.set_exception(error)
+                else:
+                    if not future.done():
+                        future.set_result(result)
+        finally:
+            session.worker = None
+
+    async def _apply_move(self, session, move):
+        engine = session.engine
+        reason = session.quick_reject(move)
+        if reason is None:
+            if await self._validate(engine.move_piece, *move):
+                session.moves += 1
+                self.moves_processed += 1
+            else:
+                reason = "移動不合法"
+        return MoveResult(reason is None, reason, engine.game_result, engine.turn_manager.current_turn)
+
+    async def _read_state(self, session, _):
+        return session.state()
+
+    async def _read_legal_moves(self, session, _):
+        engine = session.engine
+        if engine.game_result != "Continue":
+            return []
+        return await self._validate(engine.generate_legal_moves, engine.turn_manager.current_turn)
+
+    async def _validate(self, function, *arguments):
+        """在驗證執行緒池中執行需要完整規則檢查的呼叫（未設定執行緒池時直接執行）"""
+        if self.executor is None:
+            return function(*arguments)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *arguments)
+
+    async def start_tcp(self, host='127.0.0.1', port=0):
+        """在 TCP 上提供行分隔 JSON 協定，回傳 asyncio.Server（port 為 0 時自動選擇）"""
+        return await asyncio.start_server(self._handle_connection, host, port)
+
+    async def start_unix(self, path):
+        """在 Unix socket 上提供行分隔 JSON 協定，回傳 asyncio.Server"""
+        return await asyncio.start_unix_server(self._handle_connection, path)
+
+    async def _handle_connection(self, reader, writer):
+        # 每個請求各自成為一個工作，等待移動時不阻塞同一連線上的其他請求
+        write_lock = asyncio.Lock()
+        pending = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                task = asyncio.ensure_future(self._respond(line, writer, write_lock))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, line, writer, write_lock):
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("請求必須是 JSON 物件")
+            request_id = request.get('id')
+            response = await self._dispatch(request)
+            response['ok'] = True
+        except (ValueError, TypeError) as error:
+            response = {'ok': False, 'error': str(error)}
+        except Exception as error:
+            # 任何未預期的錯誤都要回應，否則客戶端會一直等待
+            response = {'ok': False, 'error': f"內部錯誤: {type(error).__name__}: {error}"}
+        response['id'] = request_id
+        async with write_lock:
+            writer.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+            await writer.drain()
+
+    @staticmethod
+    def _string_field(request, name, required=True):
+        """取出請求中的字串欄位；缺少（且必要）或型別不符時引發 ValueError"""
+        value = request.get(name)
+        if value is None and not required:
+            return None
+        if not isinstance(value, str):
+            raise ValueError(f"欄位 {name} 必須是字串")
+        return value
+
+    async def _dispatch(self, request):
+        op = request.get('op')
+        if op == 'new':
+            return {'game': self.create_game(self._string_field(request, 'fen', required=False)).game_id}
+        if op == 'move':
+            game_id = self._string_field(request, 'game')
+            try:
+                move = parse_iccs(self._string_field(request, 'move'))
+            except NotationError as error:
+                raise ValueError(error.reason) from None
+            return (await self.submit_move(game_id, move)).to_dict()
+        if op == 'state':
+            return await self.game_state(self._string_field(request, 'game'))
+        if op == 'legal':
+            game_id = self._string_field(request, 'game')
+            return {'moves': [format_iccs(move) for move in await self.legal_moves(game_id)]}
+        if op == 'close':
+            self.close_game(self._string_field(request, 'game'))
+            return {}
+        if op == 'stats':
+            return self.stats()
+        raise ValueError(f"未知的操作: {op}")
+
+class GameClient:
+    """行分隔 JSON 協定的測試用客戶端，可同時送出多個請求"""
+
+    def __init__(self, reader, writer):
+        self._reader = reader
+        self._writer = writer
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._receiver = asyncio.ensure_future(self._receive())
+
+    @classmethod
+    async def connect(cls, host, port):
+        return cls(*await asyncio.open_connection(host, port))
+
+    @classmethod
+    async def connect_unix(cls, path):
+        return cls(*await asyncio.open_unix_connection(path))
+
+    async def request(self, op, **fields):
+        """送出請求並等待對應 id 的回應（dict）"""
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        message = dict(fields, id=request_id, op=op)
+        self._writer.write(json.dumps(message).encode('utf-8') + b'\n')
+        await self._writer.drain()
+        return await future
+
+    async def close(self):
+        self._writer.close()
+        await self._receiver
+
+    async def _receive(self):
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    break
+                response = json.loads(line)
+                future = self._pending.pop(response.get('id'), None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("伺服器已關閉連線"))
+            self._pending.clear()
+
+class LoadReport:
+    """合成負載的量測結果"""
+
+    __slots__ = ('games', 'moves', 'rejected', 'elapsed', 'bytes_per_session', 'p50_ms', 'p99_ms')
+
+    def __init__(self, games, moves, rejected, elapsed, bytes_per_session, p50_ms, p99_ms):
+        self.games = games
+        self.moves = moves
+        self.rejected = rejected
+        self.elapsed = elapsed
+        self.bytes_per_session = bytes_per_session
+        self.p50_ms = p50_ms
+        self.p99_ms = p99_ms
+
+    def __repr__(self):
+        return (f"LoadReport(games={self.games}, moves={self.moves}, rejected={self.rejected}, "
+                f"elapsed={self.elapsed:.2f}s, bytes_per_session={self.bytes_per_session}, "
+                f"p50_ms={self.p50_ms:.3f}, p99_ms={self.p99_ms:.3f})")
+
+async def run_synthetic_load(server, games=100, moves_per_game=10, seed=0):
+    """同時進行 games 局隨機合法走子的對局，量測每局記憶體與移動延遲
+
+    每局記憶體以 tracemalloc 量測建立對局時配置的位元組（不含走子期間增加的歷史），
+    走子期間不追蹤配置以免影響延遲。
+    """
+    rng = random.Random(seed)
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    sessions = [server.create_game() for _ in range(games)]
+    allocated = tracemalloc.get_traced_memory()[0] - before
+    if not was_tracing:
+        tracemalloc.stop()
+
+    latencies = []
+    rejected = 0
+
+    async def play(session):
+        nonlocal rejected
+        for _ in range(moves_per_game):
+            moves = await server.legal_moves(session.game_id)
+            if not moves:
+                return
+            result = await server.submit_move(session.game_id, rng.choice(moves))
+            latencies.append(result.latency_ms)
+            if not result.accepted:
+                rejected += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(play(session) for session in sessions))
+    elapsed = time.perf_counter() - started
+    return LoadReport(games, len(latencies), rejected, elapsed, allocated // max(games, 1),
+                      percentile(latencies, 0.50), percentile(latencies, 0.99))
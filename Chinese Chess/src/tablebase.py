@@ -0,0 +1,373 @@
+"""殘局庫：以逆向分析產生小子力殘局的勝/和/負與距離殺棋的步數
+
+每種棋子只在驗證器實際可到達的格子集合上編號（由開局位置出發，以該棋種驗證器
+在空棋盤上的走法求閉包：將帥限於九宮、士限於九宮斜線、象限於己方七個象位、
+兵卒限於其可走到的格子），局面索引為各棋子格子編號的混合進位數。
+
+每個局面存一個 16 位元值：高 2 位元為結果（以輪到的一方為準），低 14 位元為
+距離殺棋的層數。走法與將軍判定全部沿用 ChessEngine 的驗證器，包含將帥照面規則。
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from .board import COLORS, PIECE_TYPES, get_piece
+from .chess_engine import ChessEngine
+
+DRAW = 0
+WIN = 1
+LOSS = 2
+ILLEGAL = 3
+RESULT_NAMES = {DRAW: 'draw', WIN: 'win', LOSS: 'loss', ILLEGAL: 'illegal'}
+DISTANCE_MASK = 0x3FFF
+
+MAGIC = b'XQTB\x00\x00\x00\x01'
+HEADER = struct.Struct('<8s32sQ')
+FILE_SUFFIX = '.xtb'
+
+PIECE_LETTERS = {
+    'General': 'K',
+    'Guard': 'A',
+    'Elephant': 'E',
+    'Horse': 'H',
+    'Rook': 'R',
+    'Cannon': 'C',
+    'Soldier': 'P',
+}
+LETTER_TYPES = {letter: piece_type for piece_type, letter in PIECE_LETTERS.items()}
+
+_SQUARE_SETS = {}
+
+def piece_squares(color, piece_type):
+    """取得指定棋子可能出現的格子（依 (row, col) 排序）"""
+    key = (color, piece_type)
+    squares = _SQUARE_SETS.get(key)
+    if squares is None:
+        engine = ChessEngine()
+        engine.setup_initial_board()
+        frontier = [square for square, piece in engine.board.items()
+                    if piece['color'] == color and piece['type'] == piece_type]
+        if not frontier:
+            # 開局沒有的棋種：全盤皆可
+            frontier = [(row, col) for row in range(1, 11) for col in range(1, 10)]
+        validator = engine.validators[piece_type]
+        piece = get_piece(color, piece_type)
+        reached = set(frontier)
+        while frontier:
+            row, col = frontier.pop()
+            for target in validator.generate_moves({(row, col): piece}, row, col, piece):
+                if target not in reached:
+                    reached.add(target)
+                    frontier.append(target)
+        squares = tuple(sorted(reached))
+        _SQUARE_SETS[key] = squares
+    return squares
+
+def mirror_square(row, col):
+    """紅黑互換的鏡像格子"""
+    return 11 - row, col
+
+class Material:
+    """殘局子力組合：雙方將帥以外的棋子，例如 KR-KAA"""
+
+    def __init__(self, red=(), black=()):
+        self.red = tuple(sorted(red, key=PIECE_TYPES.index))
+        self.black = tuple(sorted(black, key=PIECE_TYPES.index))
+        # 表中的棋子順序：紅帥、黑將、紅方其餘、黑方其餘
+        self.pieces = ((('Red', 'General'), ('Black', 'General'))
+                       + tuple(('Red', piece_type) for piece_type in self.red)
+                       + tuple(('Black', piece_type) for piece_type in self.black))
+
+    @classmethod
+    def from_signature(cls, signature):
+        """由 'KR-KAA' 形式的字串建立"""
+        try:
+            red, black = signature.upper().split('-')
+            if red[:1] != 'K' or black[:1] != 'K':
+                raise ValueError
+            return cls([LETTER_TYPES[letter] for letter in red[1:]],
+                       [LETTER_TYPES[letter] for letter in black[1:]])
+        except (KeyError, ValueError):
+            raise ValueError(f"不合法的殘局子力: {signature!r}") from None
+
+    @classmethod
+    def from_board(cls, board):
+        """由棋盤取得子力組合；任一方不是恰好一個將帥時回傳 None"""
+        pieces = {'Red': [], 'Black': []}
+        generals = {'Red': 0, 'Black': 0}
+        for piece in board.values():
+            if piece['type'] == 'General':
+                generals[piece['color']] += 1
+            else:
+                pieces[piece['color']].append(piece['type'])
+        if generals != {'Red': 1, 'Black': 1}:
+            return None
+        return cls(pieces['Red'], pieces['Black'])
+
+    @property
+    def signature(self):
+        red = 'K' + ''.join(PIECE_LETTERS[piece_type] for piece_type in self.red)
+        black = 'K' + ''.join(PIECE_LETTERS[piece_type] for piece_type in self.black)
+        return f"{red}-{black}"
+
+    def mirrored(self):
+        """紅黑互換"""
+        return Material(self.black, self.red)
+
+    def without(self, position):
+        """移除表中第 position 個棋子（不可為將帥）後的子力"""
+        color, piece_type = self.pieces[position]
+        red = list(self.red)
+        black = list(self.black)
+        (red if color == 'Red' else black).remove(piece_type)
+        return Material(red, black)
+
+    def __eq__(self, other):
+        return isinstance(other, Material) and self.signature == other.signature
+
+    def __hash__(self):
+        return hash(self.signature)
+
+    def __repr__(self):
+        return f"Material({self.signature!r})"
+
+class Tablebase:
+    """單一子力組合的殘局表；values 為 array('H') 或 mmap 上的 memoryview"""
+
+    def __init__(self, material, values, _mmap=None):
+        self.material = material
+        self.values = values
+        self._mmap = _mmap
+        self.square_sets = [piece_squares(color, piece_type) for color, piece_type in material.pieces]
+        self.square_index = [{square: index for index, square in enumerate(squares)}
+                             for squares in self.square_sets]
+        self.strides = []
+        size = 1
+        for squares in reversed(self.square_sets):
+            self.strides.append(size)
+            size *= len(squares)
+        self.strides.reverse()
+        self.position_count = size
+
+    def close(self):
+        if self._mmap is not None:
+            self.values.release()
+            self._mmap.close()
+            self._mmap = None
+
+    def encode(self, squares):
+        """將依表中棋子順序排列的格子轉為局面索引；有棋子不在其格子集合時回傳 None"""
+        index = 0
+        for square, lookup, stride in zip(squares, self.square_index, self.strides):
+            position = lookup.get(square)
+            if position is None:
+                return None
+            index += position * stride
+        return index
+
+    def decode(self, index):
+        """將局面索引轉回依表中棋子順序排列的格子"""
+        squares = []
+        for square_set, stride in zip(self.square_sets, self.strides):
+            position, index = divmod(index, stride)
+            squares.append(square_set[position])
+        return squares
+
+    def value(self, index, side):
+        """回傳 (結果, 距離)；side 為輪到的一方（0 = 紅，1 = 黑）"""
+        value = self.values[index * 2 + side]
+        return value >> 14, value & DISTANCE_MASK
+
+    def probe_board(self, board, current_turn, mirrored=False):
+        """查詢棋盤局面；子力不符、有棋子不在格子集合或局面不可能出現時回傳 None"""
+        remaining = {}
+        for (row, col), piece in board.items():
+            color = piece['color']
+            if mirrored:
+                row, col = mirror_square(row, col)
+                color = 'Black' if color == 'Red' else 'Red'
+            remaining.setdefault((color, piece['type']), []).append((row, col))
+        squares = []
+        for piece in self.material.pieces:
+            candidates = remaining.get(piece)
+            if not candidates:
+                return None
+            squares.append(candidates.pop())
+        if any(remaining.values()):
+            return None
+        index = self.encode(squares)
+        if index is None:
+            return None
+        side = COLORS.index(current_turn)
+        if mirrored:
+            side = 1 - side
+        result, distance = self.value(index, side)
+        # 不可能出現的局面（例如輪到的一方可直接吃將）不提供結果
+        return None if result == ILLEGAL else (result, distance)
+
+    def save(self, path):
+        """寫入殘局表檔案"""
+        values = self.values if isinstance(self.values, array) else array('H', self.values)
+        if sys.byteorder != 'little':
+            values = array('H', values)
+            values.byteswap()
+        with open(path, 'wb') as stream:
+            stream.write(HEADER.pack(MAGIC, self.material.signature.encode('ascii'), self.position_count))
+            values.tofile(stream)
+
+    @classmethod
+    def load(cls, path):
+        """以 mmap 開啟殘局表檔案，不讀入記憶體"""
+        with open(path, 'rb') as stream:
+            mapped = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, signature, position_count = HEADER.unpack_from(mapped, 0)
+        if magic != MAGIC:
+            mapped.close()
+            raise ValueError(f"不是殘局表檔案: {path}")
+        material = Material.from_signature(signature.rstrip(b'\x00').decode('ascii'))
+        values = memoryview(mapped)[HEADER.size:HEADER.size + position_count * 4].cast('H')
+        table = cls(material, values, mapped)
+        if table.position_count != position_count or len(values) != position_count * 2:
+            table.close()
+            raise ValueError(f"殘局表檔案與子力不符: {path}")
+        return table
+
+class TablebaseGenerator:
+    """逆向分析產生器；產生時會先遞迴產生吃子後的子力表"""
+
+    def __init__(self):
+        self.tables = {}
+
+    def build(self, material):
+        """產生（或取得已產生的）殘局表；material 可為 Material 或 'KR-K' 字串"""
+        if isinstance(material, str):
+            material = Material.from_signature(material)
+        table = self.tables.get(material)
+        if table is None:
+            table = Tablebase(material, self._generate(material))
+            self.tables[material] = table
+        return table
+
+    def _generate(self, material):
+        subtables = {position: self.build(material.without(position))
+                     for position in range(2, len(material.pieces))}
+        table = Tablebase(material, None)
+        entry_count = table.position_count * 2
+        values = array('H', bytes(entry_count * 2))
+        parents = [None] * entry_count
+        counts = array('l', bytes(entry_count * array('l').itemsize))
+        # buckets[d]：距離 d 的子局面結果事件 (父局面, 子局面結果, 子局面距離)
+        buckets = {}
+
+        def resolve(entry, result, distance):
+            values[entry] = result << 14 | distance
+            for parent in parents[entry] or ():
+                buckets.setdefault(distance, []).append((parent, result, distance))
+
+        engine = ChessEngine()
+        pieces = material.pieces
+        terminal = []
+        for index in range(table.position_count):
+            squares = table.decode(index)
+            if len(set(squares)) < len(squares):
+                values[index * 2] = values[index * 2 + 1] = ILLEGAL << 14
+                continue
+            engine.setup_empty_board()
+            for (color, piece_type), (row, col) in zip(pieces, squares):
+                engine.place_piece(color, piece_type, row, col)
+            occupant = {square: position for position, square in enumerate(squares)}
+            for side, color in enumerate(COLORS):
+                entry = index * 2 + side
+                opponent = COLORS[1 - side]
+                if engine.checkmate_detector.is_in_check(opponent):
+                    # 輪到的一方可以直接吃將：不可能出現的局面
+                    values[entry] = ILLEGAL << 14
+                    continue
+                moves = engine.generate_legal_moves(color)
+                if not moves:
+                    terminal.append(entry)
+                    continue
+                counts[entry] = len(moves)
+                for from_row, from_col, to_row, to_col in moves:
+                    child_squares = list(squares)
+                    child_squares[occupant[(from_row, from_col)]] = (to_row, to_col)
+                    captured = occupant.get((to_row, to_col))
+                    if captured is None:
+                        child = table.encode(child_squares) * 2 + 1 - side
+                        if parents[child] is None:
+                            parents[child] = []
+                        parents[child].append(entry)
+                        continue
+                    del child_squares[captured]
+                    subtable = subtables[captured]
+                    result, distance = subtable.value(subtable.encode(child_squares), 1 - side)
+                    if result in (WIN, LOSS):
+                        buckets.setdefault(distance, []).append((entry, result, distance))
+
+        # 無合法移動：輪到的一方落敗
+        for entry in terminal:
+            resolve(entry, LOSS, 0)
+        distance = 0
+        while buckets:
+            for parent, result, child_distance in buckets.pop(distance, ()):
+                if values[parent]:
+                    continue
+                if result == LOSS:
+                    resolve(parent, WIN, child_distance + 1)
+                else:
+                    counts[parent] -= 1
+                    if counts[parent] == 0:
+                        resolve(parent, LOSS, child_distance + 1)
+            distance += 1
+        return values
+
+class TablebaseSet:
+    """多個殘局表的集合，依局面子力選擇表（含紅黑互換）"""
+
+    def __init__(self, tables=()):
+        self.tables = {}
+        for table in tables:
+            self.add(table)
+
+    def add(self, table):
+        self.tables[table.material] = table
+
+    def load_directory(self, directory):
+        """載入目錄下所有殘局表檔案"""
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(FILE_SUFFIX):
+                self.add(Tablebase.load(os.path.join(directory, name)))
+        return self
+
+    def close(self):
+        for table in self.tables.values():
+            table.close()
+
+    def probe(self, board, current_turn):
+        """回傳 (結果, 距離) 或 None（無對應殘局表）；結果以輪到的一方為準"""
+        material = Material.from_board(board)
+        if material is None:
+            return None
+        table = self.tables.get(material)
+        if table is not None:
+            return table.probe_board(board, current_turn)
+        table = self.tables.get(material.mirrored())
+        if table is not None:
+            return table.probe_board(board, current_turn, mirrored=True)
+        return None
+
+def generate_tablebases(signatures, directory):
+    """產生指定子力（與其吃子後的子力）的殘局表檔案，回傳寫出的路徑列表"""
+    generator = TablebaseGenerator()
+    for signature in signatures:
+        generator.build(signature)
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for material, table in generator.tables.items():
+        path = os.path.join(directory, material.signature + FILE_SUFFIX)
+        table.save(path)
+        paths.append(path)
+    return paths
@@ -0,0 +1,161 @@
+"""固定大小的置換表：以 Zobrist 鍵值索引，預先配置的整數陣列儲存"""
+
+from .board import pack_move, unpack_move
+
+BOUND_NONE = 0
+BOUND_LOWER = 1
+BOUND_UPPER = 2
+BOUND_EXACT = 3
+
+# 每個 bucket 兩個槽：0 為深度優先，1 為一律取代；每槽為 (鍵值, 資料) 兩個 64 位元整數
+SLOTS_PER_BUCKET = 2
+WORDS_PER_SLOT = 2
+BUCKET_BYTES = SLOTS_PER_BUCKET * WORDS_PER_SLOT * 8
+
+# 資料欄位配置（低位到高位）：移動 14 位元、分數 16 位元、深度 8 位元、界限 2 位元、世代 6 位元
+MOVE_BITS, SCORE_BITS, DEPTH_BITS, BOUND_BITS, AGE_BITS = 14, 16, 8, 2, 6
+SCORE_SHIFT = MOVE_BITS
+DEPTH_SHIFT = SCORE_SHIFT + SCORE_BITS
+BOUND_SHIFT = DEPTH_SHIFT + DEPTH_BITS
+AGE_SHIFT = BOUND_SHIFT + BOUND_BITS
+SCORE_OFFSET = 1 << (SCORE_BITS - 1)
+MAX_DEPTH = (1 << DEPTH_BITS) - 1
+AGE_MASK = (1 << AGE_BITS) - 1
+KEY_MASK = (1 << 64) - 1
+
+def pack_entry(depth, score, bound, move, age):
+    """將條目欄位壓縮為單一 64 位元整數"""
+    if not -SCORE_OFFSET < score < SCORE_OFFSET:
+        raise ValueError(f"分數超出置換表範圍: {score}")
+    packed_move = pack_move(move) if move else 0
+    return (packed_move
+            | (score + SCORE_OFFSET) << SCORE_SHIFT
+            | min(depth, MAX_DEPTH) << DEPTH_SHIFT
+            | bound << BOUND_SHIFT
+            | (age & AGE_MASK) << AGE_SHIFT)
+
+class TTEntry:
+    """置換表查詢結果"""
+
+    __slots__ = ('depth', 'score', 'bound', 'move')
+
+    def __init__(self, data):
+        packed_move = data & ((1 << MOVE_BITS) - 1)
+        self.move = unpack_move(packed_move) if packed_move else None
+        self.score = (data >> SCORE_SHIFT & ((1 << SCORE_BITS) - 1)) - SCORE_OFFSET
+        self.depth = data >> DEPTH_SHIFT & MAX_DEPTH
+        self.bound = data >> BOUND_SHIFT & 3
+
+    def __repr__(self):
+        return f"TTEntry(depth={self.depth}, score={self.score}, bound={self.bound}, move={self.move})"
+
+class TranspositionTable:
+    """有記憶體上限的置換表
+
+    以 size_mb 在建構時決定容量，之後不再成長。每個 bucket 有一個深度優先槽
+    與一個一律取代槽；鍵值以 key ^ data 儲存，讀取時可偵測被同時寫入破壞的條目。
+    也可傳入既有的可寫緩衝區（例如共享記憶體）作為儲存空間。
+    """
+
+    def __init__(self, size_mb=16, buffer=None):
+        if buffer is None:
+            size_bytes = int(size_mb * 1024 * 1024)
+            if size_bytes < BUCKET_BYTES:
+                raise ValueError(f"置換表容量過小: {size_mb} MB")
+            buffer = bytearray(size_bytes - size_bytes % BUCKET_BYTES)
+        self.bucket_count = len(buffer) // BUCKET_BYTES
+        if self.bucket_count == 0:
+            raise ValueError("置換表緩衝區過小")
+        self._bytes = memoryview(buffer)[:self.bucket_count * BUCKET_BYTES]
+        self._words = self._bytes.cast('Q')
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+
+    def release(self):
+        """釋放對緩衝區的參照（使用共享記憶體時，關閉前必須呼叫）"""
+        self._words.release()
+        self._bytes.release()
+
+    @staticmethod
+    def bytes_for(size_mb):
+        """計算指定容量實際使用的位元組數"""
+        size_bytes = int(size_mb * 1024 * 1024)
+        return size_bytes - size_bytes % BUCKET_BYTES
+
+    @property
+    def size_bytes(self):
+        return self.bucket_count * BUCKET_BYTES
+
+    def _bucket_offset(self, key):
+        return (key % self.bucket_count) * SLOTS_PER_BUCKET * WORDS_PER_SLOT
+
+    def new_search(self):
+        """開始新的搜尋：推進世代，舊世代的條目優先被取代"""
+        self.generation = (self.generation + 1) & AGE_MASK
+
+    def clear(self):
+        """清空所有條目與統計"""
+        self._bytes[:] = bytes(len(self._bytes))
+        self.generation = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+
+    def probe(self, key):
+        """查詢鍵值，命中時回傳 TTEntry，否則回傳 None"""
+        key &= KEY_MASK
+        words = self._words
+        offset = self._bucket_offset(key)
+        for slot in range(SLOTS_PER_BUCKET):
+            index = offset + slot * WORDS_PER_SLOT
+            data = words[index + 1]
+            if data and words[index] ^ data == key:
+                self.hits += 1
+                return TTEntry(data)
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, score, bound, move=None):
+        """寫入條目；深度優先槽只被同一局面、較深或較舊的結果取代"""
+        key &= KEY_MASK
+        words = self._words
+        offset = self._bucket_offset(key)
+        data = pack_entry(depth, score, bound, move, self.generation)
+
+        preferred_data = words[offset + 1]
+        preferred_key = words[offset] ^ preferred_data
+        if preferred_data and preferred_key == key and move is None:
+            # 同一局面沒有新的最佳移動時保留舊的
+            data |= preferred_data & ((1 << MOVE_BITS) - 1)
+        if (not preferred_data
+                or preferred_key == key
+                or (preferred_data >> AGE_SHIFT) != self.generation
+                or depth >= (preferred_data >> DEPTH_SHIFT & MAX_DEPTH)):
+            index = offset
+        else:
+            index = offset + WORDS_PER_SLOT
+        old_data = words[index + 1]
+        if old_data and words[index] ^ old_data != key:
+            self.collisions += 1
+        words[index] = key ^ data
+        words[index + 1] = data
+
+    def hashfull(self):
+        """取樣前 1000 個槽，回傳目前世代條目所佔的千分比"""
+        words = self._words
+        sample = min(1000, self.bucket_count * SLOTS_PER_BUCKET)
+        used = 0
+        for slot in range(sample):
+            data = words[slot * WORDS_PER_SLOT + 1]
+            if data and data >> AGE_SHIFT == self.generation:
+                used += 1
+        return used * 1000 // sample
+
+    def stats(self):
+        """回傳命中、未命中與碰撞次數"""
+        return {'hits': self.hits, 'misses': self.misses, 'collisions': self.collisions}
@@ -0,0 +1,275 @@
+"""UCCI 協定前端：以標準輸入/輸出與象棋介面或裁判程式溝通
+
+支援的指令：ucci、isready、setoption hashsize、position {fen <FEN> | startpos} [moves ...]、
+go [ponder | infinite] [depth | nodes | time [increment] [movestogo] | movetime]、stop、
+ponderhit 與 quit。搜尋在背景執行緒中進行，主迴圈持續讀取指令，stop 會立即中止搜尋
+並回覆 bestmove。position 只套用與上一次相比新增的移動（必要時先退回共同的前段），
+不會每次重建 ChessEngine。移動以 ICCS 座標收送，不換算兵卒方向（見 notation 模組說明）。
+"""
+
+import sys
+import threading
+
+from .chess_engine import ChessEngine
+from .fen import INITIAL_FEN
+from .notation import NotationError, format_iccs, parse_iccs
+from .search import MAX_PLY, Searcher
+from .transposition import TranspositionTable
+
+ENGINE_NAME = "AI-100x Xiangqi"
+ENGINE_AUTHOR = "AI-100x SE Join Quest"
+DEFAULT_HASH_MB = 16
+MAX_HASH_MB = 1024
+# 未指定 movestogo 時假設還要走的步數
+DEFAULT_MOVES_TO_GO = 30
+# 保留給通訊與行程排程的時間（毫秒）
+TIME_SAFETY_MARGIN_MS = 50
+
+_GO_FLAGS = frozenset(('ponder', 'infinite', 'draw'))
+_GO_VALUES = frozenset(('depth', 'nodes', 'time', 'increment', 'movestogo', 'movetime',
+                        'opptime', 'oppincrement', 'oppmovestogo'))
+
+def allocate_time(remaining_ms, increment_ms=0, moves_to_go=None):
+    """依剩餘時間、每步加秒與剩餘步數分配本步的思考時間（毫秒）"""
+    moves = moves_to_go if moves_to_go else DEFAULT_MOVES_TO_GO
+    budget = remaining_ms // moves + increment_ms
+    return max(1, min(budget, remaining_ms - TIME_SAFETY_MARGIN_MS))
+
+def parse_go(tokens):
+    """解析 go 之後的參數，回傳 {名稱: 值}；ponder/infinite/draw 為布林值"""
+    options = {flag: False for flag in _GO_FLAGS}
+    index = 0
+    while index < len(tokens):
+        token = tokens[index]
+        if token in _GO_FLAGS:
+            options[token] = True
+            index += 1
+        elif token in _GO_VALUES and index + 1 < len(tokens):
+            try:
+                options[token] = int(tokens[index + 1])
+            except ValueError:
+                raise ValueError(f"go 參數 {token} 需要整數: {tokens[index + 1]!r}") from None
+            index += 2
+        else:
+            raise ValueError(f"無法解析的 go 參數: {token!r}")
+    return options
+
+def parse_position(tokens):
+    """解析 position 之後的參數，回傳 (FEN, [ICCS 移動])"""
+    if not tokens:
+        raise ValueError("position 需要 fen 或 startpos")
+    if 'moves' in tokens:
+        split = tokens.index('moves')
+        position_tokens, moves = tokens[:split], tokens[split + 1:]
+    else:
+        position_tokens, moves = tokens, []
+    if position_tokens == ['startpos']:
+        fen = INITIAL_FEN
+    elif position_tokens[0] == 'fen' and len(position_tokens) > 1:
+        fen = ' '.join(position_tokens[1:])
+    else:
+        raise ValueError(f"無法解析的 position 參數: {' '.join(position_tokens)!r}")
+    return fen, [move.lower() for move in moves]
+
+class UCCIEngine:
+    """UCCI 指令處理器：維護目前局面，並在背景執行緒中執行搜尋
+
+    handle() 每次處理一行指令，回傳 False 表示收到 quit。輸出由主執行緒與搜尋執行緒
+    共用，以鎖保護每一行的完整性。
+    """
+
+    def __init__(self, output=None, hash_mb=DEFAULT_HASH_MB):
+        self.output = output if output is not None else sys.stdout
+        self._output_lock = threading.Lock()
+        self.engine = ChessEngine.from_fen(INITIAL_FEN)
+        # 目前局面的起始 FEN 與其後已套用到 engine 的移動
+        self.base_fen = INITIAL_FEN
+        self.moves = []
+        self.tt = TranspositionTable(hash_mb)
+        self._search_thread = None
+        self._stop_event = None
+        # ponder/infinite 搜尋結束後先保留 bestmove，直到 ponderhit 或 stop
+        self._release_event = None
+        self._ponder_movetime = None
+        self._timer = None
+        self._commands = {
+            'ucci': self._handle_ucci,
+            'isready': self._handle_isready,
+            'setoption': self._handle_setoption,
+            'position': self._handle_position,
+            'go': self._handle_go,
+            'stop': self._handle_stop,
+            'ponderhit': self._handle_ponderhit,
+        }
+
+    def send(self, line):
+        with self._output_lock:
+            self.output.write(line + '\n')
+            self.output.flush()
+
+    def handle(self, line):
+        """處理一行指令；收到 quit 時停止搜尋並回傳 False"""
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, arguments = tokens[0], tokens[1:]
+        if command == 'quit':
+            self.stop()
+            self.send('bye')
+            return False
+        handler = self._commands.get(command)
+        if handler is None:
+            self.send(f"info string 未知的指令: {command}")
+            return True
+        try:
+            handler(arguments)
+        except ValueError as error:
+            self.send(f"info string {error}")
+        return True
+
+    def run(self, lines):
+        """逐行處理指令直到 quit 或輸入結束"""
+        try:
+            for line in lines:
+                if not self.handle(line):
+                    return
+        finally:
+            self.stop()
+
+    @property
+    def searching(self):
+        return self._search_thread is not None and self._search_thread.is_alive()
+
+    def stop(self):
+        """中止進行中的搜尋，等待其送出 bestmove"""
+        if self._search_thread is None:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._stop_event.set()
+        self._release_event.set()
+        self._search_thread.join()
+        self._search_thread = None
+
+    def wait(self, timeout=None):
+        """等待目前的搜尋自行結束（不中止）；回傳搜尋是否已結束"""
+        if self._search_thread is not None:
+            self._search_thread.join(timeout)
+        return not self.searching
+
+    def set_position(self, fen, moves):
+        """將 engine 設為 fen 之後走 moves 的局面
+
+        起始 FEN 相同時只退回到與上一次共同的前段再套用新增的移動；不合法的移動
+        之後的移動會被略過並回報。
+        """
+        fen = ' '.join(fen.split())
+        if fen == self.base_fen:
+            common = 0
+            for applied, move in zip(self.moves, moves):
+                if applied != move:
+                    break
+                common += 1
+            while len(self.moves) > common:
+                self.engine.unmake_move()
+                self.moves.pop()
+        else:
+            engine = ChessEngine.from_fen(fen)
+            # 沿用已載入的開局庫、殘局庫與評估表
+            engine.opening_book = self.engine.opening_book
+            engine.tablebases = self.engine.tablebases
+            engine.set_evaluation_tables(self.engine.evaluation_tables)
+            self.engine = engine
+            self.base_fen = fen
+            self.moves = []
+        for token in moves[len(self.moves):]:
+            try:
+                move = parse_iccs(token)
+            except NotationError:
+                raise ValueError(f"無法解析的移動: {token}") from None
+            if self.engine.game_result != "Continue" or not self.engine.move_piece(*move):
+                raise ValueError(f"不合法的移動: {token}")
+            self.moves.append(token)
+
+    def _handle_ucci(self, arguments):
+        self.send(f"id name {ENGINE_NAME}")
+        self.send(f"id author {ENGINE_AUTHOR}")
+        self.send(f"option hashsize type spin min 1 max {MAX_HASH_MB} default {DEFAULT_HASH_MB}")
+        self.send("ucciok")
+
+    def _handle_isready(self, arguments):
+        self.send("readyok")
+
+    def _handle_setoption(self, arguments):
+        if len(arguments) >= 2 and arguments[0] == 'hashsize':
+            try:
+                hash_mb = int(arguments[1])
+            except ValueError:
+                raise ValueError(f"hashsize 需要整數: {arguments[1]!r}") from None
+            self.stop()
+            self.tt = TranspositionTable(max(1, min(hash_mb, MAX_HASH_MB)))
+
+    def _handle_position(self, arguments):
+        fen, moves = parse_position(arguments)
+        self.stop()
+        self.set_position(fen, moves)
+
+    def _handle_go(self, arguments):
+        options = parse_go(arguments)
+        self.stop()
+        depth = options.get('depth')
+        nodes = options.get('nodes')
+        movetime = options.get('movetime')
+        if movetime is None and 'time' in options:
+            movetime = allocate_time(options['time'], options.get('increment', 0), options.get('movestogo'))
+        hold = options['ponder'] or options['infinite']
+        if hold:
+            # 思考對方時間或無限搜尋：不限時間，時間預算留到 ponderhit 才開始計算
+            self._ponder_movetime = movetime if options['ponder'] else None
+            movetime = None
+            if depth is None and nodes is None:
+                depth = MAX_PLY
+
+        self._stop_event = threading.Event()
+        self._release_event = threading.Event()
+        if not hold:
+            self._release_event.set()
+        searcher = Searcher(self.engine, self.tt, self._stop_event)
+        self._search_thread = threading.Thread(
+            target=self._run_search, args=(searcher, depth, movetime, nodes, self._release_event),
+            name="ucci-search", daemon=True)
+        self._search_thread.start()
+
+    def _handle_stop(self, arguments):
+        self.stop()
+
+    def _handle_ponderhit(self, arguments):
+        if self._search_thread is None or self._release_event.is_set():
+            return
+        # 對方走了預測的移動：改為正常思考，開始計算時間
+        if self._ponder_movetime is not None:
+            self._timer = threading.Timer(self._ponder_movetime / 1000, self._stop_event.set)
+            self._timer.daemon = True
+            self._timer.start()
+        self._release_event.set()
+
+    def _run_search(self, searcher, depth, movetime, nodes, release_event):
+        result = searcher.search(depth=depth, movetime_ms=movetime, nodes=nodes, on_iteration=self._send_info)
+        release_event.wait()
+        if result.best_move is None:
+            self.send("nobestmove")
+        elif len(result.pv) > 1 and result.pv[0] == result.best_move:
+            self.send(f"bestmove {format_iccs(result.best_move)} ponder {format_iccs(result.pv[1])}")
+        else:
+            self.send(f"bestmove {format_iccs(result.best_move)}")
+
+    def _send_info(self, result):
+        pv = ' '.join(format_iccs(move) for move in result.pv)
+        self.send(f"info depth {result.depth} score {result.score} time {result.time_ms} "
+                  f"nodes {result.nodes} pv {pv}".rstrip())
+
+def main(input_stream=None, output_stream=None):
+    """以 UCCI 協定執行引擎，直到 quit 或輸入結束"""
+    UCCIEngine(output_stream).run(input_stream if input_stream is not None else sys.stdin)
+    return 0
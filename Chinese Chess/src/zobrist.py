@@ -0,0 +1,39 @@
+"""Zobrist 雜湊：以 64 位元亂數表為局面產生可增量更新的鍵值"""
+
+import random
+
+from .board import PIECE_CODES, as_piece, square_index
+
+# 固定種子，讓不同行程與不同次執行得到相同的鍵值
+_rng = random.Random(0x5A0B1257)
+
+# PIECE_KEYS[棋子編碼][sq]；未使用的編碼保留空列表
+PIECE_KEYS = [[] for _ in range(16)]
+for _code in sorted(PIECE_CODES.values()):
+    PIECE_KEYS[_code] = [_rng.getrandbits(64) for _ in range(90)]
+
+# (顏色, 棋種) -> 90 格的鍵值，供以棋子字典操作的 ChessEngine 使用
+ZOBRIST_KEYS = {key: PIECE_KEYS[code] for key, code in PIECE_CODES.items()}
+
+# 輪到黑方時併入的鍵值
+ZOBRIST_SIDE = _rng.getrandbits(64)
+
+def piece_key(piece, row, col):
+    """取得棋子在 (row, col) 的鍵值；未知棋種回傳 0"""
+    code = as_piece(piece).code
+    return PIECE_KEYS[code][square_index(row, col)] if code is not None else 0
+
+def side_key(current_turn):
+    """取得輪次的鍵值"""
+    return ZOBRIST_SIDE if current_turn == 'Black' else 0
+
+def compute_board_key(board):
+    """從頭計算棋盤部分的鍵值（不含輪次）"""
+    key = 0
+    for (row, col), piece in board.items():
+        key ^= piece_key(piece, row, col)
+    return key
+
+def compute_key(board, current_turn):
+    """從頭計算完整局面鍵值"""
+    return compute_board_key(board) ^ side_key(current_turn)
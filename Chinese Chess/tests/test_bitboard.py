@@ -0,0 +1,78 @@
+import random
+
+import pytest
+from src.bitboard import FILE_ROOK, RANK_CANNON, RANK_ROOK
+from src.board import square_from_index, square_index
+from src.chess_engine import ChessEngine
+
+from test_move_generation import random_engine
+
+def to_engine_moves(moves):
+    """將 (from_sq, to_sq) 轉為 (from_row, from_col, to_row, to_col)"""
+    return sorted(square_from_index(from_sq) + square_from_index(to_sq) for from_sq, to_sq in moves)
+
+class TestLineTables:
+    """車與炮的直線查表測試"""
+
+    def test_rank_tables(self):
+        """測試橫線查表"""
+        # 車在第 3 格，第 1、6、8 格有棋子
+        occupancy = 0b010100101
+        assert RANK_ROOK[2][occupancy] == 0b000111011
+        assert RANK_CANNON[2][occupancy] == 0b010000000
+
+    def test_file_table_layout(self):
+        """測試直線查表使用棋盤位元配置"""
+        assert FILE_ROOK[0][1] == sum(1 << (9 * row0) for row0 in range(1, 10))
+
+class TestBitboardPosition:
+    """位元棋盤測試"""
+
+    @pytest.mark.parametrize("seed", range(25))
+    def test_moves_match_engine(self, seed):
+        """測試位元棋盤的走法與引擎一致"""
+        rng = random.Random(seed)
+        engine = random_engine(rng, rng.randint(2, 26))
+        position = engine.to_bitboards()
+        for color in ('Red', 'Black'):
+            assert (to_engine_moves(position.generate_pseudo_legal_moves(color))
+                    == sorted(engine.generate_pseudo_legal_moves(color)))
+            assert (to_engine_moves(position.generate_legal_moves(color))
+                    == sorted(engine.generate_legal_moves(color)))
+            assert position.is_in_check(color) == engine.checkmate_detector.is_in_check(color)
+
+    def test_make_unmake_restores_position(self):
+        """測試 make/unmake 還原位元棋盤"""
+        engine = random_engine(random.Random(3), 20)
+        position = engine.to_bitboards()
+        snapshot = (position.occupied, position.occupied_file, list(position.squares))
+        for from_sq, to_sq in position.generate_pseudo_legal_moves('Red'):
+            position.make_move(from_sq, to_sq)
+            assert position.side_to_move == 1
+            position.unmake_move()
+        assert (position.occupied, position.occupied_file, list(position.squares)) == snapshot
+        assert position.to_board() == engine.board
+
+    def test_generals_facing(self):
+        """測試將帥照面判斷"""
+        engine = ChessEngine()
+        engine.place_piece('Red', 'General', 1, 5)
+        engine.place_piece('Black', 'General', 10, 5)
+        position = engine.to_bitboards()
+        assert position.generals_facing() == True
+        assert position.is_in_check('Red') == True
+
+        engine.place_piece('Red', 'Horse', 6, 5)
+        assert engine.to_bitboards().generals_facing() == False
+
+    def test_cannon_check_through_screen(self):
+        """測試炮隔炮台將軍"""
+        engine = ChessEngine()
+        engine.place_piece('Black', 'General', 10, 5)
+        engine.place_piece('Black', 'Guard', 9, 5)
+        engine.place_piece('Red', 'Cannon', 4, 5)
+        engine.place_piece('Red', 'General', 1, 4)
+        position = engine.to_bitboards()
+        assert position.is_in_check('Black') == True
+        position.remove_piece(square_index(9, 5))
+        assert position.is_in_check('Black') == False
@@ -0,0 +1,150 @@
+import copy
+import pickle
+import random
+
+import pytest
+from src.board import (
+    BLACK_BIT, EXTENSION_CODE, OFFBOARD, PIECES, MailboxBoard, Piece, as_piece, board_squares, get_piece,
+    mailbox_index, piece_code
+)
+from src.chess_engine import ChessEngine
+
+from test_move_generation import random_engine
+
+class TestPiece:
+    """共用棋子（flyweight）測試"""
+
+    def test_pieces_are_shared(self):
+        """測試同種棋子共用同一個實例"""
+        engine = ChessEngine()
+        engine.setup_initial_board()
+        assert engine.board[(4, 1)] is engine.board[(4, 3)] is get_piece('Red', 'Soldier')
+        assert len({id(piece) for piece in engine.board.values()}) == 14
+        assert set(map(id, PIECES.values())) == {id(piece) for piece in engine.board.values()}
+
+    def test_dict_compatibility(self):
+        """測試保留棋子字典的存取與比較方式"""
+        piece = get_piece('Black', 'Cannon')
+        assert piece['color'] == 'Black' and piece['type'] == 'Cannon'
+        assert piece.color == 'Black' and piece.type == 'Cannon'
+        assert piece == {'color': 'Black', 'type': 'Cannon'}
+        assert dict(piece) == {'color': 'Black', 'type': 'Cannon'}
+        assert piece_code(piece) == piece.code == piece_code({'color': 'Black', 'type': 'Cannon'})
+        assert as_piece({'color': 'Black', 'type': 'Cannon'}) is piece
+
+    def test_pieces_are_read_only(self):
+        """測試共用棋子不可修改"""
+        piece = get_piece('Red', 'Rook')
+        with pytest.raises(TypeError):
+            piece['color'] = 'Black'
+        with pytest.raises(TypeError):
+            piece.update(type='Cannon')
+        assert piece == {'color': 'Red', 'type': 'Rook'}
+
+    def test_copy_and_pickle_keep_identity(self):
+        """測試複製與序列化後仍取回同一個實例"""
+        piece = get_piece('Red', 'Horse')
+        assert copy.deepcopy(piece) is piece
+        assert pickle.loads(pickle.dumps(piece)) is piece
+
+    def test_extension_piece_types(self):
+        """測試擴充棋種也共用實例，但沒有棋子編碼"""
+        piece = get_piece('Red', 'Dragon')
+        assert isinstance(piece, Piece)
+        assert piece is get_piece('Red', 'Dragon')
+        assert piece.code is None
+
+class TestMailboxBoard:
+    """陣列棋盤測試"""
+
+    def setup_method(self):
+        self.board = MailboxBoard()
+
+    def test_mapping_interface(self):
+        """測試字典相容介面"""
+        self.board[(1, 5)] = {'color': 'Red', 'type': 'General'}
+        assert (1, 5) in self.board
+        assert self.board[(1, 5)] == {'color': 'Red', 'type': 'General'}
+        assert len(self.board) == 1
+        assert list(self.board) == [(1, 5)]
+        del self.board[(1, 5)]
+        assert (1, 5) not in self.board
+        assert self.board.get((1, 5)) is None
+        assert len(self.board) == 0
+
+    def test_offboard_squares_are_sentinels(self):
+        """測試棋盤外圍為哨兵"""
+        assert self.board.squares[mailbox_index(0, 5)] == OFFBOARD
+        assert self.board.squares[mailbox_index(11, 5)] == OFFBOARD
+        assert self.board.squares[mailbox_index(5, -1)] == OFFBOARD
+        assert (0, 5) not in self.board
+        with pytest.raises(KeyError):
+            self.board[(0, 5)] = {'color': 'Red', 'type': 'Rook'}
+
+    def test_rejects_unknown_piece(self):
+        """測試不支援未知棋種"""
+        with pytest.raises(ValueError):
+            self.board[(1, 1)] = {'color': 'Red', 'type': 'UnknownPiece'}
+
+    def test_copy_is_independent(self):
+        """測試複製後互不影響"""
+        self.board[(4, 4)] = {'color': 'Black', 'type': 'Cannon'}
+        copied = self.board.copy()
+        del copied[(4, 4)]
+        assert (4, 4) in self.board
+        assert len(copied) == 0
+
+    def test_wrap_shares_squares(self):
+        """測試 wrap 與原陣列共用同一個 bytearray"""
+        self.board[(4, 7)] = {'color': 'Black', 'type': 'Soldier'}
+        wrapped = MailboxBoard.wrap(self.board.squares)
+        assert wrapped.squares is self.board.squares
+        assert len(wrapped) == 1
+        del wrapped[(4, 7)]
+        assert (4, 7) not in self.board
+
+    def test_board_squares_from_dict(self):
+        """測試字典棋盤轉為含哨兵的陣列，擴充棋種只記錄佔位與顏色"""
+        board = {(4, 7): get_piece('Black', 'Soldier'), (1, 1): {'color': 'Red', 'type': 'Rook'},
+                 (2, 2): get_piece('Black', 'Dragon')}
+        squares = board_squares(board)
+        assert squares[mailbox_index(4, 7)] == piece_code(board[(4, 7)])
+        assert squares[mailbox_index(1, 1)] == piece_code(board[(1, 1)])
+        assert squares[mailbox_index(2, 2)] == EXTENSION_CODE | BLACK_BIT
+        assert squares[mailbox_index(0, 1)] == OFFBOARD
+        assert board_squares(self.board) is self.board.squares
+
+class TestMailboxEngine:
+    """陣列棋盤引擎測試"""
+
+    def test_unknown_backend(self):
+        """測試未知的棋盤實作"""
+        with pytest.raises(ValueError):
+            ChessEngine(board_backend='unknown')
+
+    @pytest.mark.parametrize("seed", range(20))
+    def test_moves_match_dict_backend(self, seed):
+        """測試兩種棋盤產生相同的走法"""
+        rng = random.Random(seed)
+        piece_count = rng.randint(2, 24)
+        dict_engine = random_engine(random.Random(seed), piece_count)
+        mailbox_engine = random_engine(random.Random(seed), piece_count, board_backend='mailbox')
+        assert dict(mailbox_engine.board) == dict_engine.board
+        for color in ('Red', 'Black'):
+            assert (sorted(mailbox_engine.generate_pseudo_legal_moves(color))
+                    == sorted(dict_engine.generate_pseudo_legal_moves(color)))
+            assert (sorted(mailbox_engine.generate_legal_moves(color))
+                    == sorted(dict_engine.generate_legal_moves(color)))
+
+    def test_move_piece_and_capture(self):
+        """測試陣列棋盤上的移動與吃將"""
+        engine = ChessEngine(board_backend='mailbox')
+        engine.setup_empty_board()
+        engine.place_piece('Red', 'Rook', 5, 5)
+        engine.place_piece('Black', 'General', 5, 8)
+        assert engine.move_piece(5, 5, 5, 8) == True
+        assert engine.game_result == "Red wins"
+        engine.unmake_move()
+        assert engine.board[(5, 5)]['type'] == 'Rook'
+        assert engine.board[(5, 8)]['type'] == 'General'
+        assert isinstance(engine.board, MailboxBoard)
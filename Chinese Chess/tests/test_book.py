@@ -0,0 +1,82 @@
+import io
+import random
+
+import pytest
+from src.book import HEADER, RECORD, OpeningBook, build_book
+from src.chess_engine import ChessEngine
+
+ARCHIVE = """h2e2 h9g7 h0g2
+1-0
+
+h2e2 h7e7
+0-1
+
+h2e2 h9g7
+1-0
+
+b2e2 b9c7
+1/2-1/2
+"""
+
+class TestOpeningBook:
+    """開局庫建立與查詢測試"""
+
+    def setup_method(self):
+        """設定測試環境"""
+        self.engine = ChessEngine()
+        self.engine.setup_initial_board()
+
+    def build(self, tmp_path, **kwargs):
+        path = str(tmp_path / "book.bin")
+        count = build_book(io.StringIO(ARCHIVE), path, **kwargs)
+        return path, count
+
+    def test_file_is_sorted_records(self, tmp_path):
+        """測試檔案為依鍵值排序的固定長度記錄"""
+        path, count = self.build(tmp_path)
+        data = open(path, 'rb').read()
+        assert len(data) == HEADER.size + count * RECORD.size
+        keys = [RECORD.unpack_from(data, HEADER.size + index * RECORD.size)[:2] for index in range(count)]
+        assert keys == sorted(keys)
+
+    def test_book_moves_weighted(self, tmp_path):
+        """測試查詢開局移動與權重（行棋方勝 2 分、和 1 分）"""
+        path, _ = self.build(tmp_path)
+        self.engine.open_book(path)
+        assert self.engine.book_moves() == [((3, 8, 3, 5), 4), ((3, 2, 3, 5), 1)]
+        self.engine.move_piece(3, 8, 3, 5)
+        assert self.engine.book_moves() == [((8, 8, 8, 5), 2), ((10, 8, 8, 7), 0)]
+        self.engine.opening_book.close()
+
+    def test_counts_and_max_plies(self, tmp_path):
+        """測試出現次數與最大層數限制"""
+        path, count = self.build(tmp_path, max_plies=1)
+        with OpeningBook(path) as book:
+            assert len(book) == count == 2
+            entries = dict((move, (weight, times)) for move, weight, times in
+                           book.lookup(self.engine.position_key()))
+            assert entries[(3, 8, 3, 5)] == (4, 3)
+
+    def test_external_sort_matches_in_memory(self, tmp_path):
+        """測試小批次外部排序與一次排序的結果相同"""
+        path, _ = self.build(tmp_path)
+        small_path = str(tmp_path / "small.bin")
+        build_book(io.StringIO(ARCHIVE), small_path, chunk_entries=2)
+        assert open(path, 'rb').read() == open(small_path, 'rb').read()
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["book.bin", "small.bin"]
+
+    def test_choose_and_unknown_position(self, tmp_path):
+        """測試依權重選擇移動，查無資料時回傳空結果"""
+        path, _ = self.build(tmp_path)
+        with OpeningBook(path) as book:
+            assert book.choose(self.engine.position_key(), random.Random(1)) in [(3, 8, 3, 5), (3, 2, 3, 5)]
+            assert book.lookup(12345) == []
+            assert book.choose(12345) is None
+        assert ChessEngine().book_moves() == []
+
+    def test_rejects_non_book_file(self, tmp_path):
+        """測試非開局庫檔案"""
+        path = tmp_path / "other.bin"
+        path.write_bytes(b"not a book at all")
+        with pytest.raises(ValueError):
+            OpeningBook(str(path))
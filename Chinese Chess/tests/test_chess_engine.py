@@ -1,4 +1,5 @@
 import pytest
+from src.chess_engine import CHASED, GAVE_CHECK
 from src.chess_engine import ChessEngine, MoveValidator, GeneralMoveValidator, GuardMoveValidator, RookMoveValidator, HorseMoveValidator, CannonMoveValidator, ElephantMoveValidator, SoldierMoveValidator
 
 class TestChessEngine:
@@ -305,11 +306,175 @@ class TestValidatorIntegration:
             assert validator_type in self.engine.validators
             assert isinstance(self.engine.validators[validator_type], MoveValidator)
     
+    def test_check_follows_replaced_validators(self):
+        """測試任何棋種換成自訂驗證器後，將軍判斷改用該驗證器"""
+        class ShortRookMoveValidator(RookMoveValidator):
+            def is_valid_move(self, board, from_row, from_col, to_row, to_col, piece):
+                return (abs(to_row - from_row) + abs(to_col - from_col) == 1
+                        and super().is_valid_move(board, from_row, from_col, to_row, to_col, piece))
+        
+        detector = self.engine.checkmate_detector
+        self.engine.place_piece('Red', 'General', 1, 5)
+        self.engine.place_piece('Black', 'Rook', 5, 5)
+        assert detector.is_in_check('Red') == True
+        self.engine.validators['Rook'] = ShortRookMoveValidator()
+        assert detector.is_in_check('Red') == False
+        assert detector.exposure_squares('Red') is None
+        self.engine.place_piece('Black', 'Rook', 2, 5)
+        assert detector.is_in_check('Red') == True
+    
+    def test_extension_piece_gives_check(self):
+        """測試擴充棋種依其驗證器將軍"""
+        class ArcherMoveValidator(MoveValidator):
+            def is_valid_move(self, board, from_row, from_col, to_row, to_col, piece):
+                return (to_row - from_row, to_col - from_col) == (1, 1)
+        
+        self.engine.place_piece('Red', 'General', 2, 5)
+        self.engine.board[(1, 4)] = {'color': 'Black', 'type': 'Archer'}
+        assert self.engine.checkmate_detector.is_in_check('Red') == False
+        self.engine.validators['Archer'] = ArcherMoveValidator()
+        assert self.engine.checkmate_detector.is_in_check('Red') == True
+    
     def test_unknown_piece_type_returns_false(self):
         """測試未知棋子類型返回 False"""
         self.engine.board[(1, 1)] = {'color': 'Red', 'type': 'UnknownPiece'}
         result = self.engine.move_piece(1, 1, 1, 2)
         assert result == False
 
+class TestMakeUnmakeMove:
+    """make_move / unmake_move 測試"""
+    
+    def setup_method(self):
+        self.engine = ChessEngine()
+        self.engine.setup_empty_board()
+        self.engine.place_piece('Red', 'General', 1, 5)
+        self.engine.place_piece('Red', 'Rook', 5, 5)
+        self.engine.place_piece('Black', 'General', 10, 4)
+        self.engine.place_piece('Black', 'Cannon', 5, 8)
+    
+    def test_unmake_restores_capture(self):
+        """測試還原吃子移動"""
+        board_before = dict(self.engine.board)
+        self.engine.make_move(5, 5, 5, 8)
+        assert self.engine.board[(5, 8)]['type'] == 'Rook'
+        assert (5, 5) not in self.engine.board
+        assert self.engine.turn_manager.current_turn == 'Black'
+        
+        self.engine.unmake_move()
+        assert self.engine.board == board_before
+        assert self.engine.turn_manager.current_turn == 'Red'
+        assert self.engine.turn_manager.last_moved is None
+    
+    def test_unmake_restores_game_result(self):
+        """測試還原吃將後的遊戲結果"""
+        self.engine.make_move(5, 5, 5, 8)
+        self.engine.make_move(10, 4, 10, 5)
+        self.engine.make_move(5, 8, 10, 8)
+        self.engine.make_move(10, 5, 10, 4)
+        self.engine.make_move(10, 8, 10, 4)
+        assert self.engine.game_result == "Red wins"
+        
+        for _ in range(5):
+            self.engine.unmake_move()
+        assert self.engine.game_result == "Continue"
+        assert self.engine.board[(5, 5)]['type'] == 'Rook'
+        assert self.engine.board[(10, 4)]['type'] == 'General'
+    
+    def test_move_piece_can_be_undone(self):
+        """測試 move_piece 的移動可以被還原"""
+        assert self.engine.move_piece(5, 5, 5, 7) == True
+        self.engine.unmake_move()
+        assert self.engine.board[(5, 5)]['type'] == 'Rook'
+        assert self.engine.turn_manager.current_turn == 'Red'
+    
+    def test_checkmate_probe_keeps_state(self):
+        """測試將死檢查不會改變棋盤物件與輪次"""
+        board = self.engine.board
+        self.engine.checkmate_detector.detect_checkmate('Black')
+        self.engine.generate_legal_moves('Red')
+        assert self.engine.board is board
+        assert self.engine.turn_manager.current_turn == 'Red'
+        assert self.engine._undo_stack == []
+
+class TestRepetition:
+    """重複局面與長將、長捉判定測試"""
+    
+    def setup_method(self):
+        """設定測試環境"""
+        self.engine = ChessEngine()
+        self.engine.setup_empty_board()
+        self.engine.place_piece('Red', 'General', 1, 4)
+        self.engine.place_piece('Black', 'General', 10, 5)
+    
+    def play_cycle(self, moves, times=2):
+        for _ in range(times):
+            for move in moves:
+                assert self.engine.move_piece(*move) == True
+    
+    def test_repetition_count_follows_make_unmake(self):
+        """測試重複次數隨 make_move / unmake_move 增減"""
+        self.engine.setup_initial_board()
+        cycle = [(1, 2, 3, 3), (10, 2, 8, 3), (3, 3, 1, 2), (8, 3, 10, 2)]
+        for move in cycle:
+            self.engine.make_move(*move)
+        assert self.engine.repetition_count() == 2
+        self.engine.unmake_move()
+        assert self.engine.repetition_count() == 1
+        assert self.engine.ply_flags == [0, 0, 0]
+    
+    def test_shuffling_is_a_draw(self):
+        """測試雙方都沒有長將、長捉的三次重複判和"""
+        self.engine.setup_initial_board()
+        self.play_cycle([(1, 2, 3, 3), (10, 2, 8, 3), (3, 3, 1, 2), (8, 3, 10, 2)])
+        assert self.engine.repetition_count() == 3
+        assert self.engine.game_result == "Draw"
+        self.engine.unmake_move()
+        assert self.engine.game_result == "Continue"
+    
+    def test_perpetual_check_loses(self):
+        """測試長將的一方判負"""
+        self.engine.place_piece('Red', 'Rook', 6, 6)
+        self.play_cycle([(6, 6, 6, 5), (10, 5, 10, 6), (6, 5, 6, 6), (10, 6, 10, 5)])
+        assert self.engine.ply_flags[0] == GAVE_CHECK
+        assert self.engine.game_result == "Black wins"
+    
+    def test_flags_are_computed_on_repetition(self):
+        """測試旗標只在第三次重複時為循環內各步補上，重走後局面與歷史不變"""
+        self.engine.place_piece('Red', 'Rook', 6, 6)
+        cycle = [(6, 6, 6, 5), (10, 5, 10, 6), (6, 5, 6, 6), (10, 6, 10, 5)]
+        self.play_cycle(cycle, times=1)
+        assert self.engine.ply_flags == [0, 0, 0, 0]
+        history = list(self.engine.position_history)
+        self.play_cycle(cycle, times=1)
+        assert self.engine.ply_flags == [GAVE_CHECK, 0] * 4
+        assert self.engine.position_history[:5] == history
+        assert self.engine.repetition_count() == 3
+        assert self.engine.board[(6, 6)]['type'] == 'Rook'
+
+    def test_perpetual_chase_loses(self):
+        """測試長捉無根子的一方判負"""
+        self.engine.place_piece('Red', 'Rook', 3, 3)
+        self.engine.place_piece('Black', 'Cannon', 8, 2)
+        self.play_cycle([(3, 3, 3, 2), (8, 2, 8, 3), (3, 2, 3, 3), (8, 3, 8, 2)])
+        assert self.engine.ply_flags[:2] == [CHASED, 0]
+        assert self.engine.game_result == "Black wins"
+    
+    def test_attacking_protected_piece_is_not_a_chase(self):
+        """測試捉有根的子不算捉"""
+        self.engine.place_piece('Red', 'Rook', 3, 3)
+        self.engine.place_piece('Black', 'Cannon', 8, 2)
+        self.engine.place_piece('Black', 'Rook', 8, 9)
+        self.play_cycle([(3, 3, 3, 2), (8, 2, 8, 3), (3, 2, 3, 3), (8, 3, 8, 2)])
+        assert self.engine.ply_flags[0] == 0
+        assert self.engine.game_result == "Draw"
+    
+    def test_search_scores_drawn_game(self):
+        """測試已判和的局面搜尋分數為 0"""
+        self.engine.setup_initial_board()
+        self.play_cycle([(1, 2, 3, 3), (10, 2, 8, 3), (3, 3, 1, 2), (8, 3, 10, 2)])
+        result = self.engine.search(depth=1)
+        assert result.best_move is None
+        assert result.score == 0
+
 if __name__ == "__main__":
     pytest.main([__file__]) 
\ No newline at end of file
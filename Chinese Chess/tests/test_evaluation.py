@@ -0,0 +1,111 @@
+import json
+import random
+
+import pytest
+from src.chess_engine import ChessEngine
+from src.evaluation import DEFAULT_EVALUATION, DEFAULT_MATERIAL, EvaluationTables, load_tables
+
+from test_move_generation import random_engine
+
+class TestIncrementalEvaluation:
+    """增量評估測試"""
+
+    def setup_method(self):
+        self.engine = ChessEngine()
+        self.engine.setup_initial_board()
+
+    def test_initial_position_is_balanced(self):
+        """測試開局雙方分數對稱"""
+        assert self.engine.evaluate('Red') == 0
+        assert self.engine.evaluate('Black') == 0
+
+    @pytest.mark.parametrize("seed", range(5))
+    def test_incremental_matches_recompute(self, seed):
+        """測試隨機對局中增量分數與從頭計算一致，還原後回到原值"""
+        rng = random.Random(seed)
+        engine = random_engine(rng, 20) if seed % 2 else self.engine
+        start_score = engine.evaluate('Red')
+        for _ in range(40):
+            moves = engine.generate_legal_moves(engine.turn_manager.current_turn)
+            if not moves or engine.game_result != "Continue":
+                break
+            engine.make_move(*rng.choice(moves))
+            assert engine.evaluate('Red') == DEFAULT_EVALUATION.evaluate_board(engine.board)
+        while engine._undo_stack:
+            engine.unmake_move()
+        assert engine.evaluate('Red') == start_score
+
+    def test_capture_and_replacement(self):
+        """測試吃子與覆蓋棋子時分數更新"""
+        before = self.engine.evaluate('Red')
+        self.engine.make_move(3, 2, 10, 2)
+        horse = DEFAULT_EVALUATION.piece_score({'color': 'Black', 'type': 'Horse'}, 10, 2)
+        cannon = DEFAULT_EVALUATION.piece_values[('Red', 'Cannon')]
+        assert self.engine.evaluate('Red') - before == cannon[82] - cannon[19] - horse
+        self.engine.place_piece('Black', 'Rook', 10, 2)
+        assert self.engine.evaluate('Red') == DEFAULT_EVALUATION.evaluate_board(self.engine.board)
+
+    def test_debug_mode_detects_drift(self):
+        """測試除錯模式能發現直接修改棋盤造成的分數不一致"""
+        engine = ChessEngine(eval_debug=True)
+        engine.setup_initial_board()
+        del engine.board[(4, 1)]
+        with pytest.raises(AssertionError):
+            engine.evaluate('Red')
+
+    def test_debug_flags_are_independent(self):
+        """測試評估分數比對只由 eval_debug 開啟，與 zobrist_debug 無關"""
+        engine = ChessEngine(zobrist_debug=True)
+        engine.setup_initial_board()
+        engine._eval_score += 1
+        engine.make_move(3, 2, 3, 5)
+        engine.unmake_move()
+        assert engine.evaluate('Red') == 1
+        engine.eval_debug = True
+        with pytest.raises(AssertionError):
+            engine.evaluate('Red')
+
+class TestEvaluationTables:
+    """評估表載入測試"""
+
+    def test_black_tables_mirror_red(self):
+        """測試黑方使用上下鏡像的位置表"""
+        red = DEFAULT_EVALUATION.piece_score({'color': 'Red', 'type': 'Horse'}, 3, 3)
+        black = DEFAULT_EVALUATION.piece_score({'color': 'Black', 'type': 'Horse'}, 8, 3)
+        assert red == -black > DEFAULT_MATERIAL['Horse']
+        assert DEFAULT_EVALUATION.piece_score({'color': 'Red', 'type': 'Unknown'}, 1, 1) == 0
+
+    def test_load_tuned_tables(self, tmp_path):
+        """測試由檔案載入調整過的子力與位置表"""
+        path = tmp_path / "tables.json"
+        table = [[0] * 9 for _ in range(10)]
+        table[0][0] = 50
+        path.write_text(json.dumps({'material': {'Rook': 1000}, 'piece_square_tables': {'Rook': table}}))
+        tables = load_tables(str(path))
+        assert tables.material['Rook'] == 1000
+        assert tables.material['Horse'] == DEFAULT_MATERIAL['Horse']
+
+        engine = ChessEngine()
+        engine.place_piece('Red', 'Rook', 1, 1)
+        engine.set_evaluation_tables(tables)
+        assert engine.evaluate('Red') == 1050
+        engine.make_move(1, 1, 2, 1)
+        assert engine.evaluate('Black') == -1000
+
+    def test_save_round_trip(self, tmp_path):
+        """測試寫出的表可以再載入"""
+        path = str(tmp_path / "tables.json")
+        EvaluationTables({'Cannon': 500}).save(path)
+        assert load_tables(path).piece_values == EvaluationTables({'Cannon': 500}).piece_values
+
+    @pytest.mark.parametrize("data", [
+        {'material': {'Queen': 900}},
+        {'piece_square_tables': {'Rook': [[0] * 9]}},
+        {'piece_square_tables': {'Queen': [[0] * 9 for _ in range(10)]}},
+    ])
+    def test_rejects_malformed_tables(self, tmp_path, data):
+        """測試不合法的表"""
+        path = tmp_path / "bad.json"
+        path.write_text(json.dumps(data))
+        with pytest.raises(ValueError):
+            load_tables(str(path))
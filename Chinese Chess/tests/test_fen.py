@@ -0,0 +1,115 @@
+import random
+
+import pytest
+from src.chess_engine import ChessEngine
+from src.fen import INITIAL_FEN, POSITION_BYTES, decode_snapshot, encode_snapshot
+
+from test_move_generation import random_engine
+from test_perft import TRICKY_POSITIONS, build_position
+
+class TestFen:
+    """象棋 FEN 匯入匯出測試"""
+
+    def setup_method(self):
+        """設定測試環境"""
+        self.engine = ChessEngine()
+        self.engine.setup_initial_board()
+
+    def test_initial_position(self):
+        """測試標準開局的 FEN"""
+        assert self.engine.to_fen() == INITIAL_FEN
+        restored = ChessEngine.from_fen(INITIAL_FEN)
+        assert restored.board == self.engine.board
+        assert restored.turn_manager.last_moved is None
+        assert restored.position_key() == self.engine.position_key()
+
+    def test_counters_follow_moves(self):
+        """測試半回合計數與回合數隨移動推進，吃子時歸零"""
+        self.engine.make_move(3, 2, 3, 5)
+        assert self.engine.to_fen().endswith(" b - - 1 1")
+        self.engine.make_move(8, 8, 8, 5)
+        assert self.engine.to_fen().endswith(" w - - 2 2")
+        self.engine.make_move(3, 5, 7, 5)
+        assert self.engine.to_fen().endswith(" b - - 0 2")
+        self.engine.unmake_move()
+        fen = self.engine.to_fen()
+        assert fen.endswith(" w - - 2 2")
+        restored = ChessEngine.from_fen(fen)
+        assert restored.turn_manager.last_moved == self.engine.turn_manager.last_moved
+
+    def test_side_to_move_and_counters_round_trip(self):
+        """測試輪次與計數欄位可往返"""
+        fen = "4k4/9/9/9/9/9/9/9/4A4/3K5 b - - 7 31"
+        engine = ChessEngine.from_fen(fen, board_backend='mailbox')
+        assert engine.turn_manager.current_turn == 'Black'
+        assert engine.turn_manager.last_moved == 'Black'
+        assert engine.board[(1, 4)] == {'color': 'Red', 'type': 'General'}
+        assert engine.board[(2, 5)] == {'color': 'Red', 'type': 'Guard'}
+        assert engine.find_general('Black') == (10, 5)
+        assert engine.to_fen() == fen
+
+    def test_accepts_letter_aliases_and_defaults(self):
+        """測試接受 H/E 別名，並補上缺少的欄位"""
+        engine = ChessEngine.from_fen("4k4/9/9/9/9/9/9/9/9/2EHK4")
+        assert engine.board[(1, 3)]['type'] == 'Elephant'
+        assert engine.board[(1, 4)]['type'] == 'Horse'
+        assert engine.turn_manager.current_turn == 'Red'
+        assert engine.to_fen() == "4k4/9/9/9/9/9/9/9/9/2BNK4 w - - 0 1"
+
+    @pytest.mark.parametrize("fen", [
+        "",
+        "4k4/9/9/9/9/9/9/9/9",
+        "4k4/9/9/9/9/9/9/9/9/4K5 w",
+        "4k4/9/9/9/9/9/9/9/9/4X4 w",
+        "4k4/9/9/9/9/9/9/9/9/4K4 x",
+        "4k4/9/9/9/9/9/9/9/9/4K4 w - - a 1",
+    ])
+    def test_rejects_malformed_fen(self, fen):
+        """測試不合法的 FEN 會拋出 ValueError"""
+        with pytest.raises(ValueError):
+            ChessEngine.from_fen(fen)
+
+    @pytest.mark.parametrize("name", sorted(TRICKY_POSITIONS))
+    def test_tricky_positions_round_trip(self, name):
+        """測試各測試局面經 FEN 往返後棋盤不變"""
+        engine = build_position(name)
+        restored = ChessEngine.from_fen(engine.to_fen())
+        assert restored.board == engine.board
+        assert restored.turn_manager.current_turn == engine.turn_manager.current_turn
+
+class TestBinaryCodec:
+    """固定長度二進位局面編碼測試"""
+
+    def test_initial_position_round_trip(self):
+        """測試開局編碼為固定位元組並可還原輪次狀態"""
+        engine = ChessEngine()
+        engine.setup_initial_board()
+        engine.make_move(3, 2, 3, 5)
+        data = engine.to_bytes()
+        assert len(data) == POSITION_BYTES
+        restored = ChessEngine.from_bytes(data, board_backend='mailbox')
+        assert dict(restored.board) == engine.board
+        assert restored.turn_manager.current_turn == 'Black'
+        assert restored.turn_manager.last_moved == engine.turn_manager.last_moved
+        assert restored.game_result == "Continue"
+        assert restored.position_key() == engine.position_key()
+
+    def test_random_positions_round_trip(self):
+        """測試隨機局面與遊戲結果可往返"""
+        rng = random.Random(12)
+        for _ in range(50):
+            engine = random_engine(rng, rng.randint(2, 32))
+            engine.game_result = rng.choice(["Continue", "Red wins", "Black wins", "Draw"])
+            snapshot = engine.snapshot()
+            assert decode_snapshot(encode_snapshot(snapshot)) == snapshot
+
+    def test_rejects_too_many_pieces(self):
+        """測試超過 32 子時無法編碼"""
+        squares = bytes([7]) * 33 + bytes(57)
+        with pytest.raises(ValueError):
+            encode_snapshot((squares, 'Red', None, "Continue"))
+
+    def test_rejects_wrong_length(self):
+        """測試長度不符時無法解碼"""
+        with pytest.raises(ValueError):
+            decode_snapshot(bytes(31))
@@ -0,0 +1,49 @@
+import pytest
+from src.chess_engine import ChessEngine
+from src.lazy_smp import LazySMPSearch, measure_time_to_depth
+from src.search import MATE_THRESHOLD
+
+from test_perft import build_position
+
+class TestLazySMP:
+    """Lazy SMP 共用置換表搜尋測試"""
+
+    def setup_method(self):
+        """設定測試環境"""
+        self.engine = ChessEngine()
+        self.engine.place_piece('Red', 'General', 1, 4)
+        self.engine.place_piece('Red', 'Rook', 5, 1)
+        self.engine.place_piece('Red', 'Rook', 9, 9)
+        self.engine.place_piece('Black', 'General', 10, 5)
+        self.engine.place_piece('Black', 'Soldier', 6, 9)
+
+    @pytest.mark.parametrize("mode", ['thread', 'process'])
+    def test_finds_mate_with_helpers(self, mode):
+        """測試多個搜尋器共用置換表仍找到一步殺，且局面保持不變"""
+        board_before = dict(self.engine.board)
+        key_before = self.engine.position_key()
+        result = LazySMPSearch(threads=2, hash_mb=1, mode=mode).search(self.engine, depth=3)
+        assert result.best_move == (5, 1, 10, 1)
+        assert result.score >= MATE_THRESHOLD
+        assert dict(self.engine.board) == board_before
+        assert self.engine.position_key() == key_before
+
+    def test_engine_search_threads(self):
+        """測試 ChessEngine.search 的 threads 參數"""
+        result = self.engine.search(depth=2, threads=2)
+        assert result.best_move == (5, 1, 10, 1)
+        assert result.nodes > 0
+
+    def test_invalid_arguments(self):
+        """測試不合法的搜尋器數與模式"""
+        with pytest.raises(ValueError):
+            LazySMPSearch(threads=0)
+        with pytest.raises(ValueError):
+            LazySMPSearch(mode='fiber')
+
+    def test_time_to_depth_report(self):
+        """測試到達深度時間報告以單一搜尋器為基準"""
+        report = measure_time_to_depth(build_position('horse_legs'), 2, thread_counts=(1, 2),
+                                       mode='thread', hash_mb=1)
+        assert set(report) == {1, 2}
+        assert report[1][1] == 1.0
@@ -0,0 +1,113 @@
+import io
+
+import pytest
+from src.chess_engine import ChessEngine
+from src.mate_solver import MATE, NO_MATE, UNKNOWN, MateSolver, read_puzzles, verify_puzzles
+from src.search import MATE_THRESHOLD
+
+MATE_IN_ONE = "3k5/4R4/9/9/9/9/9/3R5/9/4K4 w - - 0 1"
+MATE_IN_TWO = "9/4k4/7N1/9/9/9/9/9/1R3C3/5K3 w - - 0 1"
+# 單車只能以困斃取勝，沒有連將殺
+QUIET_MATE = "4k4/9/9/9/9/9/9/9/9/3K1R3 w - - 0 1"
+
+PUZZLE_FILE = f"""# 殺局題目
+{MATE_IN_ONE}; dm 1; id "one"
+{MATE_IN_TWO}; dm 2; id "two"
+
+{QUIET_MATE}; dm 1; id "quiet"
+"""
+
+class TestMateSolver:
+    """證明數殺局解題器測試"""
+
+    def test_mate_in_one(self):
+        """測試一步殺的殺棋線，且局面保持不變"""
+        engine = ChessEngine.from_fen(MATE_IN_ONE)
+        result = engine.solve_mate(1)
+        assert result.status == MATE
+        assert result.moves == 1
+        assert len(result.line) == 1
+        assert engine.to_fen() == MATE_IN_ONE
+        engine.make_move(*result.line[0])
+        assert engine.checkmate_detector.detect_checkmate('Black')
+
+    def test_mate_in_two_full_line(self):
+        """測試二步連將殺回傳攻守雙方的完整殺棋線"""
+        engine = ChessEngine.from_fen(MATE_IN_TWO)
+        result = engine.solve_mate(2)
+        assert result.status == MATE
+        assert result.moves == 2
+        assert len(result.line) == 3
+        for move in result.line:
+            assert engine.move_piece(*move)
+        assert engine.checkmate_detector.is_in_check('Black')
+        assert engine.generate_legal_moves('Black') == []
+
+    def test_agrees_with_alpha_beta(self):
+        """測試與 alpha-beta 搜尋的殺棋判斷一致"""
+        engine = ChessEngine.from_fen(MATE_IN_TWO)
+        assert engine.search(depth=4).score >= MATE_THRESHOLD
+        assert engine.solve_mate(1).status == NO_MATE
+
+    def test_reports_shortest_mate(self):
+        """測試題目步數較多時回報實際最少的步數"""
+        result = ChessEngine.from_fen(MATE_IN_ONE).solve_mate(3)
+        assert result.status == MATE
+        assert result.moves == 1
+
+    def test_checks_only_restriction(self):
+        """測試只允許將軍著法時，困斃取勝不算連將殺"""
+        engine = ChessEngine.from_fen(QUIET_MATE)
+        restricted = engine.solve_mate(1)
+        assert restricted.status == NO_MATE
+        assert restricted.refutation
+        for move, reply in restricted.refutation.items():
+            engine.make_move(*move)
+            assert engine.checkmate_detector.is_in_check('Black')
+            assert reply in engine.generate_legal_moves('Black')
+            engine.unmake_move()
+        free = engine.solve_mate(1, checks_only=False)
+        assert free.status == MATE
+        assert free.line == [(1, 6, 9, 6)]
+
+    def test_limits(self):
+        """測試節點與時間限制"""
+        engine = ChessEngine()
+        engine.setup_initial_board()
+        assert MateSolver(engine, checks_only=False, node_limit=20).solve(3).status == UNKNOWN
+        result = MateSolver(engine, checks_only=False, time_limit_ms=20).solve(5)
+        assert result.status == UNKNOWN
+        assert result.elapsed < 1
+        assert len(engine._undo_stack) == 0
+
+    def test_invalid_move_count(self):
+        """測試步數必須至少為 1"""
+        with pytest.raises(ValueError):
+            ChessEngine.from_fen(MATE_IN_ONE).solve_mate(0)
+
+class TestPuzzleBatch:
+    """殺局題目批次驗證測試"""
+
+    def test_read_puzzles(self):
+        """測試讀取 EPD 風格的題目檔"""
+        puzzles = list(read_puzzles(io.StringIO(PUZZLE_FILE)))
+        assert [puzzle.puzzle_id for puzzle in puzzles] == ['one', 'two', 'quiet']
+        assert [puzzle.moves for puzzle in puzzles] == [1, 2, 1]
+        assert puzzles[1].fen == MATE_IN_TWO
+
+    def test_missing_move_count(self):
+        """測試缺少 dm 欄位的題目"""
+        with pytest.raises(ValueError):
+            list(read_puzzles(io.StringIO(f"{MATE_IN_ONE}; id \"broken\"\n")))
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_verify_puzzles(self, workers, tmp_path):
+        """測試以工作行程平行驗證題目檔，結果依題目順序回傳"""
+        path = tmp_path / 'puzzles.epd'
+        path.write_text(PUZZLE_FILE + "9/9/9; dm 1; id \"bad fen\"\n", encoding='utf-8')
+        reports = list(verify_puzzles(str(path), workers=workers, node_limit=10000))
+        assert [report.puzzle.puzzle_id for report in reports] == ['one', 'two', 'quiet', 'bad fen']
+        assert [report.ok for report in reports] == [True, True, False, False]
+        assert len(reports[1].line) == 3
+        assert reports[2].status == NO_MATE
+        assert reports[3].error is not None
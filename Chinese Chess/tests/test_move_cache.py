@@ -0,0 +1,115 @@
+import random
+import sys
+from array import array
+
+import pytest
+from src.board import pack_move
+from src.chess_engine import ChessEngine
+from src.move_cache import LegalMoveCache, pack_moves
+
+from test_move_generation import random_engine
+
+class TestLegalMoveCache:
+    """合法走法 LRU 快取測試"""
+
+    def setup_method(self):
+        """設定測試環境"""
+        self.cache = LegalMoveCache(max_entries=2)
+
+    def test_hit_and_miss_counters(self):
+        """測試命中率統計"""
+        assert self.cache.get(1) is None
+        self.cache.put(1, pack_moves([(1, 1, 2, 1)]))
+        assert list(self.cache.get(1)) == [pack_move((1, 1, 2, 1))]
+        assert self.cache.stats()['hits'] == 1
+        assert self.cache.stats()['misses'] == 1
+        assert self.cache.hit_rate == 0.5
+
+    def test_evicts_least_recently_used(self):
+        """測試超過條目上限時淘汰最久未使用的條目"""
+        self.cache.put(1, array('H'))
+        self.cache.put(2, array('H'))
+        self.cache.get(1)
+        self.cache.put(3, array('H'))
+        assert 1 in self.cache and 3 in self.cache
+        assert 2 not in self.cache
+        assert self.cache.evictions == 1
+
+    def test_byte_limit(self):
+        """測試位元組上限"""
+        large = array('H', range(200))
+        cache = LegalMoveCache(max_entries=100, max_bytes=2 * sys.getsizeof(large) + 1)
+        for key in range(5):
+            cache.put(key, array('H', large))
+        assert len(cache) == 2
+        assert cache.size_bytes <= cache.max_bytes
+        # 單一條目超過上限時不存入
+        tiny = LegalMoveCache(max_bytes=10)
+        tiny.put(1, large)
+        assert len(tiny) == 0
+
+    def test_invalid_limits(self):
+        """測試上限必須為正數"""
+        with pytest.raises(ValueError):
+            LegalMoveCache(max_entries=0)
+
+class TestLegalDestinations:
+    """ChessEngine.legal_destinations 測試"""
+
+    def setup_method(self):
+        """設定測試環境"""
+        self.engine = ChessEngine()
+        self.engine.setup_initial_board()
+
+    def test_initial_position(self):
+        """測試開局時的提示"""
+        assert sorted(self.engine.legal_destinations(1, 2)) == [(3, 1), (3, 3)]
+        assert len(self.engine.legal_destinations(3, 2)) == 12
+        # 不是輪到的一方或空格
+        assert self.engine.legal_destinations(10, 2) == []
+        assert self.engine.legal_destinations(5, 5) == []
+
+    def test_repeated_queries_hit_cache(self):
+        """測試同一局面的重複查詢命中快取"""
+        cache = self.engine.legal_move_cache
+        for col in range(1, 10):
+            self.engine.legal_destinations(1, col)
+        assert cache.misses == 1
+        assert cache.hits == 8
+        self.engine.move_piece(3, 8, 3, 5)
+        self.engine.legal_destinations(8, 8)
+        self.engine.unmake_move()
+        self.engine.legal_destinations(1, 2)
+        assert cache.misses == 2
+        assert cache.hits == 9
+
+    def test_place_piece_invalidates(self):
+        """測試 place_piece 與 setup_empty_board 會清除快取"""
+        self.engine.legal_destinations(1, 1)
+        self.engine.place_piece('Black', 'Rook', 2, 1)
+        assert len(self.engine.legal_move_cache) == 0
+        assert (2, 1) in self.engine.legal_destinations(1, 1)
+        self.engine.setup_empty_board()
+        assert len(self.engine.legal_move_cache) == 0
+        assert self.engine.legal_move_cache.invalidations == 2
+
+    @pytest.mark.parametrize("seed", range(3))
+    def test_matches_legal_moves(self, seed):
+        """測試與完整合法走法一致，且每個提示的格子都能以 move_piece 走到"""
+        engine = random_engine(random.Random(seed), 12)
+        color = engine.turn_manager.current_turn
+        legal = engine.generate_legal_moves(color)
+        for (row, col), piece in list(engine.board.items()):
+            if piece['color'] != color:
+                continue
+            expected = sorted(move[2:] for move in legal if move[:2] == (row, col))
+            destinations = engine.legal_destinations(row, col)
+            assert sorted(destinations) == expected
+            for to_row, to_col in destinations:
+                assert engine.move_piece(row, col, to_row, to_col)
+                engine.unmake_move()
+
+    def test_game_over(self):
+        """測試對局結束後沒有可走的格子"""
+        self.engine.game_result = "Red wins"
+        assert self.engine.legal_destinations(1, 2) == []
@@ -0,0 +1,275 @@
+import random
+
+import pytest
+from src.chess_engine import ChessEngine
+
+PIECE_TYPES = ['General', 'Guard', 'Rook', 'Horse', 'Cannon', 'Elephant', 'Soldier']
+
+def brute_force_moves(engine, color):
+    """以逐格驗證產生偽合法移動，作為走法產生器的對照組"""
+    moves = set()
+    for (from_row, from_col), piece in engine.board.items():
+        if piece['color'] != color:
+            continue
+        validator = engine.validators[piece['type']]
+        for to_row in range(1, 11):
+            for to_col in range(1, 10):
+                if (to_row, to_col) == (from_row, from_col):
+                    continue
+                target = engine.board.get((to_row, to_col))
+                if target is not None and target['color'] == color:
+                    continue
+                if validator.is_valid_move(engine.board, from_row, from_col, to_row, to_col, piece):
+                    moves.add((from_row, from_col, to_row, to_col))
+    return moves
+
+def brute_force_is_in_check(engine, color):
+    """以掃描全盤的方式判斷將軍，作為反查實作的對照組"""
+    general_pos = next((pos for pos, piece in engine.board.items()
+                        if piece['type'] == 'General' and piece['color'] == color), None)
+    if general_pos is None:
+        return False
+    opponent_color = 'Black' if color == 'Red' else 'Red'
+    for pos, piece in engine.board.items():
+        if piece['color'] != opponent_color:
+            continue
+        if piece['type'] == 'General' and pos[1] == general_pos[1]:
+            low, high = sorted((pos[0], general_pos[0]))
+            if not any((row, pos[1]) in engine.board for row in range(low + 1, high)):
+                return True
+        if engine.validators[piece['type']].is_valid_move(
+                engine.board, pos[0], pos[1], general_pos[0], general_pos[1], piece):
+            return True
+    return False
+
+def random_placements(rng, piece_count):
+    """產生隨機擺放（每方各一個將帥，其餘棋子任意，不保證為實戰局面）"""
+    squares = rng.sample([(row, col) for row in range(1, 11) for col in range(1, 10)], piece_count)
+    placements = []
+    for index, (row, col) in enumerate(squares):
+        if index < 2:
+            color, piece_type = ('Red', 'Black')[index], 'General'
+        else:
+            color, piece_type = rng.choice(['Red', 'Black']), rng.choice(PIECE_TYPES[1:])
+        placements.append((color, piece_type, row, col))
+    return placements
+
+def random_engine(rng, piece_count, board_backend='dict'):
+    """建立隨機擺放的棋盤"""
+    engine = ChessEngine(board_backend=board_backend)
+    engine.setup_empty_board()
+    for color, piece_type, row, col in random_placements(rng, piece_count):
+        engine.place_piece(color, piece_type, row, col)
+    return engine
+
+class TestMoveGeneration:
+    """走法產生器測試"""
+
+    @pytest.mark.parametrize("seed", range(30))
+    def test_pseudo_legal_moves_match_validators(self, seed):
+        """測試產生的偽合法移動與驗證器逐格判斷一致"""
+        rng = random.Random(seed)
+        engine = random_engine(rng, rng.randint(2, 20))
+        for color in ('Red', 'Black'):
+            generated = engine.generate_pseudo_legal_moves(color)
+            assert len(generated) == len(set(generated))
+            assert set(generated) == brute_force_moves(engine, color)
+
+    def test_legal_moves_exclude_self_check(self):
+        """測試合法移動不會讓己方被將軍"""
+        engine = ChessEngine()
+        engine.setup_empty_board()
+        engine.place_piece('Red', 'General', 1, 5)
+        engine.place_piece('Red', 'Rook', 2, 5)
+        engine.place_piece('Black', 'Rook', 9, 5)
+        engine.place_piece('Black', 'General', 10, 4)
+
+        legal_moves = engine.generate_legal_moves('Red')
+        # 被牽制的車只能沿著將軍所在列移動
+        rook_moves = {move[2:] for move in legal_moves if move[:2] == (2, 5)}
+        assert rook_moves == {(row, 5) for row in range(3, 10)}
+
+    def test_legal_moves_exclude_generals_face_to_face(self):
+        """測試合法移動不會造成將帥照面"""
+        engine = ChessEngine()
+        engine.setup_empty_board()
+        engine.place_piece('Red', 'General', 1, 5)
+        engine.place_piece('Red', 'Horse', 3, 5)
+        engine.place_piece('Black', 'General', 10, 5)
+
+        legal_moves = engine.generate_legal_moves('Red')
+        assert not [move for move in legal_moves if move[:2] == (3, 5)]
+
+    @pytest.mark.parametrize("seed", range(40))
+    def test_analytic_legality_matches_trial_moves(self, seed):
+        """測試以牽制分析篩選的合法移動與逐步試走的結果一致（含走子後的局面）"""
+        rng = random.Random(seed)
+        engine = random_engine(rng, rng.randint(2, 30))
+        detector = engine.checkmate_detector
+        for _ in range(8):
+            for color in ('Red', 'Black'):
+                expected = [move for move in engine.generate_pseudo_legal_moves(color)
+                            if detector._is_move_safe(move[:2], move[2:], color)]
+                assert engine.generate_legal_moves(color) == expected
+                assert detector.has_legal_moves(color) == bool(expected)
+            moves = engine.generate_pseudo_legal_moves(engine.turn_manager.current_turn)
+            if not moves:
+                break
+            engine.make_move(*rng.choice(moves))
+
+    def test_cannon_screen_exposure(self):
+        """測試不得移走炮架之一，也不得在炮與將帥之間落子成為炮架"""
+        engine = ChessEngine()
+        engine.setup_empty_board()
+        engine.place_piece('Red', 'General', 1, 5)
+        engine.place_piece('Red', 'Horse', 3, 5)
+        engine.place_piece('Red', 'Rook', 5, 5)
+        engine.place_piece('Black', 'Cannon', 8, 5)
+        engine.place_piece('Red', 'Rook', 2, 7)
+        engine.place_piece('Black', 'General', 10, 4)
+        engine.place_piece('Black', 'Cannon', 1, 9)
+
+        squares = engine.checkmate_detector.exposure_squares('Red')
+        assert {(3, 5), (5, 5), (8, 5), (1, 7), (1, 9)} <= squares
+        legal_moves = engine.generate_legal_moves('Red')
+        assert not [move for move in legal_moves if move[:2] == (3, 5)]
+        assert {move[2:] for move in legal_moves if move[:2] == (5, 5)} == {(4, 5), (6, 5), (7, 5), (8, 5)}
+        # 車退到第 1 行的將與炮之間會成為炮架
+        assert (2, 7, 1, 7) not in legal_moves
+        assert (2, 7, 2, 9) in legal_moves
+
+    def test_horse_leg_exposure(self):
+        """測試移走馬腳上的棋子會讓對方的馬將軍"""
+        engine = ChessEngine()
+        engine.setup_empty_board()
+        engine.place_piece('Red', 'General', 1, 5)
+        engine.place_piece('Red', 'Guard', 2, 6)
+        engine.place_piece('Black', 'Horse', 3, 6)
+        engine.place_piece('Black', 'General', 10, 4)
+
+        assert (2, 6) in engine.checkmate_detector.exposure_squares('Red')
+        assert not [move for move in engine.generate_legal_moves('Red') if move[:2] == (2, 6)]
+
+    def test_exposure_squares_fallback(self):
+        """測試被將軍時改為逐步試走"""
+        engine = ChessEngine()
+        engine.setup_empty_board()
+        engine.place_piece('Red', 'General', 1, 5)
+        engine.place_piece('Black', 'Rook', 5, 5)
+        engine.place_piece('Black', 'General', 10, 4)
+        assert engine.checkmate_detector.exposure_squares('Red') is None
+        engine.setup_initial_board()
+        assert engine.checkmate_detector.exposure_squares('Red') == {(1, 5)}
+
+    def test_generation_does_not_change_state(self):
+        """測試產生合法移動不會改變棋盤與輪次"""
+        engine = random_engine(random.Random(7), 16)
+        board_before = dict(engine.board)
+        engine.generate_legal_moves('Black')
+        assert engine.board == board_before
+        assert engine.turn_manager.current_turn == 'Red'
+        assert engine.game_result == "Continue"
+
+class TestCheckmateDetection:
+    """將死檢查測試"""
+
+    def setup_method(self):
+        self.engine = ChessEngine()
+        self.engine.setup_empty_board()
+
+    @pytest.mark.parametrize("seed", range(40))
+    def test_is_in_check_matches_full_scan(self, seed):
+        """測試從將帥反查的將軍判斷與掃描全盤一致（含走子後）"""
+        rng = random.Random(seed)
+        engine = random_engine(rng, rng.randint(2, 30))
+        for _ in range(6):
+            for color in ('Red', 'Black'):
+                assert engine.checkmate_detector.is_in_check(color) == brute_force_is_in_check(engine, color)
+            moves = engine.generate_pseudo_legal_moves(engine.turn_manager.current_turn)
+            if not moves:
+                break
+            engine.make_move(*rng.choice(moves))
+
+    def test_general_position_tracking(self):
+        """測試將帥位置隨移動與還原更新"""
+        self.engine.place_piece('Red', 'General', 1, 5)
+        self.engine.place_piece('Black', 'Rook', 2, 5)
+        self.engine.make_move(1, 5, 2, 5)
+        assert self.engine.general_positions['Red'] == (2, 5)
+        self.engine.unmake_move()
+        assert self.engine.general_positions['Red'] == (1, 5)
+        self.engine.turn_manager.current_turn = 'Black'
+        self.engine.make_move(2, 5, 1, 5)
+        assert self.engine.find_general('Red') is None
+        self.engine.unmake_move()
+        assert self.engine.find_general('Red') == (1, 5)
+
+    def test_rook_checkmate(self):
+        """測試雙車將死"""
+        self.engine.place_piece('Red', 'General', 1, 4)
+        self.engine.place_piece('Red', 'Rook', 10, 1)
+        self.engine.place_piece('Red', 'Rook', 9, 2)
+        self.engine.place_piece('Black', 'General', 10, 5)
+        assert self.engine.checkmate_detector.detect_checkmate('Black') == True
+
+    def test_check_with_escape_is_not_checkmate(self):
+        """測試可以逃脫的將軍不是將死"""
+        self.engine.place_piece('Red', 'General', 1, 4)
+        self.engine.place_piece('Red', 'Rook', 10, 1)
+        self.engine.place_piece('Black', 'General', 10, 5)
+        assert self.engine.checkmate_detector.is_in_check('Black') == True
+        assert self.engine.checkmate_detector.detect_checkmate('Black') == False
+
+    def test_has_legal_moves_ignores_turn(self):
+        """測試合法移動判斷與目前輪次無關"""
+        self.engine.place_piece('Black', 'General', 9, 5)
+        assert self.engine.turn_manager.current_turn == 'Red'
+        assert self.engine.checkmate_detector.has_legal_moves('Black') == True
+
+class TestDestinationTables:
+    """預先計算的目標格表測試"""
+
+    def setup_method(self):
+        self.engine = ChessEngine()
+        self.engine.setup_initial_board()
+
+    @pytest.mark.parametrize("seed", range(10))
+    def test_tables_cover_every_valid_move(self, seed):
+        """測試任何驗證器接受的移動都在目標格表內"""
+        engine = random_engine(random.Random(seed), 24)
+        for color in ('Red', 'Black'):
+            for from_row, from_col, to_row, to_col in brute_force_moves(engine, color):
+                assert (to_row, to_col) in engine.possible_destinations(from_row, from_col)
+
+    def test_palace_and_elephant_squares(self):
+        """測試士只能在九宮斜線、象只能落在己方象位"""
+        assert self.engine.possible_destinations(1, 4) == {(2, 5)}
+        assert self.engine.possible_destinations(1, 3) == {(3, 1), (3, 5)}
+        assert self.engine.possible_destinations(5, 5) is None
+
+    def test_move_piece_rejects_impossible_destinations(self):
+        """測試不可能的目標直接被拒絕，包含棋盤外的位置"""
+        assert self.engine.move_piece(1, 4, 2, 4) == False
+        assert self.engine.move_piece(1, 1, 0, 1) == False
+        assert self.engine.move_piece(1, 1, 2, 1) == True
+
+    def test_custom_validator_is_not_prefiltered(self):
+        """測試自訂驗證器不使用內建驗證器的目標格表"""
+        from test_perft import StandardSoldierMoveValidator
+        self.engine.validators['Soldier'] = StandardSoldierMoveValidator()
+        assert self.engine.possible_destinations(4, 1) is None
+        assert self.engine.move_piece(4, 1, 5, 1) == True
+
+    @pytest.mark.parametrize("board_backend", ['dict', 'mailbox'])
+    def test_custom_validator_on_both_backends(self, board_backend):
+        """測試自訂驗證器在兩種棋盤上產生相同走法，且預設的 mailbox_targets 轉接 generate_moves"""
+        from src.board import board_squares, mailbox_index
+        from test_perft import StandardSoldierMoveValidator
+        engine = ChessEngine(board_backend=board_backend)
+        engine.setup_initial_board()
+        validator = StandardSoldierMoveValidator()
+        engine.validators['Soldier'] = validator
+        soldier_moves = {move for move in engine.generate_legal_moves('Red') if move[:2] == (4, 1)}
+        assert soldier_moves == {(4, 1, 5, 1)}
+        targets = validator.mailbox_targets(board_squares(engine.board), mailbox_index(4, 1), engine.board[(4, 1)])
+        assert list(targets) == [mailbox_index(5, 1)]
@@ -0,0 +1,127 @@
+import io
+
+import pytest
+from src.chess_engine import ChessEngine
+from src.notation import (NotationError, format_iccs, parse_iccs, parse_move, parse_wxf,
+                          read_games, replay_archive, replay_moves)
+
+ARCHIVE = """[Event "Game one"]
+1. h2e2 h7e7 2. h0g2 ; 馬二進三
+*
+
+[Event "Game two"]
+C2.5 C8.5 H2+3 H8+7 R1.2 R9.7
+0-1
+
+[FEN "4k4/9/9/9/9/9/9/9/9/R3K4 w - - 0 1"]
+R9+9 K5.4 R9.8
+"""
+
+class TestParseMove:
+    """單一記號解析測試"""
+
+    def setup_method(self):
+        """設定測試環境"""
+        self.engine = ChessEngine()
+        self.engine.setup_initial_board()
+
+    def test_iccs_round_trip(self):
+        """測試 ICCS 座標記號與移動互轉"""
+        assert parse_iccs('h2e2') == (3, 8, 3, 5)
+        assert parse_iccs('H2-E2') == (3, 8, 3, 5)
+        assert format_iccs((3, 8, 3, 5)) == 'h2e2'
+
+    @pytest.mark.parametrize("token, move", [
+        ('C2.5', (3, 8, 3, 5)),
+        ('C2=5', (3, 8, 3, 5)),
+        ('H2+3', (1, 8, 3, 7)),
+        ('R1+1', (1, 9, 2, 9)),
+        ('A4+5', (1, 6, 2, 5)),
+        ('E3+5', (1, 7, 3, 5)),
+        ('B7+5', (1, 3, 3, 5)),
+    ])
+    def test_red_wxf_moves(self, token, move):
+        """測試紅方 WXF 記號（縱線由紅方右手邊起算）"""
+        assert parse_wxf(self.engine, token) == move
+
+    def test_black_wxf_moves(self):
+        """測試黑方 WXF 記號（縱線由黑方右手邊起算，進為行數減少）"""
+        self.engine.move_piece(3, 8, 3, 5)
+        assert parse_wxf(self.engine, 'C8.5') == (8, 8, 8, 5)
+        assert parse_wxf(self.engine, 'H2+3') == (10, 2, 8, 3)
+        assert parse_wxf(self.engine, 'R1+2') == (10, 1, 8, 1)
+
+    def test_soldier_forward_follows_validator(self):
+        """測試兵卒的「進」依引擎的兵卒驗證器：內建規則中紅兵朝行數減少的方向走"""
+        assert parse_wxf(self.engine, 'P7+1') == (4, 3, 3, 3)
+        assert self.engine.move_piece(*parse_wxf(self.engine, 'P7+1'))
+        assert parse_wxf(self.engine, 'P3+1') == (7, 3, 8, 3)
+
+    def test_soldier_forward_with_replaced_validator(self):
+        """測試換成紅兵朝行數增加的驗證器時，P7+1 隨之改變"""
+        from test_perft import StandardSoldierMoveValidator
+        self.engine.validators['Soldier'] = StandardSoldierMoveValidator()
+        assert parse_wxf(self.engine, 'P7+1') == (4, 3, 5, 3)
+
+    def test_iccs_soldier_moves_are_coordinates(self):
+        """測試 ICCS 不做方向換算：內建規則下紅兵第一步是 c3c2，c3c4 不合法"""
+        games = list(replay_archive(io.StringIO("c3c2 c6c7\n*\n\nc3c4\n*\n")))
+        assert games[0].ok and games[0].moves == [(4, 3, 3, 3), (7, 3, 8, 3)]
+        assert not games[1].ok and games[1].error.ply == 1
+
+    def test_front_and_rear_pieces(self):
+        """測試同一縱線兩子時以 +/- 指定前後"""
+        engine = ChessEngine.from_fen("4k4/9/9/9/9/4R4/9/4R4/9/3K5 w")
+        assert parse_wxf(engine, 'R+.1') == (5, 5, 5, 9)
+        assert parse_wxf(engine, '-R.1') == (3, 5, 3, 9)
+        with pytest.raises(NotationError):
+            parse_wxf(engine, 'R5.1')
+
+    def test_ambiguity_resolved_by_legality(self):
+        """測試同一縱線兩子時，只有一子能走的記號不算歧義"""
+        engine = ChessEngine.from_fen("4k4/9/9/9/9/4R4/9/4R4/9/3K5 w")
+        assert parse_wxf(engine, 'R5+4') == (5, 5, 9, 5)
+
+    @pytest.mark.parametrize("token", ['X2.5', 'H2.3', 'R3+1', 'z9z9'])
+    def test_rejects_bad_tokens(self, token):
+        """測試無法解析或無對應棋子的記號"""
+        with pytest.raises(NotationError):
+            parse_move(self.engine, token)
+
+class TestReplay:
+    """棋譜串流讀取與重播測試"""
+
+    def test_read_games_streams_records(self):
+        """測試逐局讀取標頭、記號與結果"""
+        records = read_games(io.StringIO(ARCHIVE))
+        first = next(records)
+        assert first.index == 1
+        assert first.headers == {'Event': 'Game one'}
+        assert first.tokens == ['h2e2', 'h7e7', 'h0g2']
+        assert first.result == '*'
+        assert [record.index for record in records] == [2, 3]
+
+    def test_replay_archive_reports_game_and_ply(self):
+        """測試重播整個檔案，錯誤記錄局數與步數且不中斷後續各局"""
+        replays = list(replay_archive(io.StringIO(ARCHIVE)))
+        assert [replay.ok for replay in replays] == [True, False, True]
+        assert replays[0].engine.board[(3, 7)] == {'color': 'Red', 'type': 'Horse'}
+        error = replays[1].error
+        assert (error.game, error.ply, error.token) == (2, 6, 'R9.7')
+        assert len(replays[1].moves) == 5
+        assert replays[2].moves[0] == (1, 1, 10, 1)
+
+    def test_replay_moves_uses_move_piece(self):
+        """測試不合法的移動由 move_piece 拒絕"""
+        record = next(read_games(io.StringIO("h2e2 h2e2\n")))
+        replay = replay_moves(record)
+        assert next(replay) == (1, (3, 8, 3, 5))
+        with pytest.raises(NotationError) as error:
+            next(replay)
+        assert error.value.ply == 2
+
+    def test_read_games_from_path(self, tmp_path):
+        """測試由檔案路徑讀取"""
+        path = tmp_path / "games.txt"
+        path.write_text(ARCHIVE, encoding='utf-8')
+        assert sum(1 for _ in read_games(str(path))) == 3
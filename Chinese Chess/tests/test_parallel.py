@@ -0,0 +1,71 @@
+import threading
+
+import pytest
+from src.chess_engine import ChessEngine
+from src.parallel import ParallelAnalyzer, measure_speedup
+from src.search import MATE_THRESHOLD
+
+from test_perft import PERFT_COUNTS, build_position
+
+@pytest.fixture(scope="module")
+def analyzer():
+    with ParallelAnalyzer(workers=2) as shared_analyzer:
+        yield shared_analyzer
+
+class TestSnapshot:
+    """局面快照測試"""
+
+    def test_snapshot_round_trip(self):
+        """測試快照可還原棋盤、輪次與結果"""
+        engine = build_position('cannon_screens')
+        engine.make_move(3, 5, 3, 6)
+        snapshot = engine.snapshot()
+        assert len(snapshot[0]) == 90
+        restored = ChessEngine.from_snapshot(snapshot, board_backend='mailbox')
+        assert dict(restored.board) == engine.board
+        assert restored.turn_manager.current_turn == 'Black'
+        assert restored.position_key() == engine.position_key()
+
+class TestParallelAnalyzer:
+    """根節點分割平行計算測試"""
+
+    @pytest.mark.parametrize("name", ['initial', 'horse_legs'])
+    def test_parallel_perft_matches_serial(self, analyzer, name):
+        """測試平行 perft 與序列結果一致"""
+        engine = build_position(name)
+        result = analyzer.perft(engine, 3)
+        assert result.completed
+        assert result.value == PERFT_COUNTS[name][2]
+        assert result.divide == engine.divide(3)
+
+    def test_cancelled_perft_is_partial(self, analyzer):
+        """測試取消後回傳未完成的部分結果"""
+        cancel_event = threading.Event()
+        cancel_event.set()
+        result = analyzer.perft(build_position('initial'), 3, cancel_event=cancel_event)
+        assert result.completed == False
+        assert result.value <= PERFT_COUNTS['initial'][2]
+
+    def test_perft_deadline(self, analyzer):
+        """測試期限到達時回傳未完成的部分結果"""
+        result = analyzer.perft(build_position('initial'), 4, deadline_ms=1)
+        assert result.completed == False
+
+    def test_parallel_search_finds_mate(self, analyzer):
+        """測試平行搜尋找到一步殺"""
+        engine = ChessEngine()
+        engine.place_piece('Red', 'General', 1, 4)
+        engine.place_piece('Red', 'Rook', 5, 1)
+        engine.place_piece('Red', 'Rook', 9, 9)
+        engine.place_piece('Black', 'General', 10, 5)
+        engine.place_piece('Black', 'Soldier', 6, 9)
+        result = analyzer.search(engine, depth=2)
+        assert result.best_move == (5, 1, 10, 1)
+        assert result.value >= MATE_THRESHOLD
+        assert result.nodes > 0
+
+    def test_measure_speedup_reports_serial_baseline(self):
+        """測試加速比報告包含序列基準"""
+        report = measure_speedup(build_position('flying_generals'), 2, worker_counts=(2,))
+        assert set(report) == {0, 2}
+        assert report[0][1] == 1.0
@@ -0,0 +1,141 @@
+"""Perft 正確性與效能測試
+
+節點數以逐格驗證的對照實作與位元棋盤交叉確認後記錄；任何加速若改變了
+走法規則，這裡的節點數就會不一致。注意本引擎的兵卒規則依 SoldierMoveValidator
+（紅兵往行數遞減方向前進），因此標準開局第 3 層起與公開的 perft 數字不同；
+換上標準兵卒規則後則與公開數字 (44 / 1920 / 79666) 一致。
+"""
+
+import time
+
+import pytest
+from src.chess_engine import ChessEngine, SoldierMoveValidator
+
+TRICKY_POSITIONS = {
+    'cannon_screens': [
+        ('Red', 'General', 1, 4), ('Red', 'Cannon', 3, 5), ('Red', 'Cannon', 5, 2),
+        ('Red', 'Soldier', 6, 5), ('Red', 'Rook', 1, 9),
+        ('Black', 'General', 10, 5), ('Black', 'Guard', 9, 5), ('Black', 'Rook', 8, 2),
+        ('Black', 'Horse', 10, 2), ('Black', 'Cannon', 8, 5), ('Black', 'Elephant', 10, 7),
+    ],
+    'horse_legs': [
+        ('Red', 'General', 1, 5), ('Red', 'Horse', 3, 3), ('Red', 'Horse', 5, 5),
+        ('Red', 'Soldier', 4, 3), ('Red', 'Guard', 2, 4), ('Red', 'Elephant', 3, 5),
+        ('Black', 'General', 10, 4), ('Black', 'Horse', 8, 6), ('Black', 'Horse', 7, 4),
+        ('Black', 'Rook', 9, 6), ('Black', 'Soldier', 6, 5),
+    ],
+    'flying_generals': [
+        ('Red', 'General', 1, 5), ('Red', 'Horse', 4, 5), ('Red', 'Rook', 3, 1),
+        ('Black', 'General', 10, 5), ('Black', 'Rook', 6, 1), ('Black', 'Soldier', 5, 3),
+        ('Black', 'Guard', 9, 4),
+    ],
+    'river_soldiers': [
+        ('Red', 'General', 1, 4), ('Red', 'Soldier', 5, 3), ('Red', 'Soldier', 6, 5),
+        ('Red', 'Soldier', 7, 7), ('Red', 'Cannon', 2, 2),
+        ('Black', 'General', 10, 6), ('Black', 'Soldier', 6, 1), ('Black', 'Soldier', 5, 5),
+        ('Black', 'Soldier', 4, 9), ('Black', 'Guard', 9, 5),
+    ],
+}
+
+# 各局面第 1、2、3 層的節點數
+PERFT_COUNTS = {
+    'initial': [44, 1920, 77508],
+    'cannon_screens': [46, 1105, 45749],
+    'horse_legs': [17, 391, 6060],
+    'flying_generals': [16, 351, 6428],
+    'river_soldiers': [26, 279, 6451],
+}
+
+class StandardSoldierMoveValidator(SoldierMoveValidator):
+    """標準兵卒規則（紅兵往行數遞增方向前進），用於對照公開的 perft 數字"""
+
+    def is_valid_move(self, board, from_row, from_col, to_row, to_col, piece):
+        forward = 1 if piece['color'] == 'Red' else -1
+        crossed = from_row >= 6 if piece['color'] == 'Red' else from_row <= 5
+        if (to_row - from_row, to_col - from_col) == (forward, 0):
+            return True
+        return crossed and to_row == from_row and abs(to_col - from_col) == 1
+
+def build_position(name, board_backend='dict'):
+    """建立指定名稱的測試局面"""
+    engine = ChessEngine(board_backend=board_backend)
+    if name == 'initial':
+        engine.setup_initial_board()
+    else:
+        for color, piece_type, row, col in TRICKY_POSITIONS[name]:
+            engine.place_piece(color, piece_type, row, col)
+    return engine
+
+def bitboard_perft(position, depth):
+    """位元棋盤的 perft，作為第二套實作的對照"""
+    moves = position.generate_legal_moves()
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        position.make_move(*move)
+        nodes += bitboard_perft(position, depth - 1)
+        position.unmake_move()
+    return nodes
+
+class TestPerft:
+    """走法產生器 perft 測試"""
+
+    @pytest.mark.parametrize("name", sorted(PERFT_COUNTS))
+    @pytest.mark.parametrize("depth", [1, 2])
+    def test_perft_counts(self, name, depth):
+        """測試淺層節點數"""
+        assert build_position(name).perft(depth) == PERFT_COUNTS[name][depth - 1]
+
+    @pytest.mark.slow
+    @pytest.mark.parametrize("name", sorted(PERFT_COUNTS))
+    def test_perft_depth_3_benchmark(self, name, record_property):
+        """測試第 3 層節點數並記錄每秒節點數"""
+        engine = build_position(name)
+        start = time.perf_counter()
+        nodes = engine.perft(3)
+        elapsed = time.perf_counter() - start
+        nodes_per_second = int(nodes / elapsed) if elapsed > 0 else 0
+        record_property("nodes_per_second", nodes_per_second)
+        assert nodes == PERFT_COUNTS[name][2]
+
+    @pytest.mark.slow
+    def test_standard_soldier_rules_match_published_counts(self):
+        """測試換上標準兵卒規則後與公開的開局 perft 數字一致"""
+        engine = ChessEngine()
+        engine.validators['Soldier'] = StandardSoldierMoveValidator()
+        engine.setup_initial_board()
+        assert [engine.perft(depth) for depth in (1, 2, 3)] == [44, 1920, 79666]
+
+    @pytest.mark.parametrize("name", sorted(PERFT_COUNTS))
+    def test_divide_sums_to_perft(self, name):
+        """測試 divide 的總和等於 perft，且局面不變"""
+        engine = build_position(name)
+        key_before = engine.position_key()
+        counts = engine.divide(2)
+        assert sum(counts.values()) == PERFT_COUNTS[name][1]
+        assert len(counts) == PERFT_COUNTS[name][0]
+        assert engine.position_key() == key_before
+
+    @pytest.mark.parametrize("name", sorted(PERFT_COUNTS))
+    def test_backends_agree(self, name):
+        """測試陣列棋盤與位元棋盤得到相同節點數"""
+        assert build_position(name, board_backend='mailbox').perft(2) == PERFT_COUNTS[name][1]
+        assert bitboard_perft(build_position(name).to_bitboards(), 2) == PERFT_COUNTS[name][1]
+
+    @pytest.mark.slow
+    def test_backend_perft_benchmark(self, record_property):
+        """記錄字典棋盤與陣列棋盤的第 3 層 perft 時間（兩者交替執行五輪，各取最快的一次）
+
+        只記錄不比較：牆鐘時間受機器負載影響，不適合作為通過條件。
+        """
+        engines = {board_backend: build_position('initial', board_backend=board_backend)
+                   for board_backend in ('dict', 'mailbox')}
+        timings = dict.fromkeys(engines, float('inf'))
+        for _ in range(5):
+            for board_backend, engine in engines.items():
+                start = time.perf_counter()
+                assert engine.perft(3) == PERFT_COUNTS['initial'][2]
+                timings[board_backend] = min(timings[board_backend], time.perf_counter() - start)
+        for board_backend, seconds in timings.items():
+            record_property(f"{board_backend}_seconds", round(seconds, 4))
@@ -0,0 +1,142 @@
+import time
+
+from src.chess_engine import ChessEngine
+from src.search import MATE_THRESHOLD, PIECE_VALUES, Searcher, attackers_to, static_exchange
+
+class TestSearch:
+    """Alpha-beta 搜尋測試"""
+
+    def setup_method(self):
+        self.engine = ChessEngine()
+        self.engine.setup_empty_board()
+
+    def place_mate_in_one(self):
+        """紅車一步將死：黑將被己方士卒困住"""
+        self.engine.place_piece('Red', 'General', 1, 4)
+        self.engine.place_piece('Red', 'Rook', 5, 1)
+        self.engine.place_piece('Red', 'Rook', 9, 9)
+        self.engine.place_piece('Black', 'General', 10, 5)
+
+    def test_finds_mate_in_one(self):
+        """測試找到一步殺"""
+        self.place_mate_in_one()
+        result = self.engine.search(depth=3)
+        assert result.best_move == (5, 1, 10, 1)
+        assert result.score >= MATE_THRESHOLD
+        assert result.pv[0] == result.best_move
+
+    def test_captures_hanging_piece(self):
+        """測試吃掉無保護的棋子"""
+        self.engine.place_piece('Red', 'General', 1, 4)
+        self.engine.place_piece('Red', 'Rook', 5, 1)
+        self.engine.place_piece('Black', 'General', 10, 6)
+        self.engine.place_piece('Black', 'Horse', 5, 7)
+        result = self.engine.search(depth=2)
+        assert result.best_move == (5, 1, 5, 7)
+        assert result.score > 0
+
+    def test_search_keeps_position(self):
+        """測試搜尋後局面與輪次不變"""
+        self.place_mate_in_one()
+        board_before = dict(self.engine.board)
+        key_before = self.engine.position_key()
+        self.engine.search(depth=3)
+        assert self.engine.board == board_before
+        assert self.engine.position_key() == key_before
+        assert self.engine.turn_manager.current_turn == 'Red'
+        assert self.engine._undo_stack == []
+
+    def test_node_budget(self):
+        """測試節點預算中止後仍回傳合法移動並還原局面"""
+        self.place_mate_in_one()
+        self.engine.place_piece('Black', 'Cannon', 8, 2)
+        self.engine.place_piece('Black', 'Horse', 10, 8)
+        result = self.engine.search(nodes=50)
+        assert result.nodes <= 50
+        assert result.best_move in self.engine.generate_legal_moves('Red')
+        assert self.engine._undo_stack == []
+
+    def test_time_budget(self):
+        """測試時間預算"""
+        self.place_mate_in_one()
+        self.engine.place_piece('Black', 'Cannon', 8, 2)
+        self.engine.place_piece('Black', 'Horse', 10, 8)
+        self.engine.place_piece('Black', 'Rook', 8, 8)
+        start = time.perf_counter()
+        result = self.engine.search(movetime_ms=100)
+        assert time.perf_counter() - start < 1.0
+        assert result.best_move is not None
+        assert result.nps >= 0
+
+    def test_no_legal_moves(self):
+        """測試無合法移動時回傳落敗分數"""
+        self.engine.place_piece('Red', 'General', 1, 4)
+        self.engine.place_piece('Red', 'Rook', 10, 1)
+        self.engine.place_piece('Red', 'Rook', 9, 2)
+        self.engine.place_piece('Black', 'General', 10, 5)
+        self.engine.turn_manager.current_turn = 'Black'
+        result = self.engine.search(depth=2)
+        assert result.best_move is None
+        assert result.score <= -MATE_THRESHOLD
+
+    def test_stop_event(self):
+        """測試外部停止要求"""
+        self.place_mate_in_one()
+        searcher = Searcher(self.engine)
+        searcher.stop()
+        result = searcher.search(depth=5)
+        assert result.best_move in self.engine.generate_legal_moves('Red')
+
+class TestStaticExchange:
+    """靜態交換評估與靜止搜尋測試"""
+
+    def setup_method(self):
+        self.engine = ChessEngine()
+        self.engine.setup_empty_board()
+        self.engine.place_piece('Red', 'General', 1, 4)
+        self.engine.place_piece('Black', 'General', 10, 6)
+        self.engine.place_piece('Black', 'Horse', 5, 5)
+
+    def test_unprotected_capture(self):
+        """測試吃無保護的棋子得到整個子力"""
+        self.engine.place_piece('Red', 'Rook', 5, 1)
+        assert static_exchange(self.engine, (5, 1, 5, 5)) == PIECE_VALUES['Horse']
+
+    def test_protected_capture_loses(self):
+        """測試以車吃有保護的馬為虧損"""
+        self.engine.place_piece('Red', 'Rook', 5, 1)
+        self.engine.place_piece('Black', 'Rook', 9, 5)
+        assert attackers_to(self.engine, (5, 5), 'Black') == [(9, 5)]
+        assert static_exchange(self.engine, (5, 1, 5, 5)) == PIECE_VALUES['Horse'] - PIECE_VALUES['Rook']
+
+    def test_cannon_screen_appears(self):
+        """測試吃子後炮有了炮架可以吃回"""
+        self.engine.place_piece('Red', 'Rook', 1, 5)
+        self.engine.place_piece('Black', 'Cannon', 5, 9)
+        self.engine.place_piece('Black', 'Soldier', 5, 7)
+        assert static_exchange(self.engine, (1, 5, 5, 5)) == PIECE_VALUES['Horse'] - PIECE_VALUES['Rook']
+
+    def test_cannon_screen_disappears(self):
+        """測試吃子的棋子原本是炮架，移開後炮無法吃回"""
+        self.engine.place_piece('Red', 'Rook', 5, 3)
+        self.engine.place_piece('Black', 'Cannon', 5, 1)
+        assert attackers_to(self.engine, (5, 5), 'Black') == [(5, 1)]
+        assert static_exchange(self.engine, (5, 3, 5, 5)) == PIECE_VALUES['Horse']
+
+    def test_xray_attacker_behind_rook(self):
+        """測試車後方的車在交換中露出"""
+        self.engine.place_piece('Red', 'Rook', 5, 2)
+        self.engine.place_piece('Red', 'Rook', 5, 1)
+        self.engine.place_piece('Black', 'Rook', 5, 9)
+        assert static_exchange(self.engine, (5, 2, 5, 5)) == PIECE_VALUES['Horse']
+        assert len(self.engine._undo_stack) == 0
+
+    def test_quiescence_avoids_losing_capture(self):
+        """測試靜止搜尋看出吃子後會被吃回"""
+        self.engine.place_piece('Red', 'Rook', 5, 1)
+        self.engine.place_piece('Black', 'Rook', 9, 5)
+        greedy = Searcher(self.engine, quiescence=False).search(depth=1)
+        assert greedy.best_move == (5, 1, 5, 5)
+        result = Searcher(self.engine).search(depth=1)
+        assert result.best_move != (5, 1, 5, 5)
+        assert result.score <= 0
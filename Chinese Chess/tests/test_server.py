@@ -0,0 +1,198 @@
+import asyncio
+import os
+import tempfile
+
+import pytest
+from src.server import GameClient, GameServer, percentile, run_synthetic_load
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+class TestGameServer:
+    """非同步多局伺服器測試"""
+
+    def setup_method(self):
+        """設定測試環境"""
+        self.server = GameServer(validation_workers=2)
+
+    def teardown_method(self):
+        self.server.close()
+
+    def test_submit_move(self):
+        """測試提交合法與不合法的移動"""
+        async def scenario():
+            session = self.server.create_game()
+            accepted = await self.server.submit_move(session.game_id, (3, 8, 3, 5))
+            wrong_turn = await self.server.submit_move(session.game_id, (1, 1, 2, 1))
+            unreachable = await self.server.submit_move(session.game_id, (10, 8, 5, 5))
+            return session, accepted, wrong_turn, unreachable
+
+        session, accepted, wrong_turn, unreachable = run(scenario())
+        assert accepted.accepted and accepted.turn == 'Black'
+        assert not wrong_turn.accepted and wrong_turn.reason == "不是該方的回合"
+        assert not unreachable.accepted and unreachable.reason == "棋子無法到達該位置"
+        assert session.engine.board[(3, 5)]['type'] == 'Cannon'
+        assert session.moves == 1
+
+    def test_moves_are_serialized_per_game(self):
+        """測試同一局同時提交的移動依提交順序套用"""
+        async def scenario():
+            session = self.server.create_game()
+            moves = [(3, 8, 3, 5), (10, 8, 8, 7), (1, 8, 3, 7), (10, 9, 10, 8)]
+            results = await asyncio.gather(*(self.server.submit_move(session.game_id, move) for move in moves))
+            state = await self.server.game_state(session.game_id)
+            return results, state
+
+        results, state = run(scenario())
+        assert all(result.accepted for result in results)
+        assert state['moves'] == 4
+        assert state['turn'] == 'Red'
+        assert state['fen'] == 'rnbakabr1/9/1c4nc1/p1p1p1p1p/9/9/P1P1P1P1P/1C2C1N2/9/RNBAKAB1R w - - 4 3'
+
+    def test_games_are_independent(self):
+        """測試不同對局的狀態互不影響"""
+        async def scenario():
+            first = self.server.create_game()
+            second = self.server.create_game()
+            await self.server.submit_move(first.game_id, (3, 8, 3, 5))
+            return first, second
+
+        first, second = run(scenario())
+        assert first.engine.turn_manager.current_turn == 'Black'
+        assert second.engine.turn_manager.current_turn == 'Red'
+        assert len(self.server.sessions) == 2
+
+    def test_same_square_rejected(self):
+        """測試起點與終點相同的移動有獨立的拒絕原因"""
+        session = self.server.create_game()
+        result = run(self.server.submit_move(session.game_id, (1, 1, 1, 1)))
+        assert not result.accepted and result.reason == "起點與終點相同"
+
+    def test_unknown_and_closed_game(self):
+        """測試不存在或已關閉的對局"""
+        session = self.server.create_game()
+        self.server.close_game(session.game_id)
+        with pytest.raises(ValueError):
+            run(self.server.submit_move(session.game_id, (3, 8, 3, 5)))
+        with pytest.raises(ValueError):
+            self.server.close_game(session.game_id)
+
+    def test_inline_validation(self):
+        """測試不使用執行緒池時在事件迴圈上驗證"""
+        server = GameServer(validation_workers=0)
+        session = server.create_game()
+        result = run(server.submit_move(session.game_id, (3, 8, 3, 5)))
+        assert result.accepted
+        assert server.stats()['moves'] == 1
+
+    def test_percentile(self):
+        """測試最近秩百分位數"""
+        samples = list(range(1, 101))
+        assert percentile(samples, 0.99) == 99
+        assert percentile(samples, 0.50) == 50
+        assert percentile([], 0.99) == 0.0
+
+    def test_synthetic_load_report(self):
+        """測試合成負載回報每局記憶體與 p99 延遲"""
+        report = run(run_synthetic_load(self.server, games=20, moves_per_game=3, seed=1))
+        assert report.games == 20
+        assert report.moves == 60
+        assert report.rejected == 0
+        assert report.bytes_per_session > 0
+        assert report.p99_ms >= report.p50_ms > 0
+        assert self.server.stats()['moves'] == 60
+
+class TestJsonProtocol:
+    """行分隔 JSON 協定測試"""
+
+    def setup_method(self):
+        """設定測試環境"""
+        self.server = GameServer(validation_workers=1)
+
+    def teardown_method(self):
+        self.server.close()
+
+    async def play_through(self, client):
+        created = await client.request('new')
+        game = created['game']
+        legal = await client.request('legal', game=game)
+        move = await client.request('move', game=game, move='h2e2')
+        illegal = await client.request('move', game=game, move='a0a5')
+        state = await client.request('state', game=game)
+        bad = await client.request('move', game='missing', move='h2e2')
+        unknown = await client.request('dance')
+        stats = await client.request('stats')
+        return legal, move, illegal, state, bad, unknown, stats
+
+    def check_responses(self, responses):
+        legal, move, illegal, state, bad, unknown, stats = responses
+        assert legal['ok'] and 'h2e2' in legal['moves'] and len(legal['moves']) == 44
+        assert move['ok'] and move['accepted'] and move['turn'] == 'Black'
+        assert illegal['ok'] and not illegal['accepted']
+        assert state['fen'].startswith('rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C2C4/')
+        assert not bad['ok'] and 'missing' in bad['error']
+        assert not unknown['ok']
+        assert stats['ok'] and stats['sessions'] == 1 and stats['moves'] == 1
+
+    def test_malformed_requests_always_answered(self):
+        """測試欄位型別錯誤與未預期的例外仍回應 ok=false"""
+        async def scenario():
+            listener = await self.server.start_tcp('127.0.0.1', 0)
+            port = listener.sockets[0].getsockname()[1]
+            client = await GameClient.connect('127.0.0.1', port)
+            try:
+                fen = await client.request('new', fen=123)
+                game = (await client.request('new'))['game']
+                move = await client.request('move', game=game, move=42)
+                state = await client.request('state', game=['g1'])
+                same_square = await client.request('move', game=game, move='a0a0')
+                self.server.create_game = lambda fen=None: {}['boom']
+                crashed = await client.request('new')
+                return fen, move, state, same_square, crashed
+            finally:
+                await client.close()
+                listener.close()
+                await listener.wait_closed()
+
+        fen, move, state, same_square, crashed = run(asyncio.wait_for(scenario(), 10))
+        assert not fen['ok'] and 'fen' in fen['error']
+        assert not move['ok'] and 'move' in move['error']
+        assert not state['ok'] and 'game' in state['error']
+        assert same_square['ok'] and same_square['reason'] == "起點與終點相同"
+        assert not crashed['ok'] and 'KeyError' in crashed['error']
+
+    def test_tcp(self):
+        """測試以 TCP 連線對局"""
+        async def scenario():
+            listener = await self.server.start_tcp('127.0.0.1', 0)
+            port = listener.sockets[0].getsockname()[1]
+            client = await GameClient.connect('127.0.0.1', port)
+            try:
+                return await self.play_through(client)
+            finally:
+                await client.close()
+                listener.close()
+                await listener.wait_closed()
+
+        self.check_responses(run(scenario()))
+
+    def test_unix_socket(self):
+        """測試以 Unix socket 連線，並同時送出多個請求"""
+        async def scenario():
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'games.sock')
+                listener = await self.server.start_unix(path)
+                client = await GameClient.connect_unix(path)
+                try:
+                    games = await asyncio.gather(*(client.request('new') for _ in range(5)))
+                    moves = await asyncio.gather(*(client.request('move', game=game['game'], move='b0c2')
+                                                   for game in games))
+                    return games, moves
+                finally:
+                    await client.close()
+                    listener.close()
+                    await listener.wait_closed()
+
+        games, moves = run(scenario())
+        assert len({game['game'] for game in games}) == 5
+        assert all(move['accepted'] for move in moves)
@@ -0,0 +1,129 @@
+import random
+
+import pytest
+from src.chess_engine import ChessEngine
+from src.search import MATE_SCORE
+from src.tablebase import (DRAW, ILLEGAL, LOSS, WIN, Material, Tablebase, TablebaseGenerator,
+                           TablebaseSet, generate_tablebases, piece_squares)
+
+@pytest.fixture(scope="module")
+def generator():
+    generator = TablebaseGenerator()
+    generator.build('KR-K')
+    return generator
+
+@pytest.fixture(scope="module")
+def rook_table(generator):
+    return generator.tables[Material.from_signature('KR-K')]
+
+def engine_from_squares(table, squares, current_turn):
+    engine = ChessEngine()
+    for (color, piece_type), (row, col) in zip(table.material.pieces, squares):
+        engine.place_piece(color, piece_type, row, col)
+    engine.turn_manager.current_turn = current_turn
+    return engine
+
+class TestMaterial:
+    """殘局子力與格子集合測試"""
+
+    def test_signature_round_trip(self):
+        """測試子力字串解析與排序"""
+        material = Material.from_signature('KPH-KAA')
+        assert material.signature == 'KHP-KAA'
+        assert material.mirrored().signature == 'KAA-KHP'
+        assert material.without(2).signature == 'KP-KAA'
+        with pytest.raises(ValueError):
+            Material.from_signature('KR')
+        with pytest.raises(ValueError):
+            Material.from_signature('KX-K')
+
+    def test_square_sets_follow_validators(self):
+        """測試格子集合由驗證器規則推得：九宮、士位、己方象位"""
+        assert len(piece_squares('Red', 'General')) == 9
+        assert len(piece_squares('Black', 'Guard')) == 5
+        assert set(piece_squares('Red', 'Elephant')) == {
+            (1, 3), (1, 7), (3, 1), (3, 5), (3, 9), (5, 3), (5, 7)}
+        assert len(piece_squares('Red', 'Rook')) == 90
+
+class TestRetrogradeAnalysis:
+    """逆向分析結果測試"""
+
+    def test_results_are_consistent_with_moves(self, generator, rook_table):
+        """測試勝局有一步走到對方負局，負局的所有移動都走到對方勝局（含吃子後的子表）"""
+        tablebases = TablebaseSet(generator.tables.values())
+        rng = random.Random(15)
+        checked = 0
+        while checked < 150:
+            index = rng.randrange(rook_table.position_count)
+            side = rng.randrange(2)
+            result, distance = rook_table.value(index, side)
+            if result == ILLEGAL:
+                continue
+            color = ('Red', 'Black')[side]
+            engine = engine_from_squares(rook_table, rook_table.decode(index), color)
+            engine.tablebases = tablebases
+            children = []
+            for move in engine.generate_legal_moves(color):
+                engine.make_move(*move)
+                children.append(engine.probe_tablebase())
+                engine.unmake_move()
+            if result == WIN:
+                assert (LOSS, distance - 1) in children
+                assert all(not (child[0] == LOSS and child[1] < distance - 1) for child in children)
+            elif result == LOSS:
+                assert all(child[0] == WIN and child[1] <= distance - 1 for child in children)
+                assert distance == 0 or (WIN, distance - 1) in children
+            else:
+                assert result == DRAW
+                assert all(child[0] != LOSS for child in children)
+            checked += 1
+
+    def test_rook_mate_in_one(self, rook_table):
+        """測試車的一步殺"""
+        engine = ChessEngine.from_fen("4k4/9/9/9/9/9/9/9/9/3K1R3 w")
+        engine.tablebases = TablebaseSet([rook_table])
+        assert engine.probe_tablebase() == (WIN, 1)
+
+    def test_mirrored_probe(self, rook_table):
+        """測試紅黑互換的局面使用同一張表"""
+        engine = ChessEngine.from_fen("3k1r3/9/9/9/9/9/9/9/9/4K4 b")
+        engine.tablebases = TablebaseSet([rook_table])
+        assert engine.probe_tablebase() == (WIN, 1)
+        engine.turn_manager.current_turn = 'Red'
+        assert engine.probe_tablebase()[0] == LOSS
+
+    def test_not_covered_positions(self, rook_table):
+        """測試子力不符時回傳 None"""
+        engine = ChessEngine()
+        engine.setup_initial_board()
+        engine.tablebases = TablebaseSet([rook_table])
+        assert engine.probe_tablebase() is None
+        assert ChessEngine().probe_tablebase() is None
+
+    def test_search_uses_tablebase(self, rook_table):
+        """測試搜尋在殘局表涵蓋的局面使用精確距離"""
+        engine = ChessEngine.from_fen("4k4/9/9/9/9/9/9/9/9/3K1R3 w")
+        engine.tablebases = TablebaseSet([rook_table])
+        result = engine.search(depth=2)
+        assert result.score == MATE_SCORE - 1
+        engine.make_move(*result.best_move)
+        assert engine.generate_legal_moves('Black') == []
+
+class TestTablebaseFiles:
+    """殘局表檔案測試"""
+
+    def test_save_and_load_directory(self, tmp_path, rook_table):
+        """測試寫出檔案後以 mmap 載入，結果與產生時相同"""
+        paths = generate_tablebases(['KR-K'], str(tmp_path))
+        assert sorted(path.rsplit('/', 1)[-1] for path in paths) == ['K-K.xtb', 'KR-K.xtb']
+        tables = TablebaseSet().load_directory(str(tmp_path))
+        loaded = tables.tables[Material.from_signature('KR-K')]
+        assert list(loaded.values) == list(rook_table.values)
+        tables.close()
+
+    def test_rejects_non_tablebase_file(self, tmp_path):
+        """測試非殘局表檔案"""
+        path = tmp_path / "bad.xtb"
+        path.write_bytes(bytes(64))
+        with pytest.raises(ValueError):
+            Tablebase.load(str(path))
@@ -0,0 +1,73 @@
+import pytest
+from src.transposition import (
+    BOUND_EXACT, BOUND_LOWER, BOUND_UPPER, BUCKET_BYTES, TranspositionTable
+)
+
+class TestTranspositionTable:
+    """置換表測試"""
+
+    def setup_method(self):
+        self.table = TranspositionTable(size_mb=1)
+
+    def test_size_is_fixed(self):
+        """測試容量在建構時固定"""
+        assert self.table.size_bytes == 1024 * 1024
+        assert self.table.bucket_count == 1024 * 1024 // BUCKET_BYTES
+        with pytest.raises(ValueError):
+            TranspositionTable(size_mb=0)
+
+    def test_store_and_probe(self):
+        """測試寫入後可讀回所有欄位"""
+        key = 0x123456789ABCDEF0
+        self.table.store(key, 7, -1234, BOUND_LOWER, (3, 2, 3, 5))
+        entry = self.table.probe(key)
+        assert (entry.depth, entry.score, entry.bound, entry.move) == (7, -1234, BOUND_LOWER, (3, 2, 3, 5))
+        assert self.table.probe(key ^ 1) is None
+        assert self.table.stats() == {'hits': 1, 'misses': 1, 'collisions': 0}
+
+    def test_keeps_move_when_storing_without_move(self):
+        """測試同一局面未提供移動時保留舊的最佳移動"""
+        self.table.store(42, 3, 10, BOUND_EXACT, (1, 1, 2, 1))
+        self.table.store(42, 4, 20, BOUND_UPPER)
+        entry = self.table.probe(42)
+        assert entry.move == (1, 1, 2, 1)
+        assert entry.depth == 4
+
+    def test_depth_preferred_and_always_replace(self):
+        """測試較淺的結果寫入一律取代槽，不覆蓋深度優先槽"""
+        buckets = self.table.bucket_count
+        deep_key, shallow_key, newer_key = 5, 5 + buckets, 5 + 2 * buckets
+        self.table.store(deep_key, 10, 1, BOUND_EXACT)
+        self.table.store(shallow_key, 2, 2, BOUND_EXACT)
+        assert self.table.probe(deep_key).depth == 10
+        assert self.table.probe(shallow_key).depth == 2
+
+        # 一律取代槽被新的淺層結果覆蓋，深度優先槽仍保留
+        self.table.store(newer_key, 1, 3, BOUND_EXACT)
+        assert self.table.probe(deep_key) is not None
+        assert self.table.probe(shallow_key) is None
+        assert self.table.collisions == 1
+
+    def test_aging_allows_replacement(self):
+        """測試舊世代的深層條目可被新搜尋取代"""
+        buckets = self.table.bucket_count
+        self.table.store(9, 12, 0, BOUND_EXACT)
+        self.table.new_search()
+        self.table.store(9 + buckets, 1, 0, BOUND_EXACT)
+        assert self.table.probe(9 + buckets) is not None
+        assert self.table.hashfull() >= 0
+
+    def test_clear(self):
+        """測試清空條目與統計"""
+        self.table.store(77, 1, 1, BOUND_EXACT)
+        self.table.clear()
+        assert self.table.probe(77) is None
+        assert self.table.hits == 0
+
+    def test_external_buffer(self):
+        """測試使用外部緩衝區作為儲存空間"""
+        buffer = bytearray(BUCKET_BYTES * 4)
+        table = TranspositionTable(buffer=buffer)
+        table.store(3, 1, 5, BOUND_EXACT)
+        assert any(buffer)
+        assert TranspositionTable(buffer=buffer).probe(3).score == 5
@@ -0,0 +1,160 @@
+import io
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+from src.fen import INITIAL_FEN
+from src.ucci import UCCIEngine, allocate_time, parse_go, parse_position
+
+PACKAGE_DIR = os.path.join(os.path.dirname(__file__), '..')
+
+class TestUCCIParsing:
+    """UCCI 指令參數解析測試"""
+
+    def test_parse_go(self):
+        """測試 go 參數解析"""
+        options = parse_go(['ponder', 'time', '60000', 'increment', '1000', 'movestogo', '20'])
+        assert options['ponder'] is True
+        assert options['infinite'] is False
+        assert options['time'] == 60000
+        assert options['increment'] == 1000
+        assert options['movestogo'] == 20
+
+    def test_parse_go_rejects_garbage(self):
+        """測試無法解析的 go 參數"""
+        with pytest.raises(ValueError):
+            parse_go(['depth', 'x'])
+        with pytest.raises(ValueError):
+            parse_go(['sideways'])
+
+    def test_parse_position(self):
+        """測試 position 參數解析"""
+        assert parse_position(['startpos']) == (INITIAL_FEN, [])
+        fen = "4k4/9/9/9/9/9/9/9/9/4K4 w - - 0 1"
+        assert parse_position(['fen'] + fen.split() + ['moves', 'E0E1']) == (fen, ['e0e1'])
+        with pytest.raises(ValueError):
+            parse_position([])
+
+    def test_allocate_time(self):
+        """測試時間分配不超過剩餘時間"""
+        assert allocate_time(60000) == 2000
+        assert allocate_time(60000, 500, 10) == 6500
+        assert allocate_time(40) == 1
+
+class TestUCCIEngine:
+    """UCCI 協定前端測試"""
+
+    def setup_method(self):
+        """設定測試環境"""
+        self.output = io.StringIO()
+        self.ucci = UCCIEngine(self.output, hash_mb=1)
+
+    def teardown_method(self):
+        self.ucci.stop()
+
+    def lines(self):
+        return self.output.getvalue().splitlines()
+
+    def test_handshake(self):
+        """測試 ucci 與 isready 回應"""
+        self.ucci.handle('ucci')
+        self.ucci.handle('isready')
+        lines = self.lines()
+        assert lines[0].startswith('id name')
+        assert lines[-2:] == ['ucciok', 'readyok']
+
+    def test_position_applies_only_new_moves(self):
+        """測試 position 沿用同一個引擎，只套用新增的移動"""
+        engine = self.ucci.engine
+        self.ucci.handle('position startpos moves h2e2')
+        self.ucci.handle('position startpos moves h2e2 h9g7')
+        assert self.ucci.engine is engine
+        assert self.ucci.moves == ['h2e2', 'h9g7']
+        assert len(engine._undo_stack) == 2
+        assert engine.board[(3, 5)]['type'] == 'Cannon'
+        assert engine.board[(8, 7)]['type'] == 'Horse'
+
+    def test_position_backtracks_to_common_prefix(self):
+        """測試移動不同時退回共同前段再重新套用"""
+        self.ucci.handle('position startpos moves h2e2 h9g7')
+        self.ucci.handle('position startpos moves h2e2')
+        key_after_h2e2 = self.ucci.engine.position_key()
+        self.ucci.handle('position startpos moves h2e2 h7e7')
+        assert self.ucci.moves == ['h2e2', 'h7e7']
+        assert (8, 7) not in self.ucci.engine.board
+        self.ucci.engine.unmake_move()
+        assert self.ucci.engine.position_key() == key_after_h2e2
+
+    def test_new_fen_rebuilds_engine(self):
+        """測試起始局面不同時重建引擎"""
+        engine = self.ucci.engine
+        self.ucci.handle('position fen 4k4/9/9/9/9/9/9/9/9/3K1R3 w - - 0 1 moves f0f1')
+        assert self.ucci.engine is not engine
+        assert self.ucci.engine.to_fen().startswith('4k4/9/9/9/9/9/9/9/5R3/3K5 b')
+
+    def test_illegal_move_is_reported(self):
+        """測試不合法的移動被回報，局面停在最後一個合法移動之後"""
+        self.ucci.handle('position startpos moves h2e2 a0a5')
+        assert self.ucci.moves == ['h2e2']
+        assert self.lines()[-1] == 'info string 不合法的移動: a0a5'
+
+    def test_go_depth(self):
+        """測試 go depth 在背景搜尋並回覆 bestmove"""
+        self.ucci.handle('position fen 4k4/9/9/9/9/9/9/9/9/3K1R3 w - - 0 1')
+        self.ucci.handle('go depth 3')
+        assert self.ucci.wait(timeout=30)
+        lines = self.lines()
+        assert any(line.startswith('info depth 1 score') for line in lines)
+        assert lines[-1].split()[:2] == ['bestmove', 'f0f8']
+
+    def test_stop_infinite_search(self):
+        """測試 go infinite 在 stop 之前不回覆 bestmove，stop 後立即回覆"""
+        self.ucci.handle('position startpos')
+        self.ucci.handle('go infinite')
+        time.sleep(0.2)
+        assert self.ucci.searching
+        assert not any(line.startswith('bestmove') for line in self.lines())
+        started = time.perf_counter()
+        self.ucci.handle('stop')
+        assert time.perf_counter() - started < 1
+        assert not self.ucci.searching
+        assert self.lines()[-1].startswith('bestmove')
+        # 搜尋結束後局面保持不變
+        assert len(self.ucci.engine._undo_stack) == 0
+
+    def test_ponderhit_releases_bestmove(self):
+        """測試 ponder 搜尋在 ponderhit 之後才回覆 bestmove"""
+        self.ucci.handle('position fen 4k4/9/9/9/9/9/9/9/9/3K1R3 w - - 0 1')
+        self.ucci.handle('go ponder depth 2')
+        time.sleep(0.2)
+        assert not any(line.startswith('bestmove') for line in self.lines())
+        self.ucci.handle('ponderhit')
+        assert self.ucci.wait(timeout=30)
+        assert self.lines()[-1].startswith('bestmove f0f8')
+
+    def test_no_legal_moves(self):
+        """測試被將死時回覆 nobestmove"""
+        self.ucci.handle('position fen 3k5/4R4/3R5/9/9/9/9/9/9/4K4 b - - 0 1')
+        self.ucci.handle('go depth 2')
+        assert self.ucci.wait(timeout=30)
+        assert self.lines()[-1] == 'nobestmove'
+
+    def test_quit(self):
+        """測試 quit 中止搜尋並回覆 bye"""
+        self.ucci.handle('position startpos')
+        self.ucci.handle('go infinite')
+        assert self.ucci.handle('quit') is False
+        assert not self.ucci.searching
+        assert self.lines()[-1] == 'bye'
+
+    def test_module_entry_point(self):
+        """測試 python -m 入口以標準輸入/輸出執行 UCCI"""
+        completed = subprocess.run(
+            [sys.executable, '-m', 'src'], cwd=PACKAGE_DIR, capture_output=True, text=True, timeout=60,
+            input='ucci\nposition fen 4k4/9/9/9/9/9/9/9/9/3K1R3 w - - 0 1\ngo depth 1\nquit\n')
+        lines = completed.stdout.splitlines()
+        assert 'ucciok' in lines
+        assert any(line.startswith('bestmove') for line in lines)
+        assert lines[-1] == 'bye'
@@ -0,0 +1,82 @@
+import random
+
+import pytest
+from src.chess_engine import ChessEngine
+from src.zobrist import ZOBRIST_SIDE, compute_key
+
+from test_move_generation import random_engine
+
+class TestZobristKey:
+    """Zobrist 鍵值測試"""
+
+    def test_empty_board_key(self):
+        """測試空棋盤的鍵值只與輪次有關"""
+        engine = ChessEngine()
+        assert engine.position_key() == 0
+        engine.turn_manager.current_turn = 'Black'
+        assert engine.position_key() == ZOBRIST_SIDE
+
+    def test_place_piece_replaces_key(self):
+        """測試覆蓋放置棋子時鍵值正確"""
+        engine = ChessEngine(zobrist_debug=True)
+        engine.place_piece('Red', 'Rook', 1, 1)
+        engine.place_piece('Black', 'Horse', 1, 1)
+        other = ChessEngine()
+        other.place_piece('Black', 'Horse', 1, 1)
+        assert engine.position_key() == other.position_key()
+
+    @pytest.mark.parametrize("board_backend", ['dict', 'mailbox'])
+    def test_incremental_key_matches_recompute(self, board_backend):
+        """測試隨機走子與還原過程中，增量鍵值與重算一致"""
+        rng = random.Random(11)
+        engine = random_engine(rng, 24, board_backend=board_backend)
+        engine.zobrist_debug = True
+        start_key = engine.position_key()
+        played = 0
+        for _ in range(40):
+            color = engine.turn_manager.current_turn
+            moves = engine.generate_legal_moves(color)
+            if not moves:
+                break
+            engine.make_move(*rng.choice(moves))
+            played += 1
+            assert engine.position_key() == compute_key(engine.board, engine.turn_manager.current_turn)
+        for _ in range(played):
+            engine.unmake_move()
+        assert engine.position_key() == start_key
+
+    def test_transposition_gives_same_key(self):
+        """測試不同走法順序到達相同局面時鍵值相同"""
+        first = ChessEngine()
+        second = ChessEngine()
+        for engine in (first, second):
+            engine.place_piece('Red', 'Rook', 1, 1)
+            engine.place_piece('Red', 'Horse', 1, 2)
+            engine.place_piece('Black', 'Rook', 10, 1)
+            engine.place_piece('Black', 'Horse', 10, 2)
+        first.move_piece(1, 1, 2, 1)
+        first.move_piece(10, 1, 9, 1)
+        first.move_piece(1, 2, 3, 3)
+        second.move_piece(1, 2, 3, 3)
+        second.move_piece(10, 1, 9, 1)
+        second.move_piece(1, 1, 2, 1)
+        assert first.position_key() == second.position_key()
+        assert first.position_key() != ChessEngine().position_key()
+
+    def test_bitboard_key_matches_engine(self):
+        """測試位元棋盤的鍵值與引擎一致"""
+        engine = random_engine(random.Random(5), 18)
+        position = engine.to_bitboards()
+        assert position.position_key() == engine.position_key()
+        from_sq, to_sq = position.generate_legal_moves('Red')[0]
+        position.make_move(from_sq, to_sq)
+        position.unmake_move()
+        assert position.position_key() == engine.position_key()
+
+    def test_debug_mode_detects_stale_key(self):
+        """測試除錯模式能發現未同步的鍵值"""
+        engine = ChessEngine(zobrist_debug=True)
+        engine.place_piece('Red', 'Rook', 1, 1)
+        engine.board[(2, 2)] = {'color': 'Red', 'type': 'Cannon'}
+        with pytest.raises(AssertionError):
+            engine.position_key()